@@ -0,0 +1,44 @@
+"""Add player_comparisons table
+
+Revision ID: 00a8a875b72c
+Revises: 7af35b6cc5ba
+Create Date: 2025-07-15 09:41:07.221384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '00a8a875b72c'
+down_revision: Union[str, Sequence[str], None] = '7af35b6cc5ba'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('player_comparisons',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('comp_player_id', sa.Integer(), nullable=False),
+    sa.Column('distance', sa.Float(), nullable=False),
+    sa.Column('similarity_score', sa.Float(), nullable=True),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['comp_player_id'], ['players.id'], ),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('player_id', 'rank', name='_player_comparison_rank_uc')
+    )
+    op.create_index(op.f('ix_player_comparisons_player_id'), 'player_comparisons', ['player_id'], unique=False)
+    op.create_index(op.f('ix_player_comparisons_comp_player_id'), 'player_comparisons', ['comp_player_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_player_comparisons_comp_player_id'), table_name='player_comparisons')
+    op.drop_index(op.f('ix_player_comparisons_player_id'), table_name='player_comparisons')
+    op.drop_table('player_comparisons')
@@ -0,0 +1,91 @@
+"""Store player_features vectors as float32 blobs instead of pickles
+
+Revision ID: 3c9e51d0b7a2
+Revises: 00a8a875b72c
+Create Date: 2025-07-16 11:02:37.514093
+
+"""
+import pickle
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e51d0b7a2'
+down_revision: Union[str, Sequence[str], None] = '00a8a875b72c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+# Format version 1 of ml.feature_blob, frozen here so the migration does not change with it
+FORMAT_VERSION = 1
+
+
+def _mask_bytes(n):
+    return -(-((n + 7) // 8) // 4) * 4
+
+
+def _encode(values, present):
+    values = np.asarray(values, dtype='<f4').ravel()
+    n = len(values)
+    packed = np.zeros(_mask_bytes(n), dtype=np.uint8)
+    bits = np.packbits(np.asarray(present, dtype=bool).ravel(), bitorder='little')
+    packed[:len(bits)] = bits
+    return bytes([FORMAT_VERSION, 0]) + int(n).to_bytes(2, 'little') + packed.tobytes() + values.tobytes()
+
+
+def _is_blob(data):
+    # Pickles start with the PROTO opcode (0x80); a blob with its version byte and exact size
+    if not data or data[0] != FORMAT_VERSION or len(data) < 4:
+        return False
+    n = int.from_bytes(data[2:4], 'little')
+    return len(data) == 4 + _mask_bytes(n) + 4 * n
+
+
+def _upgrade_row(raw, normalized):
+    """Blobs of a pickled row. Rows a partial earlier run already converted are kept as they are."""
+    if _is_blob(raw) and _is_blob(normalized):
+        return raw, normalized
+    raw_values = np.asarray(pickle.loads(raw), dtype=np.float64).ravel()
+    # Pickled vectors stored missing stats as 0.0; treat zeros as missing, as the feature
+    # sketches do, until the next /features/populate rewrites the rows with real masks
+    present = raw_values != 0
+    return _encode(raw_values, present), _encode(pickle.loads(normalized), present)
+
+
+def _decode(blob):
+    n = int.from_bytes(blob[2:4], 'little')
+    return np.frombuffer(blob[4 + _mask_bytes(n):], dtype='<f4').astype(np.float64)
+
+
+def _convert(convert_row):
+    conn = op.get_bind()
+    table = sa.table(
+        'player_features',
+        sa.column('player_id', sa.Integer),
+        sa.column('raw_features', sa.LargeBinary),
+        sa.column('normalized_features', sa.LargeBinary),
+    )
+    rows = conn.execute(sa.select(table.c.player_id, table.c.raw_features, table.c.normalized_features)).fetchall()
+    update = table.update().where(table.c.player_id == sa.bindparam('pid')).values(
+        raw_features=sa.bindparam('raw'), normalized_features=sa.bindparam('normalized'))
+    for i in range(0, len(rows), BATCH_SIZE):
+        params = []
+        for pid, raw, normalized in rows[i:i + BATCH_SIZE]:
+            raw, normalized = convert_row(bytes(raw), bytes(normalized))
+            params.append({'pid': pid, 'raw': raw, 'normalized': normalized})
+        conn.execute(update, params)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # PickleType and LargeBinary share the column type (bytea / BLOB); only the contents change
+    _convert(_upgrade_row)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _convert(lambda raw, normalized: (pickle.dumps(_decode(raw)), pickle.dumps(_decode(normalized))))
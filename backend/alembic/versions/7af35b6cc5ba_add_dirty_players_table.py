@@ -0,0 +1,33 @@
+"""Add dirty_players table
+
+Revision ID: 7af35b6cc5ba
+Revises: 7755689ddeac
+Create Date: 2025-07-14 10:12:41.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7af35b6cc5ba'
+down_revision: Union[str, Sequence[str], None] = '7755689ddeac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('dirty_players',
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('marked_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ),
+    sa.PrimaryKeyConstraint('player_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('dirty_players')
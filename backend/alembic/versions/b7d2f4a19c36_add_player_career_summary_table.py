@@ -0,0 +1,40 @@
+"""Add player_career_summary table
+
+Revision ID: b7d2f4a19c36
+Revises: e41b7a9c2d58
+Create Date: 2025-07-18 10:04:12.417305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f4a19c36'
+down_revision: Union[str, Sequence[str], None] = 'e41b7a9c2d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('player_career_summary',
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('batting_war', sa.Float(), nullable=False),
+    sa.Column('pitching_war', sa.Float(), nullable=False),
+    sa.Column('career_war', sa.Float(), nullable=False),
+    sa.Column('peak_war', sa.Float(), nullable=True),
+    sa.Column('debut_season', sa.Integer(), nullable=True),
+    sa.Column('mlb_seasons', sa.Integer(), nullable=False),
+    sa.Column('debut_age', sa.Integer(), nullable=True),
+    sa.Column('last_updated', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ),
+    sa.PrimaryKeyConstraint('player_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('player_career_summary')
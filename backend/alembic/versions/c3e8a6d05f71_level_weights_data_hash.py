@@ -0,0 +1,30 @@
+"""Add data_hash to level_weights
+
+Revision ID: c3e8a6d05f71
+Revises: b7d2f4a19c36
+Create Date: 2025-07-18 14:37:50.902116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8a6d05f71'
+down_revision: Union[str, Sequence[str], None] = 'b7d2f4a19c36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('level_weights', sa.Column('data_hash', sa.String(), nullable=True))
+    op.create_index(op.f('ix_level_weights_data_hash'), 'level_weights', ['data_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_level_weights_data_hash'), table_name='level_weights')
+    op.drop_column('level_weights', 'data_hash')
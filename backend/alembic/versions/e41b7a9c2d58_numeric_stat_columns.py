@@ -0,0 +1,102 @@
+"""Convert numeric stat columns from String to Float
+
+Revision ID: e41b7a9c2d58
+Revises: 3c9e51d0b7a2
+Create Date: 2025-07-17 09:26:51.830472
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41b7a9c2d58'
+down_revision: Union[str, Sequence[str], None] = '3c9e51d0b7a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+NUMERIC_COLUMNS = {
+    'standard_batting_stats': ['ba', 'obp', 'slg', 'ops', 'roba'],
+    'value_batting_stats': ['waa_wl_pct', 'wl_162_pct'],
+    'advanced_batting_stats': [
+        'roba', 'babip', 'iso', 'hr_pct', 'so_pct', 'bb_pct', 'ev', 'hardh_pct', 'ld_pct', 'gb_pct',
+        'fb_pct', 'gb_fb', 'pull_pct', 'cent_pct', 'oppo_pct', 'wpa', 'cwpa', 're24', 'rs_pct',
+        'sb_pct', 'xbt_pct',
+    ],
+    'standard_pitching_stats': ['wl_pct', 'era', 'ip', 'fip', 'whip', 'h9', 'hr9', 'bb9', 'so9', 'so_w'],
+    'value_pitching_stats': ['ra9', 'fip', 'wpa', 're24', 'cwpa', 'ip'],
+    'advanced_pitching_stats': [
+        'ip', 'k_pct', 'bb_pct', 'hr_pct', 'babip', 'lob_pct', 'era_minus', 'fip_minus', 'xfip_minus',
+        'siera', 'pli', 'inli', 'gmli', 'exli', 'wpa', 're24', 'cwpa',
+    ],
+    'standard_fielding_stats': ['inn', 'fld_pct', 'lgfld_pct', 'rf9', 'lgrf9', 'rfg', 'lgrfg'],
+}
+# Parsing rules of stat_parsing at this revision, frozen so the migration does not change with it
+INNINGS_COLUMNS = {'ip', 'inn'}
+_INNINGS_RE = re.compile(r'^(-?\d+)\.([012])$')
+
+
+def _parse(column, value):
+    if value is None:
+        return None
+    text = str(value).strip()
+    if column in INNINGS_COLUMNS:
+        match = _INNINGS_RE.match(text)
+        if match:
+            whole, outs = int(match.group(1)), int(match.group(2))
+            return whole + (outs / 3.0 if whole >= 0 else -outs / 3.0)
+    text = text.replace(',', '').rstrip('%').strip()
+    try:
+        return float(text) if text else None
+    except ValueError:
+        return None
+
+
+def _format(column, value):
+    """Float back to the scraped notation (innings.outs for IP/Inn)."""
+    if value is None:
+        return None
+    if column in INNINGS_COLUMNS:
+        whole = int(value)
+        outs = int(round((abs(value) - abs(whole)) * 3))
+        if outs == 3:
+            whole, outs = whole + (1 if value >= 0 else -1), 0
+        return f"{whole}.{outs}"
+    return repr(float(value))
+
+
+def _convert(table_name, columns, new_type, old_type, convert):
+    conn = op.get_bind()
+    table = sa.table(table_name, sa.column('id', sa.Integer), *[sa.column(c) for c in columns])
+    rows = conn.execute(sa.select(table.c.id, *[table.c[c] for c in columns])).fetchall()
+    # Values are held in memory while the columns change type, then written back parsed
+    with op.batch_alter_table(table_name) as batch:
+        for column in columns:
+            batch.alter_column(column, type_=new_type(), existing_type=old_type(),
+                               postgresql_using=f"NULL::{'double precision' if new_type is sa.Float else 'varchar'}")
+    typed = sa.table(table_name, sa.column('id', sa.Integer), *[sa.column(c, new_type) for c in columns])
+    update = typed.update().where(typed.c.id == sa.bindparam('row_id')).values(
+        {c: sa.bindparam(f'v_{c}') for c in columns})
+    for i in range(0, len(rows), BATCH_SIZE):
+        params = []
+        for row in rows[i:i + BATCH_SIZE]:
+            values = {f'v_{c}': convert(c, row[j + 1]) for j, c in enumerate(columns)}
+            params.append({'row_id': row[0], **values})
+        if params:
+            conn.execute(update, params)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name, columns in NUMERIC_COLUMNS.items():
+        _convert(table_name, columns, sa.Float, sa.String, _parse)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name, columns in NUMERIC_COLUMNS.items():
+        _convert(table_name, columns, sa.String, sa.Float, _format)
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 from database import SessionLocal
-from models import Player, PlayerFeatures, PlayerRatings, StandardBattingStat, StandardPitchingStat, StandardFieldingStat
+from models import Player, PlayerRatings, StandardBattingStat, StandardPitchingStat, StandardFieldingStat
 from ml_service import ml_service
+from schemas import PlayerCompsRequest
+from populate_jobs import start_populate_job, get_job, list_jobs
+from data_version import conditional_get
+from response_cache import cached_response
+from player_profile import model_to_dict, parse_fields, build_profile, BIO_FIELDS, ML_FIELDS
 import time
 import numpy as np
-import datetime
+from typing import Optional
 
 router = APIRouter()
 
@@ -16,25 +21,55 @@ def get_db():
     finally:
         db.close()
 
-def model_to_dict(obj):
-    return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
-
 @router.get("/player/{player_id}/bio")
-def get_player_bio(player_id: int, db: Session = Depends(get_db)):
+def get_player_bio(player_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = conditional_get(request, response, db, player_id=player_id)
+    if cached is not None:
+        return cached
     player = db.query(Player).filter(Player.id == player_id).first()
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
-    bio_fields = {k: getattr(player, k) for k in [
-        'full_name', 'birth_date', 'primary_position', 'positions_raw', 'positions', 'bats', 'throws', 'height', 'weight', 'team', 'source_url']}
+    bio_fields = {k: getattr(player, k) for k in BIO_FIELDS}
     return {"player_id": player_id, "bio": bio_fields}
 
+@router.get("/player/{player_id}/profile")
+def get_player_profile(player_id: int, request: Request, response: Response, fields: Optional[str] = None,
+                       db: Session = Depends(get_db)):
+    # One round trip for the player page: bio, ratings, stat tables, comps, prediction (or the fields= subset)
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    uses_models = any(name in ML_FIELDS for name in selected)
+    cached = conditional_get(request, response, db, player_id=player_id, include_global=uses_models,
+                             model_version=(ml_service.model_version or 'unfitted') if uses_models else None)
+    if cached is not None:
+        return cached
+
+    def compute():
+        start = time.time()
+        profile = build_profile(db, player_id, selected)
+        if profile is None:
+            raise HTTPException(status_code=404, detail="Player not found")
+        print(f"[PERF] /profile ({','.join(selected)}) for player {player_id} took {time.time() - start:.2f}s")
+        return profile
+    # A profile with failed ML parts is served but neither cached nor validated
+    complete = lambda profile: not profile.get('unavailable')
+    return cached_response(response, compute, cacheable=complete) if uses_models else compute()
+
 @router.get("/players/search")
-def search_players(name: str, db: Session = Depends(get_db)):
+def search_players(name: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = conditional_get(request, response, db)
+    if cached is not None:
+        return cached
     players = db.query(Player).filter(Player.full_name.ilike(f"%{name}%")).all()
     return [{"id": p.id, "full_name": p.full_name, "primary_position": p.primary_position, "team": p.team} for p in players]
 
 @router.get("/players")
-def list_players(skip: int = 0, limit: int = 10000, db: Session = Depends(get_db)):
+def list_players(request: Request, response: Response, skip: int = 0, limit: int = 10000, db: Session = Depends(get_db)):
+    cached = conditional_get(request, response, db)
+    if cached is not None:
+        return cached
     players = db.query(Player).offset(skip).limit(limit).all()
     # Optionally, you can include cached features or ratings here if needed, e.g.:
     # features_cache = {pf.player_id: pf for pf in db.query(PlayerFeatures).all()}
@@ -48,7 +83,10 @@ def list_players(skip: int = 0, limit: int = 10000, db: Session = Depends(get_db
     } for p in players]
 
 @router.get("/player/{player_id}/ratings")
-def get_player_ratings(player_id: int, db: Session = Depends(get_db)):
+def get_player_ratings(player_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = conditional_get(request, response, db, player_id=player_id)
+    if cached is not None:
+        return cached
     rating = db.query(PlayerRatings).filter(PlayerRatings.player_id == player_id).first()
     if not rating:
         raise HTTPException(status_code=404, detail="Player ratings not found")
@@ -56,55 +94,91 @@ def get_player_ratings(player_id: int, db: Session = Depends(get_db)):
     return {c.name: getattr(rating, c.name) for c in rating.__table__.columns}
 
 @router.get("/player/{player_id}/mlb_comps")
-def get_player_comparisons(player_id: int, db: Session = Depends(get_db)):
+def get_player_comparisons(
+    player_id: int,
+    request: Request,
+    response: Response,
+    same_position: bool = False,
+    same_age: bool = False,
+    since_season: Optional[int] = None,
+    until_season: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    # Comps depend on every player's features and on the served comp index
+    cached = conditional_get(request, response, db, player_id=player_id, include_global=True,
+                             model_version=ml_service.model_version or 'unfitted')
+    if cached is not None:
+        return cached
+
+    def compute():
+        start = time.time()
+        if same_position or same_age or since_season is not None or until_season is not None:
+            # Filtered comps search only the matching position/era/age partitions
+            comps = ml_service.get_filtered_similar_players(
+                db, player_id, same_position=same_position, same_age=same_age,
+                since_season=since_season, until_season=until_season,
+            )
+        else:
+            # Served from the precomputed player_comparisons table; live KNN only if the batch job has not covered this player
+            comps = ml_service.get_stored_comparisons(db, player_id)
+            if not comps:
+                comps = ml_service.get_similar_players(db, player_id)
+        if not comps:
+            raise HTTPException(status_code=404, detail="No similar players found")
+        elapsed = time.time() - start
+        print(f"[PERF] /mlb_comps for player {player_id} took {elapsed:.2f}s")
+        return {"comparisons": comps}
+    # Same ETag, same comps: served from the response cache until the data or model moves
+    return cached_response(response, compute)
+
+@router.post("/players/mlb_comps")
+def get_players_comparisons(request: PlayerCompsRequest, db: Session = Depends(get_db)):
     start = time.time()
-    comps = ml_service.get_similar_players(db, player_id)
-    if not comps:
-        raise HTTPException(status_code=404, detail="No similar players found")
+    # One batched KNN pass for the whole list instead of one request per player
+    comps_by_player = ml_service.get_similar_players_bulk(db, request.player_ids, k=request.k)
     elapsed = time.time() - start
-    print(f"[PERF] /mlb_comps for player {player_id} took {elapsed:.2f}s")
-    return {"comparisons": comps}
+    print(f"[PERF] /players/mlb_comps for {len(request.player_ids)} players took {elapsed:.2f}s")
+    return {"comparisons": [
+        {"player_id": pid, "comparisons": comps_by_player.get(pid, [])}
+        for pid in request.player_ids
+    ]}
 
 @router.get("/player/{player_id}/prediction")
-def get_player_prediction(player_id: int, db: Session = Depends(get_db)):
-    prediction = ml_service.predict_mlb_success(db, player_id)
-    if not prediction:
-        raise HTTPException(status_code=404, detail="Player or prediction not found")
-    return prediction
+def get_player_prediction(player_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = conditional_get(request, response, db, player_id=player_id, include_global=True,
+                             model_version=ml_service.model_version or 'unfitted')
+    if cached is not None:
+        return cached
+
+    def compute():
+        prediction = ml_service.predict_mlb_success(db, player_id)
+        if not prediction:
+            raise HTTPException(status_code=404, detail="Player or prediction not found")
+        return prediction
+    return cached_response(response, compute)
 
 @router.get("/model/metrics")
 def get_model_metrics():
     return ml_service.metrics
 
-@router.post("/features/populate")
-def populate_player_features(db: Session = Depends(get_db)):
-    count = 0
-    players = db.query(Player).all()
-    for player in players:
-        pid = getattr(player, 'id', None)
-        if not isinstance(pid, int):
-            continue
-        feats = ml_service.extract_player_features(db, pid)
-        if feats is None:
-            continue
-        pf = db.query(PlayerFeatures).filter_by(player_id=pid).first()
-        if pf:
-            pf.raw_features = feats['raw']
-            pf.normalized_features = feats['normalized']
-        else:
-            pf = PlayerFeatures(
-                player_id=pid,
-                raw_features=feats['raw'],
-                normalized_features=feats['normalized']
-            )
-            db.add(pf)
-        count += 1
-    db.commit()
-    ml_service.refresh_feature_cache(db)
+@router.post("/features/populate", status_code=202)
+def populate_player_features():
+    # Chunks are extracted and committed by the populate worker pool; poll /jobs/{job_id}
+    job, started = start_populate_job('features')
+    if not started:
+        raise HTTPException(status_code=409, detail=f"Features populate job {job.job_id} is already running")
+    return job.to_dict()
+
+@router.post("/comparisons/populate")
+def populate_player_comparisons(k: int = 10, db: Session = Depends(get_db)):
+    count = ml_service.compute_comparisons(db, k=k)
     return {"status": "success", "players_processed": count}
 
 @router.get("/players/ratings")
-def get_all_players_ratings(db: Session = Depends(get_db)):
+def get_all_players_ratings(request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = conditional_get(request, response, db)
+    if cached is not None:
+        return cached
     # Join Player and PlayerRatings to include full_name
     ratings = db.query(PlayerRatings, Player.full_name).join(Player, PlayerRatings.player_id == Player.id).all()
     results = []
@@ -114,123 +188,45 @@ def get_all_players_ratings(db: Session = Depends(get_db)):
         results.append(row)
     return results
 
-@router.post("/ratings/populate")
-def populate_player_ratings_and_features(db: Session = Depends(get_db)):
-    count = 0
-    updated = 0
-    players = db.query(Player).all()
-    for player in players:
-        pid = getattr(player, 'id', None)
-        if not isinstance(pid, int):
-            continue
-        # Compute features
-        feats = ml_service.extract_player_features(db, pid)
-        if feats is not None:
-            pf = db.query(PlayerFeatures).filter_by(player_id=pid).first()
-            if pf:
-                pf.raw_features = feats['raw']
-                pf.normalized_features = feats['normalized']
-            else:
-                pf = PlayerFeatures(
-                    player_id=pid,
-                    raw_features=feats['raw'],
-                    normalized_features=feats['normalized']
-                )
-                db.add(pf)
-        # Compute ratings
-        ratings = ml_service.calculate_mlb_show_ratings(db, pid)
-        if ratings is None:
-            continue
-        # Flatten grades for storage
-        grades = ratings.get('grades', {})
-        # For two-way, flatten both hitting and pitching
-        if ratings.get('player_type') == 'two_way':
-            hitting = grades.get('hitting', {})
-            pitching = grades.get('pitching', {})
-            rating_obj = PlayerRatings(
-                player_id=pid,
-                overall_rating=ratings.get('overall_rating'),
-                potential_rating=ratings.get('potential_rating'),
-                confidence_score=ratings.get('confidence_score'),
-                player_type=ratings.get('player_type'),
-                last_updated=datetime.datetime.utcnow(),
-                # Hitting
-                contact_left=hitting.get('contact_left'),
-                contact_right=hitting.get('contact_right'),
-                power_left=hitting.get('power_left'),
-                power_right=hitting.get('power_right'),
-                vision=hitting.get('vision'),
-                discipline=hitting.get('discipline'),
-                fielding=hitting.get('fielding'),
-                arm_strength=hitting.get('arm_strength'),
-                arm_accuracy=hitting.get('arm_accuracy'),
-                speed=hitting.get('speed'),
-                stealing=hitting.get('stealing'),
-                # Pitching
-                k_rating=pitching.get('k_rating'),
-                bb_rating=pitching.get('bb_rating'),
-                gb_rating=pitching.get('gb_rating'),
-                hr_rating=pitching.get('hr_rating'),
-                command_rating=pitching.get('command_rating'),
-                # Historical
-                historical_overalls=None,  # Optionally, could merge both
-                team=player.team,
-                level=player.level
-            )
-        else:
-            rating_obj = PlayerRatings(
-                player_id=pid,
-                overall_rating=ratings.get('overall_rating'),
-                potential_rating=ratings.get('potential_rating'),
-                confidence_score=ratings.get('confidence_score'),
-                player_type=ratings.get('player_type'),
-                last_updated=datetime.datetime.utcnow(),
-                contact_left=grades.get('contact_left'),
-                contact_right=grades.get('contact_right'),
-                power_left=grades.get('power_left'),
-                power_right=grades.get('power_right'),
-                vision=grades.get('vision'),
-                discipline=grades.get('discipline'),
-                fielding=grades.get('fielding'),
-                arm_strength=grades.get('arm_strength'),
-                arm_accuracy=grades.get('arm_accuracy'),
-                speed=grades.get('speed'),
-                stealing=grades.get('stealing'),
-                k_rating=grades.get('k_rating'),
-                bb_rating=grades.get('bb_rating'),
-                gb_rating=grades.get('gb_rating'),
-                hr_rating=grades.get('hr_rating'),
-                command_rating=grades.get('command_rating'),
-                historical_overalls=ratings.get('historical_overalls'),
-                team=player.team,
-                level=player.level
-            )
-        # Upsert logic
-        existing = db.query(PlayerRatings).filter_by(player_id=pid).first()
-        if existing:
-            for attr, value in rating_obj.__dict__.items():
-                if attr.startswith('_'):
-                    continue
-                setattr(existing, attr, value)
-            updated += 1
-        else:
-            db.add(rating_obj)
-            count += 1
-    db.commit()
-    ml_service.refresh_feature_cache(db)
-    return {"status": "success", "players_created": count, "players_updated": updated}
+@router.post("/ratings/populate", status_code=202)
+def populate_player_ratings_and_features(incremental: bool = False):
+    # incremental only covers players whose stats changed since the last recompute
+    job, started = start_populate_job('ratings', incremental=incremental)
+    if not started:
+        raise HTTPException(status_code=409, detail=f"Ratings populate job {job.job_id} is already running")
+    return job.to_dict()
+
+@router.get("/jobs")
+def list_populate_jobs():
+    return [job.to_dict() for job in list_jobs()]
+
+@router.get("/jobs/{job_id}")
+def get_populate_job(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 @router.get("/player/{player_id}/standard_batting")
-def get_standard_batting(player_id: int, db: Session = Depends(get_db)):
+def get_standard_batting(player_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = conditional_get(request, response, db, player_id=player_id)
+    if cached is not None:
+        return cached
     stats = db.query(StandardBattingStat).filter(StandardBattingStat.player_id == player_id).all()
     return [model_to_dict(stat) for stat in stats]
 
 @router.get("/player/{player_id}/standard_pitching")
-def get_standard_pitching(player_id: int, db: Session = Depends(get_db)):
+def get_standard_pitching(player_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = conditional_get(request, response, db, player_id=player_id)
+    if cached is not None:
+        return cached
     stats = db.query(StandardPitchingStat).filter(StandardPitchingStat.player_id == player_id).all()
     return [model_to_dict(stat) for stat in stats]
 
 @router.get("/player/{player_id}/standard_fielding")
-def get_standard_fielding(player_id: int, db: Session = Depends(get_db)):
+def get_standard_fielding(player_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = conditional_get(request, response, db, player_id=player_id)
+    if cached is not None:
+        return cached
     stats = db.query(StandardFieldingStat).filter(StandardFieldingStat.player_id == player_id).all()
     return [model_to_dict(stat) for stat in stats] 
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""
+Batched INSERT ... ON CONFLICT DO UPDATE for tables keyed by player_id. Rows are plain tuples in
+a fixed column order, so writing a few thousand players is a handful of executemany round trips
+instead of an ORM load/compare/flush per row.
+"""
+from typing import Iterable, List, Sequence, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+
+UPSERT_BATCH_SIZE = 1000
+_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def upsert_rows(db: Session, model, columns: Sequence[str], rows: Iterable[Tuple],
+                key_columns: Sequence[str] = ('player_id',), batch_size: int = UPSERT_BATCH_SIZE) -> int:
+    """
+    Insert rows (tuples ordered like columns) into model's table, updating the non-key columns
+    of rows whose key already exists. Runs in the caller's transaction; returns the row count.
+    Dialects without ON CONFLICT fall back to one ORM merge per row.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    table = model.__table__
+    insert = _INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        for row in rows:
+            db.merge(model(**dict(zip(columns, row))))
+        db.flush()
+        return len(rows)
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={name: stmt.excluded[name] for name in columns if name not in key_columns},
+    )
+    for i in range(0, len(rows), batch_size):
+        db.execute(stmt, [dict(zip(columns, row)) for row in rows[i:i + batch_size]])
+    return len(rows)
+
+
+def existing_keys(db: Session, model, player_ids: List[int]) -> set:
+    """player_ids that already have a row in model's table (one IN query per batch)."""
+    found = set()
+    for i in range(0, len(player_ids), UPSERT_BATCH_SIZE):
+        batch = player_ids[i:i + UPSERT_BATCH_SIZE]
+        found.update(pid for (pid,) in db.query(model.player_id).filter(model.player_id.in_(batch)).all())
+    return found
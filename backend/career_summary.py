@@ -0,0 +1,99 @@
+"""
+MLB career totals per player, materialized in player_career_summary.
+
+A summary is built from one GROUP BY (player_id, season) SUM(war) query over MLB rows of
+standard batting and of value pitching (the pitching table that carries WAR), so a batch of
+players costs two queries however many seasons they played. refresh_players rewrites the
+summaries of the players it refreshes (the dirty-player queue on ingest, or everyone on a full
+refresh). career_summaries reads stored rows with one IN query and computes, without writing,
+any that have not been materialized yet.
+"""
+import datetime
+import re
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import Player, PlayerCareerSummary, StandardBattingStat, ValuePitchingStat
+from bulk_upsert import upsert_rows, UPSERT_BATCH_SIZE
+
+SUMMARY_COLUMNS = [
+    'player_id', 'batting_war', 'pitching_war', 'career_war', 'peak_war', 'debut_season',
+    'mlb_seasons', 'debut_age', 'last_updated',
+]
+SUMMARY_FIELDS = SUMMARY_COLUMNS[1:-1]
+_YEAR_RE = re.compile(r'(\d{4})')
+
+
+def _year(value) -> Optional[int]:
+    match = _YEAR_RE.search(str(value)) if value is not None else None
+    return int(match.group(1)) if match else None
+
+
+def _empty_summary() -> Dict:
+    return {'batting_war': 0.0, 'pitching_war': 0.0, 'career_war': 0.0, 'peak_war': None,
+            'debut_season': None, 'mlb_seasons': 0, 'debut_age': None}
+
+
+def compute_career_summaries(db: Session, player_ids: List[int]) -> Dict[int, Dict]:
+    """Career summary of each player (zeros for players without MLB rows), from the stat tables."""
+    summaries = {int(pid): _empty_summary() for pid in player_ids}
+    season_war: Dict[int, Dict[int, float]] = {pid: {} for pid in summaries}
+    for model, field in ((StandardBattingStat, 'batting_war'), (ValuePitchingStat, 'pitching_war')):
+        for i in range(0, len(player_ids), UPSERT_BATCH_SIZE):
+            batch = player_ids[i:i + UPSERT_BATCH_SIZE]
+            rows = (db.query(model.player_id, model.season, func.sum(model.war))
+                    .filter(model.player_id.in_(batch), model.level == 'MLB')
+                    .group_by(model.player_id, model.season).all())
+            for pid, season, war in rows:
+                war = float(war or 0.0)
+                summaries[pid][field] += war
+                year = _year(season)
+                if year is not None:
+                    season_war[pid][year] = season_war[pid].get(year, 0.0) + war
+    birth_years = {}
+    for i in range(0, len(player_ids), UPSERT_BATCH_SIZE):
+        batch = player_ids[i:i + UPSERT_BATCH_SIZE]
+        birth_years.update((pid, _year(born)) for pid, born in
+                           db.query(Player.id, Player.birth_date).filter(Player.id.in_(batch)).all())
+    for pid, summary in summaries.items():
+        summary['career_war'] = summary['batting_war'] + summary['pitching_war']
+        seasons = season_war[pid]
+        if seasons:
+            summary['debut_season'] = min(seasons)
+            summary['mlb_seasons'] = len(seasons)
+            summary['peak_war'] = max(seasons.values())
+            if birth_years.get(pid):
+                summary['debut_age'] = summary['debut_season'] - birth_years[pid]
+    return summaries
+
+
+def career_summary_rows(db: Session, player_ids: List[int]) -> List[tuple]:
+    """PlayerCareerSummary values of player_ids, ordered like SUMMARY_COLUMNS, computed without writing."""
+    summaries = compute_career_summaries(db, [int(pid) for pid in player_ids])
+    now = datetime.datetime.utcnow()
+    return [(pid, *[s[field] for field in SUMMARY_FIELDS], now) for pid, s in summaries.items()]
+
+
+def write_career_summary_rows(db: Session, rows: List[tuple]) -> int:
+    """Upsert career_summary_rows output. Returns the number of rows written."""
+    return upsert_rows(db, PlayerCareerSummary, SUMMARY_COLUMNS, rows)
+
+
+def refresh_career_summaries(db: Session, player_ids: Optional[List[int]] = None) -> int:
+    """Recompute and upsert the summaries of player_ids (everyone when None). Returns the number of rows written."""
+    if player_ids is None:
+        player_ids = [pid for (pid,) in db.query(Player.id).all()]
+    return write_career_summary_rows(db, career_summary_rows(db, player_ids))
+
+
+def career_summaries(db: Session, player_ids: List[int]) -> Dict[int, Dict]:
+    """Stored summaries of player_ids (one IN query), computing those not yet materialized."""
+    player_ids = list(dict.fromkeys(int(pid) for pid in player_ids))
+    found = {}
+    if player_ids:
+        for row in db.query(PlayerCareerSummary).filter(PlayerCareerSummary.player_id.in_(player_ids)).all():
+            found[row.player_id] = {field: getattr(row, field) for field in SUMMARY_FIELDS}
+    missing = [pid for pid in player_ids if pid not in found]
+    if missing:
+        found.update(compute_career_summaries(db, missing))
+    return found
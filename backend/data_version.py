@@ -0,0 +1,78 @@
+"""
+Conditional GETs driven by the data_versions counters.
+
+models.bump_data_versions increments 'global' and 'player:<id>' counters whenever stat or
+player rows change through the ORM (ingest), and player_refresh / the comp batch job bump them
+when they write features, ratings, career summaries or comps. A read endpoint names what its
+response depends on (one player's data, everything, the served model). conditional_get turns
+those into an ETag and a Last-Modified header, and answers 304 when the client already holds
+that version, before any of the response is computed.
+"""
+import datetime
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+from models import DataVersion, GLOBAL_VERSION_KEY, player_version_key
+
+# Clients may keep responses but must revalidate them (cheap: a 304 without a body)
+CACHE_CONTROL = 'no-cache'
+
+
+def current_versions(db: Session, keys) -> Tuple[Tuple[int, ...], Optional[datetime.datetime]]:
+    """Version of each key (0 before its first bump) and the latest of their update times."""
+    rows = {row.key: row for row in db.query(DataVersion).filter(DataVersion.key.in_(list(keys))).all()}
+    versions = tuple(rows[key].version if key in rows else 0 for key in keys)
+    updated = [row.updated_at for row in rows.values() if row.updated_at is not None]
+    return versions, max(updated) if updated else None
+
+
+def _http_date(value: datetime.datetime) -> str:
+    return format_datetime(value.replace(tzinfo=datetime.timezone.utc, microsecond=0), usegmt=True)
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime.datetime]) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        return last_modified.replace(tzinfo=datetime.timezone.utc, microsecond=0) <= since
+    return False
+
+
+def conditional_get(request: Request, response: Response, db: Session, player_id: Optional[int] = None,
+                    include_global: bool = False, model_version: Optional[str] = None) -> Optional[Response]:
+    """
+    Validators for a response built from player_id's data (and all data when include_global or
+    without a player), optionally from the served model too. Returns a 304 response to send as
+    is when the client's copy is current; otherwise sets ETag, Last-Modified and Cache-Control
+    on response and returns None. Model-dependent responses carry no Last-Modified: a refit
+    changes them without touching the counters, so only the ETag can validate them.
+    """
+    keys = []
+    if player_id is not None:
+        keys.append(player_version_key(player_id))
+    if include_global or player_id is None:
+        keys.append(GLOBAL_VERSION_KEY)
+    versions, last_modified = current_versions(db, keys)
+    if model_version is not None:
+        last_modified = None
+    tag = '|'.join([request.url.path, str(request.url.query)] + [f"{k}={v}" for k, v in zip(keys, versions)] + [f"model={model_version}"])
+    etag = '"' + hashlib.sha1(tag.encode()).hexdigest()[:20] + '"'
+    headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+    if last_modified is not None:
+        headers['Last-Modified'] = _http_date(last_modified)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,9 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from api import canonical_player
-from routers import ingest
+from routers import ingest, admin
 from ml_service import ml_service
 from database import SessionLocal
+from ml import model_store
+from request_memo import request_scope
 
 app = FastAPI()
 
@@ -15,6 +18,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def sync_shared_ml_state(request, call_next):
+    # Remap feature matrices / model bundles another worker process published (refit, populate).
+    # The remap and bundle load block, so they run off the event loop
+    if ml_service.shared_state_check_due():
+        await run_in_threadpool(ml_service.sync_shared_state)
+    return await call_next(request)
+
+@app.middleware("http")
+async def memoize_per_request(request, call_next):
+    # Feature extraction and repeated queries are computed once per request (request_memo)
+    with request_scope():
+        return await call_next(request)
+
 @app.get("/")
 def root():
     return {"message": "Statcast AI API is running!"}
@@ -22,9 +39,20 @@ def root():
 # Only include the new canonical player router
 app.include_router(canonical_player.router)
 app.include_router(ingest.router)
+app.include_router(admin.router)
 
 @app.on_event("startup")
 def load_ml_weights():
     db = SessionLocal()
     ml_service.load_level_weights(db)
+    # Serve the persisted model bundle; requests never fit models themselves
+    if ml_service.load_models():
+        current = model_store.compute_data_version(db)
+        if current != ml_service.trained_data_version:
+            print(f"[ML] Model bundle was trained on data version {ml_service.trained_data_version}, current is {current}; retrain with scripts/train_models.py")
+    else:
+        print("[ML] No model bundle found; comps are unavailable until scripts/train_models.py has run")
+    # Workers share one memory-mapped feature matrix; the first worker to start builds it
+    if not ml_service.attach_shared_arrays(reload_models=False):
+        ml_service.refresh_feature_cache(db)
     db.close()
@@ -0,0 +1,219 @@
+import os
+import json
+import numpy as np
+from typing import Optional
+from sklearn.neighbors import NearestNeighbors
+
+# Comp index backend: 'ball_tree' (exact, sklearn) or 'rp_forest' (approximate, below)
+COMP_INDEX_BACKEND = os.getenv('COMP_INDEX_BACKEND', 'ball_tree')
+# rp_forest recall/speed knobs (see RPForestIndex)
+RP_FOREST_TREES = int(os.getenv('COMP_INDEX_TREES', '32'))
+RP_FOREST_LEAF_SIZE = int(os.getenv('COMP_INDEX_LEAF_SIZE', '128'))
+RP_FOREST_PROBES = int(os.getenv('COMP_INDEX_PROBES', '4'))
+
+
+def build_comp_index(X: np.ndarray, backend: Optional[str] = None, **params):
+    """
+    Fit a comp index over the scaled feature matrix X. Every backend exposes the sklearn
+    NearestNeighbors query API: kneighbors(X, n_neighbors) -> (distances, indices).
+    """
+    backend = backend or COMP_INDEX_BACKEND
+    if backend == 'ball_tree':
+        return NearestNeighbors(n_neighbors=10, algorithm='ball_tree').fit(X)
+    if backend == 'rp_forest':
+        params.setdefault('n_trees', RP_FOREST_TREES)
+        params.setdefault('leaf_size', RP_FOREST_LEAF_SIZE)
+        params.setdefault('probes', RP_FOREST_PROBES)
+        return RPForestIndex(**params).fit(X)
+    raise ValueError(f"Unknown comp index backend: {backend}")
+
+
+class RPForestIndex:
+    """
+    Approximate nearest neighbors with a forest of random-projection trees (Annoy-style).
+
+    Each tree splits its points recursively by the hyperplane equidistant from two random
+    points of the node until a leaf holds at most leaf_size points. A query descends every
+    tree to one leaf, and the union of those leaves is ranked by exact Euclidean distance.
+
+    Recall is tuned with n_trees and leaf_size at build time, and at query time with
+    search_trees (the number of trees consulted, default all) and probes (extra leaves per
+    tree, reached by taking the other branch at the splits the query passed closest to). More
+    candidates give higher recall and fewer queries per second.
+    """
+
+    def __init__(self, n_trees: int = 16, leaf_size: int = 32, search_trees: Optional[int] = None,
+                 probes: int = 0, random_state: int = 42):
+        self.n_trees = n_trees
+        self.leaf_size = leaf_size
+        self.search_trees = search_trees
+        self.probes = probes
+        self.random_state = random_state
+
+    def fit(self, X: np.ndarray) -> 'RPForestIndex':
+        self._fit_X = np.ascontiguousarray(X, dtype=np.float64)
+        self.n_samples_fit_ = len(self._fit_X)
+        rng = np.random.default_rng(self.random_state)
+        trees = [self._build_tree(rng) for _ in range(self.n_trees)]
+        # Trees are concatenated into flat arrays; each tree's node and leaf ids are offset by these
+        self.tree_node_offsets = np.cumsum([0] + [len(t[1]) for t in trees[:-1]]).astype(np.int64)
+        self.tree_leaf_offsets = np.cumsum([0] + [len(t[3]) - 1 for t in trees[:-1]]).astype(np.int64)
+        self.normals = np.concatenate([t[0] for t in trees]) if trees else np.empty((0, self._fit_X.shape[1]))
+        self.offsets = np.concatenate([t[1] for t in trees]) if trees else np.empty(0)
+        self.children = np.concatenate([t[2] for t in trees]) if trees else np.empty((0, 2), dtype=np.int64)
+        leaf_starts = []
+        leaf_items = []
+        base = 0
+        for t in trees:
+            leaf_starts.append(t[3][:-1] + base)
+            leaf_items.append(t[4])
+            base += len(t[4])
+        leaf_starts.append(np.array([base], dtype=np.int64))
+        self.leaf_starts = np.concatenate(leaf_starts)
+        self.leaf_items = np.concatenate(leaf_items) if leaf_items else np.empty(0, dtype=np.int64)
+        return self
+
+    def _build_tree(self, rng):
+        """One tree as (normals, offsets, children, leaf_starts, leaf_items). Child ids < 0 are leaves (-leaf - 1)."""
+        X = self._fit_X
+        normals, offsets, children = [], [], []
+        leaf_starts, leaf_items = [0], []
+        n_items = 0
+        # (indices, parent node, side) still to be placed
+        stack = [(np.arange(len(X)), -1, 0)]
+        while stack:
+            idx, parent, side = stack.pop()
+            if len(idx) <= self.leaf_size:
+                node = -(len(leaf_starts) - 1) - 1
+                leaf_items.append(idx)
+                n_items += len(idx)
+                leaf_starts.append(n_items)
+            else:
+                a, b = X[rng.choice(idx, 2, replace=False)]
+                normal = a - b
+                if not np.any(normal):
+                    normal = rng.standard_normal(X.shape[1])
+                offset = float(np.dot(normal, (a + b) / 2))
+                proj = X[idx] @ normal - offset
+                left = proj <= 0
+                if left.all() or not left.any():
+                    # Degenerate split (duplicates): halve at random so the tree stays finite
+                    left = np.zeros(len(idx), dtype=bool)
+                    left[rng.permutation(len(idx))[: len(idx) // 2]] = True
+                    normal = np.zeros(X.shape[1])
+                    offset = 0.0
+                node = len(normals)
+                normals.append(normal)
+                offsets.append(offset)
+                children.append([0, 0])
+                stack.append((idx[~left], node, 1))
+                stack.append((idx[left], node, 0))
+            if parent >= 0:
+                children[parent][side] = node
+        return (
+            np.array(normals, dtype=np.float64).reshape(-1, X.shape[1]),
+            np.array(offsets, dtype=np.float64),
+            np.array(children, dtype=np.int64).reshape(-1, 2),
+            np.array(leaf_starts, dtype=np.int64),
+            np.concatenate(leaf_items).astype(np.int64) if leaf_items else np.empty(0, dtype=np.int64),
+        )
+
+    def _descend(self, Q: np.ndarray, node: np.ndarray, node_base: int):
+        """
+        Walk each query from its start node (tree-local id, < 0 for a leaf) down to a leaf, all
+        queries together. Returns (local leaf ids, visited nodes, |margins|), the last two with
+        one column per depth and -1 / inf where a query had already reached its leaf.
+        """
+        node = node.copy()
+        visited, margins = [], []
+        active = node >= 0
+        while active.any():
+            rows = np.flatnonzero(active)
+            cur = node[rows] + node_base
+            # Random halving nodes have a zero normal and send every query left
+            margin = np.einsum('ij,ij->i', Q[rows], self.normals[cur]) - self.offsets[cur]
+            step_nodes = np.full(len(Q), -1, dtype=np.int64)
+            step_margins = np.full(len(Q), np.inf)
+            step_nodes[rows] = node[rows]
+            step_margins[rows] = np.abs(margin)
+            visited.append(step_nodes)
+            margins.append(step_margins)
+            node[rows] = self.children[cur, (margin > 0).astype(np.int64)]
+            active[rows] = node[rows] >= 0
+        if not visited:
+            return -node - 1, np.empty((len(Q), 0), dtype=np.int64), np.empty((len(Q), 0))
+        return -node - 1, np.stack(visited, axis=1), np.stack(margins, axis=1)
+
+    def _leaves(self, Q: np.ndarray, tree: int, probes: int = 0) -> np.ndarray:
+        """Global leaf ids (n_queries x (1 + probes)) reached in one tree; repeated ids mean fewer distinct leaves."""
+        node_base = self.tree_node_offsets[tree]
+        leaf_base = self.tree_leaf_offsets[tree]
+        n_nodes = (self.tree_node_offsets[tree + 1] if tree + 1 < self.n_trees else len(self.offsets)) - node_base
+        if n_nodes == 0:
+            return np.full((len(Q), 1), leaf_base, dtype=np.int64)
+        leaf, visited, margins = self._descend(Q, np.zeros(len(Q), dtype=np.int64), node_base)
+        leaves = [leaf]
+        if probes and visited.shape[1]:
+            # Flip the closest calls on the path, one probe each
+            order = np.argsort(margins, axis=1, kind='stable')
+            rows = np.arange(len(Q))
+            for j in range(min(probes, visited.shape[1])):
+                flip = visited[rows, order[:, j]]
+                ok = flip >= 0
+                probe = leaf.copy()
+                if ok.any():
+                    cur = flip[ok] + node_base
+                    went_right = np.einsum('ij,ij->i', Q[ok], self.normals[cur]) - self.offsets[cur] > 0
+                    start = self.children[cur, (~went_right).astype(np.int64)]
+                    probe[ok] = self._descend(Q[ok], start, node_base)[0]
+                leaves.append(probe)
+        return leaf_base + np.stack(leaves, axis=1)
+
+    def kneighbors(self, X: np.ndarray, n_neighbors: int = 10, return_distance: bool = True):
+        Q = np.asarray(X, dtype=np.float64)
+        if Q.ndim == 1:
+            Q = Q.reshape(1, -1)
+        k = min(n_neighbors, self.n_samples_fit_)
+        n_search = min(self.search_trees or self.n_trees, self.n_trees)
+        leaves = np.concatenate([self._leaves(Q, t, self.probes) for t in range(n_search)], axis=1) if n_search else np.empty((len(Q), 0), dtype=np.int64)
+        distances = np.empty((len(Q), k))
+        indices = np.empty((len(Q), k), dtype=np.int64)
+        for i, q in enumerate(Q):
+            cand = np.unique(np.concatenate([self.leaf_items[self.leaf_starts[l]:self.leaf_starts[l + 1]] for l in np.unique(leaves[i])])) if n_search else np.empty(0, dtype=np.int64)
+            if len(cand) < k:
+                cand = np.arange(self.n_samples_fit_)
+            d = np.sqrt(np.sum((self._fit_X[cand] - q) ** 2, axis=1))
+            top = np.argpartition(d, k - 1)[:k] if k < len(d) else np.arange(len(d))
+            top = top[np.argsort(d[top], kind='stable')]
+            distances[i] = d[top]
+            indices[i] = cand[top]
+        if return_distance:
+            return distances, indices
+        return indices
+
+    def save(self, path: str):
+        """Write the forest and the indexed matrix to one .npz file."""
+        params = {'n_trees': self.n_trees, 'leaf_size': self.leaf_size, 'search_trees': self.search_trees,
+                  'probes': self.probes, 'random_state': self.random_state}
+        np.savez(
+            path, params=np.array(json.dumps(params)), fit_X=self._fit_X,
+            tree_node_offsets=self.tree_node_offsets, tree_leaf_offsets=self.tree_leaf_offsets,
+            normals=self.normals, offsets=self.offsets, children=self.children,
+            leaf_starts=self.leaf_starts, leaf_items=self.leaf_items,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'RPForestIndex':
+        data = np.load(path)
+        index = cls(**json.loads(str(data['params'])))
+        index._fit_X = data['fit_X']
+        index.n_samples_fit_ = len(index._fit_X)
+        for name in ('tree_node_offsets', 'tree_leaf_offsets', 'normals', 'offsets', 'children', 'leaf_starts', 'leaf_items'):
+            setattr(index, name, data[name])
+        return index
+
+
+def recall_at_k(exact_indices: np.ndarray, approx_indices: np.ndarray) -> float:
+    """Mean fraction of each query's exact top-k found in the approximate top-k."""
+    hits = [len(set(e) & set(a)) / len(e) for e, a in zip(exact_indices, approx_indices) if len(e)]
+    return float(np.mean(hits)) if hits else 1.0
@@ -0,0 +1,127 @@
+import re
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from ml.ann import build_comp_index
+
+# Partitions smaller than this are scanned exactly instead of getting their own index
+MIN_PARTITION_INDEX_SIZE = 256
+ERA_SPAN = 5
+AGE_BUCKETS = [(0, 23, '<=23'), (24, 26, '24-26'), (27, 29, '27-29'), (30, 32, '30-32'), (33, 200, '33+')]
+
+
+def position_group(primary_position: Optional[str]) -> str:
+    """Coarse position group of a player's first listed position: C, IF, OF, DH, P or UT."""
+    positions = [p.strip() for p in re.split(r',| and ', (primary_position or '').lower()) if p.strip()]
+    first = positions[0] if positions else ''
+    if 'catcher' in first:
+        return 'C'
+    if 'pitcher' in first:
+        return 'P'
+    if 'designated hitter' in first:
+        return 'DH'
+    if 'fielder' in first:
+        return 'OF'
+    if 'baseman' in first or 'shortstop' in first:
+        return 'IF'
+    return 'UT'
+
+
+def age_bucket(age: Optional[float]) -> str:
+    if age is None or np.isnan(age):
+        return 'unknown'
+    for low, high, label in AGE_BUCKETS:
+        if low <= age <= high:
+            return label
+    return 'unknown'
+
+
+def era_start(season: Optional[int]) -> int:
+    """First season of the ERA_SPAN-year era a season falls in, -1 when unknown."""
+    return -1 if season is None or season < 0 else season // ERA_SPAN * ERA_SPAN
+
+
+class PartitionedCompIndex:
+    """
+    Comp index split into sub-indexes by (position group, era, age bucket) of each indexed
+    player's most recent season. A filtered query only searches the partitions that can match
+    and merges their neighbors by distance, so filters do not cost recall the way
+    post-filtering a global top-k does. Like ModelSnapshot, it is never mutated after build.
+    """
+
+    def __init__(self, ids: Sequence[int], X: np.ndarray, positions: Sequence[str], last_seasons: Sequence[int], age_buckets: Sequence[str]):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.X = np.asarray(X)
+        self.positions = np.asarray(positions, dtype=object)
+        self.last_seasons = np.asarray(last_seasons, dtype=np.int64)
+        self.age_buckets = np.asarray(age_buckets, dtype=object)
+        self.eras = np.array([era_start(s) for s in self.last_seasons], dtype=np.int64)
+        groups: Dict[Tuple[str, int, str], List[int]] = {}
+        for row, key in enumerate(zip(self.positions, self.eras, self.age_buckets)):
+            groups.setdefault((key[0], int(key[1]), key[2]), []).append(row)
+        self.partitions: Dict[Tuple[str, int, str], Tuple[np.ndarray, object]] = {}
+        for key, rows in groups.items():
+            rows = np.array(rows, dtype=np.int64)
+            index = build_comp_index(self.X[rows]) if len(rows) >= MIN_PARTITION_INDEX_SIZE else None
+            self.partitions[key] = (rows, index)
+        for arr in (self.ids, self.X, self.last_seasons, self.eras):
+            arr.setflags(write=False)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def keys_for(self, player_id: int) -> Optional[Tuple[str, int, str]]:
+        """(position group, era start, age bucket) of a player: its key in self.partitions."""
+        rows = np.flatnonzero(self.ids == int(player_id))
+        if not len(rows):
+            return None
+        row = rows[0]
+        return self.positions[row], int(self.eras[row]), self.age_buckets[row]
+
+    def kneighbors(self, query: np.ndarray, k: int, positions: Optional[Sequence[str]] = None,
+                   age_buckets: Optional[Sequence[str]] = None, since_season: Optional[int] = None,
+                   until_season: Optional[int] = None, exclude_ids: Sequence[int] = ()) -> List[Tuple[int, float]]:
+        """
+        Nearest (player_id, distance) pairs among players matching every given filter, nearest
+        first. Partitions whose era lies fully inside the season range use their sub-index;
+        partitions straddling a range edge are masked by season and scanned exactly.
+        """
+        q = np.asarray(query, dtype=float).reshape(1, -1)
+        exclude = {int(pid) for pid in exclude_ids}
+        fetch = k + len(exclude)
+        low = since_season if since_season is not None else -np.inf
+        high = until_season if until_season is not None else np.inf
+        cand_rows, cand_dists = [], []
+        for (pos, era, bucket), (rows, index) in self.partitions.items():
+            if positions is not None and pos not in positions:
+                continue
+            if age_buckets is not None and bucket not in age_buckets:
+                continue
+            era_low, era_high = (era, era + ERA_SPAN - 1) if era >= 0 else (-np.inf, np.inf)
+            if (since_season is not None or until_season is not None) and era < 0:
+                continue
+            if era_high < low or era_low > high:
+                continue
+            if low <= era_low and era_high <= high and index is not None:
+                dists, idx = index.kneighbors(q, n_neighbors=min(fetch, len(rows)))
+                cand_rows.append(rows[idx[0]])
+                cand_dists.append(dists[0])
+                continue
+            seasons = self.last_seasons[rows]
+            sub = rows[(seasons >= low) & (seasons <= high)]
+            if len(sub):
+                cand_rows.append(sub)
+                cand_dists.append(np.sqrt(np.sum((self.X[sub] - q) ** 2, axis=1)))
+        if not cand_rows:
+            return []
+        rows = np.concatenate(cand_rows)
+        dists = np.concatenate(cand_dists)
+        order = np.argsort(dists, kind='stable')
+        results = []
+        for i in order:
+            pid = int(self.ids[rows[i]])
+            if pid in exclude:
+                continue
+            results.append((pid, float(dists[i])))
+            if len(results) == k:
+                break
+        return results
@@ -0,0 +1,88 @@
+"""
+Binary storage format of player_features vectors.
+
+Each blob is one fixed-width record:
+
+    byte 0      format version (FEATURE_BLOB_VERSION)
+    byte 1      reserved (0)
+    bytes 2-3   n_features, uint16 little-endian
+    mask        presence bitmask, bit i = feature i present (LSB first), zero-padded to a
+                multiple of 4 bytes so the values stay 4-byte aligned
+    values      n_features float32 little-endian
+
+Records of the same width can be concatenated and read as one (rows x n_features) matrix with
+np.frombuffer, without a per-row decode.
+"""
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+FEATURE_BLOB_VERSION = 1
+HEADER_BYTES = 4
+VALUE_DTYPE = np.dtype('<f4')
+
+
+def _mask_bytes(n_features: int) -> int:
+    return -(-((n_features + 7) // 8) // 4) * 4
+
+
+def record_size(n_features: int) -> int:
+    return HEADER_BYTES + _mask_bytes(n_features) + n_features * VALUE_DTYPE.itemsize
+
+
+def encode_features(values, present: Optional[Sequence[bool]] = None) -> bytes:
+    """One feature vector (and its presence mask, default all present) as a blob."""
+    values = np.asarray(values, dtype=VALUE_DTYPE).ravel()
+    n = len(values)
+    mask = np.ones(n, dtype=bool) if present is None else np.asarray(present, dtype=bool).ravel()
+    if len(mask) != n:
+        raise ValueError(f"Presence mask has {len(mask)} entries for {n} features")
+    packed = np.zeros(_mask_bytes(n), dtype=np.uint8)
+    bits = np.packbits(mask, bitorder='little')
+    packed[:len(bits)] = bits
+    header = bytes([FEATURE_BLOB_VERSION, 0]) + int(n).to_bytes(2, 'little')
+    return header + packed.tobytes() + values.tobytes()
+
+
+def blob_width(blob: bytes) -> int:
+    """n_features of a blob, after checking its version and size."""
+    if not blob or blob[0] != FEATURE_BLOB_VERSION:
+        raise ValueError(f"Unsupported feature blob version: {blob[0] if blob else None}")
+    n = int.from_bytes(blob[2:4], 'little')
+    if len(blob) != record_size(n):
+        raise ValueError(f"Feature blob of {len(blob)} bytes does not hold {n} features")
+    return n
+
+
+def blob_matches(blob: bytes, n_features: int) -> bool:
+    """Whether blob is a current-version record of n_features features. Never raises, unlike blob_width."""
+    try:
+        return blob_width(blob) == n_features
+    except (ValueError, TypeError, IndexError):
+        return False
+
+
+def decode_features(blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """(float32 values, bool presence mask) of one blob."""
+    values, present = decode_matrix([blob])
+    return values[0], present[0]
+
+
+def decode_matrix(blobs: Sequence[bytes], n_features: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (rows x n_features float32 values, rows x n_features bool mask) from blobs of the same width,
+    read with a single np.frombuffer over their concatenation. The values array is a read-only
+    view into that buffer.
+    """
+    if n_features is None:
+        n_features = blob_width(blobs[0]) if len(blobs) else 0
+    size = record_size(n_features)
+    buf = b''.join(blobs)
+    if len(buf) != size * len(blobs):
+        raise ValueError(f"Feature blobs are not all {n_features} features wide")
+    records = np.frombuffer(buf, dtype=np.uint8).reshape(len(blobs), size)
+    if len(blobs) and (np.any(records[:, 0] != FEATURE_BLOB_VERSION)):
+        raise ValueError("Unsupported feature blob version")
+    offset = HEADER_BYTES + _mask_bytes(n_features)
+    values = np.frombuffer(buf, dtype=VALUE_DTYPE).reshape(len(blobs), size // VALUE_DTYPE.itemsize)[:, offset // VALUE_DTYPE.itemsize:]
+    present = np.unpackbits(records[:, HEADER_BYTES:offset], axis=1, bitorder='little')[:, :n_features].astype(bool)
+    return values, present
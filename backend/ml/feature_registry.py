@@ -0,0 +1,177 @@
+"""
+Declarative registry of the player feature vector.
+
+Every feature is one entry: the stat table and column it averages, whether it is a rate
+stored as a percentage, its fallback normalization range and the tools it feeds. Layouts
+('hitting', 'pitching', 'all') are concatenations of the groups below followed by the
+level_factor and age_factor slots appended at extraction time. The 'all' layout is the
+canonical one: data-driven normalization arrays are aligned on it, and other layouts find their
+ranges through canonical_positions.
+
+compile_aggregates turns a layout into one GROUP BY statement per stat table, so extraction
+averages every column inside the database. Adding a feature is one entry here.
+"""
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import func, select
+from models import (
+    StandardBattingStat, ValueBattingStat, AdvancedBattingStat, StandardPitchingStat,
+    ValuePitchingStat, AdvancedPitchingStat, StandardFieldingStat,
+)
+
+
+class Feature:
+    """One slot of the feature vector: AVG(model.column) per player (or per player and season)."""
+
+    def __init__(self, group: str, model, column: str, is_pct: bool, norm_range, tools: Sequence[str] = ()):
+        self.group = group
+        self.model = model
+        self.column = column
+        self.is_pct = is_pct
+        self.norm_min, self.norm_max = norm_range
+        self.tools = tuple(tools)
+
+    @property
+    def name(self) -> str:
+        return f"{self.group}.{self.column}"
+
+    def __repr__(self):
+        return f"Feature({self.name})"
+
+
+def _features(group, model_entries):
+    return [Feature(group, *entry) for entry in model_entries]
+
+
+# (model, column, is_percentage, fallback (min, max), tools). The ranges are rough MLB ranges;
+# data-driven normalization (BaseballMLService.compute_stat_normalization) is preferred.
+HITTING_FEATURES = _features('hitting', [
+    (StandardBattingStat, 'ba', True, (0.200, 0.350), ('contact', 'vision')),
+    (StandardBattingStat, 'obp', True, (0.250, 0.450), ('contact',)),
+    (AdvancedBattingStat, 'ev', False, (80, 100), ('contact',)),
+    (AdvancedBattingStat, 'hardh_pct', True, (20, 55), ('contact',)),
+    (AdvancedBattingStat, 'ld_pct', True, (10, 35), ('contact',)),
+    (StandardBattingStat, 'slg', True, (0.300, 0.700), ('power',)),
+    (AdvancedBattingStat, 'iso', True, (0.1, 0.35), ('power',)),
+    (AdvancedBattingStat, 'barrel_pct', True, (0, 20), ('power',)),
+    (StandardBattingStat, 'hr', False, (0, 60), ('power',)),
+    (AdvancedBattingStat, 'bb_pct', True, (5, 18), ('discipline', 'vision')),
+    (AdvancedBattingStat, 'so_pct', True, (10, 35), ('discipline', 'vision')),
+    (StandardBattingStat, 'bb', False, (10, 150), ('discipline',)),
+    (StandardBattingStat, 'so', False, (50, 250), ('discipline',)),
+    (StandardBattingStat, 'sb', False, (0, 60), ('speed', 'stealing')),
+    (ValueBattingStat, 'rbaser', False, (-10, 10)),
+])
+FIELDING_FEATURES = _features('fielding', [
+    (StandardFieldingStat, 'fld_pct', True, (0.95, 1.0), ('fielding',)),
+    (StandardFieldingStat, 'rdrs', False, (-20, 20)),
+    (StandardFieldingStat, 'rtot', False, (-20, 20)),
+    (StandardFieldingStat, 'a', False, (0, 50), ('arm_strength', 'arm_accuracy')),
+    (StandardFieldingStat, 'dp', False, (0, 50)),
+])
+PITCHING_FEATURES = _features('pitching', [
+    (AdvancedPitchingStat, 'k_pct', True, (10, 50), ('k',)),
+    (AdvancedPitchingStat, 'bb_pct', True, (2, 15), ('bb',)),
+    (AdvancedPitchingStat, 'hr_pct', True, (0, 10), ('hr',)),
+    (StandardPitchingStat, 'era', False, (1.5, 7.0), ('command',)),
+    (StandardPitchingStat, 'fip', False, (1.5, 5.0), ('command',)),
+    (StandardPitchingStat, 'whip', False, (0.8, 2.5), ('command',)),
+    (StandardPitchingStat, 'era_plus', False, (50, 250)),
+    (ValuePitchingStat, 'war', False, (0, 12), ('command',)),
+    (ValuePitchingStat, 'waa', False, (-5, 10)),
+    (ValuePitchingStat, 'raa', False, (-20, 20), ('command',)),
+    (StandardPitchingStat, 'so', False, (0, 350)),
+    (StandardPitchingStat, 'bb', False, (0, 100)),
+    (StandardPitchingStat, 'ip', False, (0, 250)),
+    (StandardPitchingStat, 'gs', False, (0, 40)),
+    (StandardPitchingStat, 'so9', False, (3, 15)),
+    (StandardPitchingStat, 'bb9', False, (1, 7)),
+    (StandardPitchingStat, 'hr9', False, (0.5, 3)),
+    (StandardPitchingStat, 'h9', False, (5, 12)),
+    (AdvancedPitchingStat, 'babip', True, (0.200, 0.350)),
+    (AdvancedPitchingStat, 'lob_pct', True, (60, 90), ('gb',)),
+    (AdvancedPitchingStat, 'era_minus', False, (40, 80), ('command',)),
+    (AdvancedPitchingStat, 'fip_minus', False, (40, 80), ('command',)),
+    (AdvancedPitchingStat, 'xfip_minus', False, (40, 80), ('command',)),
+    (AdvancedPitchingStat, 'siera', False, (2.0, 6.0), ('command',)),
+    (AdvancedPitchingStat, 'wpa', False, (-5, 10)),
+    (AdvancedPitchingStat, 're24', False, (-20, 40)),
+    (AdvancedPitchingStat, 'cwpa', False, (-5, 10)),
+])
+FEATURE_LAYOUTS: Dict[str, List[Feature]] = {
+    'hitting': HITTING_FEATURES + FIELDING_FEATURES,
+    'pitching': PITCHING_FEATURES + FIELDING_FEATURES,
+    'all': HITTING_FEATURES + FIELDING_FEATURES + PITCHING_FEATURES,
+}
+# Slots appended after the stat features: (name, fallback (min, max))
+DERIVED_SLOTS = [('level_factor', (0, 100)), ('age_factor', (0, 100))]
+
+
+def layout(mode: str) -> List[Feature]:
+    """Stat features of a mode, 'all' for unknown modes."""
+    return FEATURE_LAYOUTS.get(mode, FEATURE_LAYOUTS['all'])
+
+
+def width(mode: str) -> int:
+    """Length of a mode's feature vector, derived slots included."""
+    return len(layout(mode)) + len(DERIVED_SLOTS)
+
+
+def slot_names(mode: str) -> List[str]:
+    return [f.name for f in layout(mode)] + [name for name, _ in DERIVED_SLOTS]
+
+
+def feature_index(mode: str, name: str) -> int:
+    """Position of a feature (or derived slot) in a mode's vector, -1 if the mode does not carry it."""
+    names = slot_names(mode)
+    return names.index(name) if name in names else -1
+
+
+def canonical_positions(mode: str) -> np.ndarray:
+    """Position in the 'all' vector of every slot of a mode's vector."""
+    canonical = {name: i for i, name in enumerate(slot_names('all'))}
+    return np.array([canonical[name] for name in slot_names(mode)], dtype=np.int64)
+
+
+def fallback_ranges(mode: str = 'all'):
+    """(mins, maxs) arrays of the registry's normalization ranges for a mode's vector."""
+    ranges = [(f.norm_min, f.norm_max) for f in layout(mode)] + [r for _, r in DERIVED_SLOTS]
+    return np.array([r[0] for r in ranges], dtype=float), np.array([r[1] for r in ranges], dtype=float)
+
+
+def is_pct_mask(mode: str) -> np.ndarray:
+    return np.array([f.is_pct for f in layout(mode)], dtype=bool)
+
+
+def tool_members(mode: str) -> Dict[str, List[int]]:
+    """Each tool named by a mode's features: positions of its member features, in layout order."""
+    tools: Dict[str, List[int]] = {}
+    for i, feature in enumerate(layout(mode)):
+        for tool in feature.tools:
+            tools.setdefault(tool, []).append(i)
+    return tools
+
+
+def compile_aggregates(mode: str, by_season: bool = False, player_ids: Optional[Sequence[int]] = None,
+                       season: Optional[int] = None):
+    """
+    One GROUP BY statement per stat table reading every column of a mode's layout. Each
+    statement selects player_id, (season,) COUNT(*) and AVG(column) per column; returns
+    (model, [[layout positions of column] per column], statement). Columns a model does not
+    define (e.g. barrel_pct) are left out and stay missing for everyone.
+    """
+    positions_by_model: Dict[type, Dict[str, List[int]]] = {}
+    for i, feature in enumerate(layout(mode)):
+        if hasattr(feature.model, feature.column):
+            positions_by_model.setdefault(feature.model, {}).setdefault(feature.column, []).append(i)
+    compiled = []
+    for model, columns in positions_by_model.items():
+        keys = [model.player_id, model.season] if by_season else [model.player_id]
+        stmt = select(*keys, func.count(), *[func.avg(getattr(model, c)) for c in columns])
+        stmt = stmt.where(model.player_id.isnot(None))
+        if player_ids is not None:
+            stmt = stmt.where(model.player_id.in_(list(player_ids)))
+        if season is not None:
+            stmt = stmt.where(model.season == str(season))
+        compiled.append((model, list(columns.values()), stmt.group_by(*keys)))
+    return compiled
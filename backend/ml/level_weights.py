@@ -0,0 +1,136 @@
+"""
+Data-driven level weights: how a minor-league level's production compares with MLB's.
+
+Each role reads one stat table with a single windowed query. ROW_NUMBER over player_id ordered
+by season marks every player's latest row, and ROW_NUMBER over (player_id, season) keeps one row
+per player-season. Rows without meaningful playing time are dropped. The per-level means of the
+role's metrics are then grouped in pandas:
+
+- 'weights': players' latest rows grouped by their current level (Player.level)
+- 'seasons': every player-season row grouped by season and by the level of the row
+
+A level's weight for a role is a weighted mean of its metric ratios to the MLB means (MLB itself
+is 1.0), clamped to 0.1-1.0. 'combined' averages the batting and pitching weights of a level.
+
+Results carry data_hash, a fingerprint of the input rows. BaseballMLService stores them in
+LevelWeights under that hash and reuses them until the data changes.
+"""
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from models import Player, StandardBattingStat, StandardPitchingStat
+
+LEVEL_WEIGHTS_FORMAT_VERSION = 1
+LEVELS = ['MLB', 'AAA', 'AA', 'A+', 'A', 'Rk']
+MINOR_LEVELS = LEVELS[1:]
+MIN_WEIGHT, MAX_WEIGHT = 0.1, 1.0
+DEFAULT_WEIGHT = 0.5
+
+# role: (stat table, metrics averaged per level, playing-time column, minimum playing time)
+ROLES = {
+    'batting': (StandardBattingStat, ['ba', 'obp', 'slg', 'hr', 'bb', 'so', 'sb'], 'pa', 50),
+    'pitching': (StandardPitchingStat, ['era', 'so', 'bb', 'era_plus', 'whip'], 'ip', 10),
+}
+# role: [(metric, inverted)]; a metric's ratio is level / MLB, or MLB / level when inverted
+RATIO_METRICS = {
+    'batting': [('ba', False), ('obp', False), ('slg', False), ('hr', False), ('bb', False), ('sb', False), ('so', False)],
+    'pitching': [('bb', True), ('era', False), ('so', True)],
+}
+
+
+def data_hash(db: Session) -> str:
+    """Fingerprint of the rows the weights are computed from: stat table sizes and playing time, players per level."""
+    parts = [f"v{LEVEL_WEIGHTS_FORMAT_VERSION}"]
+    for model, _, playing_time, _ in ROLES.values():
+        count, max_id, total = db.query(func.count(model.id), func.max(model.id), func.sum(getattr(model, playing_time))).one()
+        parts.append(f"{model.__tablename__}:{count}:{max_id or 0}:{float(total or 0.0):.3f}")
+    for level, count in db.query(Player.level, func.count(Player.id)).group_by(Player.level).order_by(Player.level).all():
+        parts.append(f"{level}:{count}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def _role_frame(db: Session, role: str) -> pd.DataFrame:
+    """One row per player-season of a role's stat table with enough playing time, ranked by recency."""
+    model, metrics, playing_time, minimum = ROLES[role]
+    columns = [model.player_id, model.season, model.level.label('row_level')]
+    columns += [getattr(model, name) for name in dict.fromkeys(metrics + [playing_time])]
+    latest = func.row_number().over(partition_by=model.player_id, order_by=(model.season.desc(), model.id))
+    in_season = func.row_number().over(partition_by=(model.player_id, model.season), order_by=model.id)
+    ranked = select(*columns, latest.label('latest_rank'), in_season.label('season_rank')).where(model.player_id.isnot(None)).subquery()
+    stmt = (select(ranked, Player.level.label('player_level'))
+            .join(Player, Player.id == ranked.c.player_id)
+            .where(ranked.c.season_rank == 1))
+    result = db.execute(stmt)
+    frame = pd.DataFrame(result.all(), columns=list(result.keys()))
+    for name in dict.fromkeys(metrics + [playing_time]):
+        frame[name] = pd.to_numeric(frame[name], errors='coerce')
+    return frame[frame[playing_time] > minimum]
+
+
+def _level_means(frame: pd.DataFrame, metrics, by) -> pd.DataFrame:
+    """Mean of each metric's positive values per group (zeros and missing values do not count)."""
+    values = frame[metrics].where(frame[metrics] > 0)
+    return values.groupby([frame[key] for key in by]).mean()
+
+
+def _performance_ratio(level_means: pd.Series, mlb_means: pd.Series, ratio_metrics) -> float:
+    ratios = []
+    for metric, inverted in ratio_metrics:
+        level_value, mlb_value = level_means.get(metric, np.nan), mlb_means.get(metric, np.nan)
+        numerator, denominator = (mlb_value, level_value) if inverted else (level_value, mlb_value)
+        if np.isfinite(numerator) and np.isfinite(denominator) and denominator > 0:
+            ratios.append(numerator / denominator)
+    if not ratios:
+        return DEFAULT_WEIGHT
+    return float(np.clip(np.mean(ratios), MIN_WEIGHT, MAX_WEIGHT))
+
+
+def _role_weights(means: pd.DataFrame, role: str) -> Dict[str, float]:
+    """Weights of the levels in a per-level means frame; empty without MLB rows to compare with."""
+    if 'MLB' not in means.index or means.loc['MLB'].isna().all():
+        return {}
+    weights = {'MLB': 1.0}
+    for level in MINOR_LEVELS:
+        if level in means.index and not means.loc[level].isna().all():
+            weights[level] = _performance_ratio(means.loc[level], means.loc['MLB'], RATIO_METRICS[role])
+    return weights
+
+
+def _combine(batting: Dict[str, float], pitching: Dict[str, float]) -> Dict[str, float]:
+    combined = dict(batting)
+    for level, weight in pitching.items():
+        combined[level] = (combined[level] + weight) / 2 if level in combined else weight
+    combined['MLB'] = 1.0
+    return {level: float(np.clip(weight, MIN_WEIGHT, MAX_WEIGHT)) for level, weight in combined.items()}
+
+
+def compute_level_weights(db: Session, hash_value: Optional[str] = None) -> Dict:
+    """
+    {'data_hash', 'weights': {role: {level: weight}}, 'seasons': {season: {role: {level: weight}}}}
+    with roles 'batting', 'pitching' and 'combined'.
+    """
+    overall, by_season = {}, {}
+    for role, (_, metrics, _, _) in ROLES.items():
+        frame = _role_frame(db, role)
+        latest = frame[(frame['latest_rank'] == 1) & frame['player_level'].isin(LEVELS)]
+        overall[role] = _role_weights(_level_means(latest, metrics, ['player_level']), role)
+        seasonal = frame[frame['season'].notna()].copy()
+        seasonal['level'] = seasonal['row_level'].fillna(seasonal['player_level'])
+        seasonal = seasonal[seasonal['level'].isin(LEVELS)]
+        means = _level_means(seasonal, metrics, ['season', 'level'])
+        for season in means.index.get_level_values(0).unique():
+            weights = _role_weights(means.loc[season], role)
+            if weights:
+                by_season.setdefault(str(season), {})[role] = weights
+    overall['combined'] = _combine(overall['batting'], overall['pitching'])
+    for roles in by_season.values():
+        roles['combined'] = _combine(roles.get('batting', {}), roles.get('pitching', {}))
+    return {
+        'format_version': LEVEL_WEIGHTS_FORMAT_VERSION,
+        'data_hash': hash_value or data_hash(db),
+        'weights': overall,
+        'seasons': dict(sorted(by_season.items())),
+    }
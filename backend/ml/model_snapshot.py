@@ -0,0 +1,68 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# Fields of one fitted model generation. The names match the keys persisted in model bundles.
+SNAPSHOT_FIELDS = (
+    'scaler_hit', 'knn_model_hit', 'pca_hit', 'pca_weights_hit', 'hitter_ids', 'Xh_scaled',
+    'scaler_pit', 'knn_model_pit', 'pca_pit', 'pca_weights_pit', 'pitcher_ids', 'Xp_scaled',
+    'overall_rating_model', 'metrics',
+    'comp_partitions_hit', 'comp_partitions_pit',
+)
+
+
+class ModelSnapshot:
+    """
+    One complete generation of fitted comp/rating models (scalers, KNN indexes and their
+    partitioned variants, PCA, the RandomForest and its metrics), plus the version identifiers
+    it was published under.
+
+    A snapshot is never mutated after construction: refits and incremental index updates
+    build a new one (see replace) and the service publishes it with a single reference swap,
+    so a request that reads the service's snapshot once sees a consistent scaler/index/ids set.
+    """
+
+    __slots__ = SNAPSHOT_FIELDS + ('model_version', 'data_version')
+
+    def __init__(self, model_version: Optional[str] = None, data_version: Optional[str] = None, **fields):
+        unknown = set(fields) - set(SNAPSHOT_FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown snapshot fields: {sorted(unknown)}")
+        for name in SNAPSHOT_FIELDS:
+            value = fields.get(name)
+            if name in ('hitter_ids', 'pitcher_ids') and value is not None:
+                value = tuple(int(pid) for pid in value)
+            elif name in ('Xh_scaled', 'Xp_scaled') and value is not None:
+                value = np.asarray(value)
+                value.setflags(write=False)
+            elif name == 'metrics':
+                value = dict(value or {"rmse": None, "r2": None})
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, 'model_version', model_version)
+        object.__setattr__(self, 'data_version', data_version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ModelSnapshot is immutable; use replace() to derive a new one")
+
+    def replace(self, **changes) -> 'ModelSnapshot':
+        """A new snapshot with the given fields changed."""
+        values = self.state()
+        values.update({k: v for k, v in changes.items() if k in SNAPSHOT_FIELDS})
+        return ModelSnapshot(
+            model_version=changes.get('model_version', self.model_version),
+            data_version=changes.get('data_version', self.data_version),
+            **values,
+        )
+
+    def state(self) -> Dict:
+        """Fitted fields that are set, keyed like the persisted bundle state."""
+        return {name: getattr(self, name) for name in SNAPSHOT_FIELDS if getattr(self, name) is not None}
+
+    def comp_partitions(self, mode: str):
+        """Partitioned (position/era/age) comp index of the hitting or pitching model, if built."""
+        return self.comp_partitions_pit if mode == 'pitching' else self.comp_partitions_hit
+
+    def comp_model(self, mode: str) -> Tuple:
+        """(scaler, knn index, indexed player ids, scaled matrix) of the hitting or pitching comp model."""
+        if mode == 'pitching':
+            return self.scaler_pit, self.knn_model_pit, self.pitcher_ids, self.Xp_scaled
+        return self.scaler_hit, self.knn_model_hit, self.hitter_ids, self.Xh_scaled
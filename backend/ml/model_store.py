@@ -0,0 +1,81 @@
+import os
+import hashlib
+import datetime
+import joblib
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import Player, STAT_MODELS, DataVersion, STATS_VERSION_KEY
+
+# Bump when the bundle layout changes; older bundles are then ignored rather than half-loaded
+BUNDLE_FORMAT_VERSION = 1
+ARTIFACT_DIR = os.getenv('ML_ARTIFACT_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ml_artifacts'))
+LATEST_POINTER = 'LATEST'
+
+# Service-level state saved alongside the model snapshot fields (ml.model_snapshot.SNAPSHOT_FIELDS)
+SERVICE_ATTRS = ['data_driven_mins', 'data_driven_maxs', 'data_driven_level_weights', 'level_weight_table']
+
+
+def compute_data_version(db: Session) -> str:
+    """
+    Fingerprint of the player and stat tables: row count and max id per table, plus the 'stats'
+    change counter, which every ORM insert, update or delete of those rows moves (so corrections
+    and delete-and-reinsert cycles that keep the counts change it too).
+    """
+    parts = []
+    for model in (Player,) + tuple(STAT_MODELS):
+        count, max_id = db.query(func.count(model.id), func.max(model.id)).one()
+        parts.append(f"{model.__tablename__}:{count}:{max_id or 0}")
+    stats_version = db.query(DataVersion.version).filter(DataVersion.key == STATS_VERSION_KEY).scalar()
+    parts.append(f"{STATS_VERSION_KEY}:{stats_version or 0}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def save_bundle(service, snapshot, db: Session, artifact_dir: Optional[str] = None) -> Dict:
+    """Write a model snapshot and the service's normalization state as a versioned bundle and point LATEST at it."""
+    artifact_dir = artifact_dir or ARTIFACT_DIR
+    os.makedirs(artifact_dir, exist_ok=True)
+    saved_at = datetime.datetime.utcnow()
+    meta = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'model_version': snapshot.model_version or saved_at.strftime('%Y%m%d%H%M%S'),
+        'trained_at': saved_at.isoformat(),
+        'data_version': snapshot.data_version or compute_data_version(db),
+    }
+    state = dict(snapshot.state())
+    state.update({attr: getattr(service, attr) for attr in SERVICE_ATTRS if hasattr(service, attr)})
+    filename = f"ml_models_{meta['model_version']}.joblib"
+    path = os.path.join(artifact_dir, filename)
+    joblib.dump({'meta': meta, 'state': state}, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    # The pointer is swapped last so a reader never sees a partially written bundle
+    pointer = os.path.join(artifact_dir, LATEST_POINTER)
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(filename)
+    os.replace(pointer + '.tmp', pointer)
+    print(f"[ML] Saved model bundle {meta['model_version']} (data version {meta['data_version']}) to {path}")
+    return meta
+
+
+def load_bundle(artifact_dir: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> Optional[Dict]:
+    """
+    Read the bundle LATEST points at. Returns {'meta', 'state'} or None if there is no usable bundle.
+    With mmap_mode='r' (the default) the NumPy arrays inside the models (KNN trees, forest
+    nodes, comp matrices) are read-only maps of the bundle file, so worker processes share
+    their pages instead of each holding a copy.
+    """
+    artifact_dir = artifact_dir or ARTIFACT_DIR
+    pointer = os.path.join(artifact_dir, LATEST_POINTER)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        path = os.path.join(artifact_dir, f.read().strip())
+    try:
+        bundle = joblib.load(path, mmap_mode=mmap_mode)
+    except (FileNotFoundError, EOFError) as e:
+        print(f"[ML] Could not read model bundle {path}: {e}")
+        return None
+    if bundle.get('meta', {}).get('format_version') != BUNDLE_FORMAT_VERSION:
+        print(f"[ML] Ignoring model bundle {path}: unsupported format version")
+        return None
+    return bundle
@@ -0,0 +1,142 @@
+"""
+Process-pool driver for BaseballMLService.extract_features_bulk.
+
+Player ids are split into chunks, and each chunk is extracted in a worker process. Each
+worker has its own SQLAlchemy engine and session, built in the pool initializer from the
+parent's database URL. Every task carries the parent's normalization and level-weight state,
+so each chunk is computed exactly as the parent would compute it. The parent concatenates the
+partial matrices. Each worker runs the per-table GROUP BY queries for its chunk, so on
+PostgreSQL the chunks run concurrently on separate backends.
+
+The pool is started on first use and kept for later calls, because starting workers (each
+imports ml_service) costs more than extracting a chunk. shutdown_pool stops it; it also runs
+at exit.
+
+Small populations, a single worker, or an in-memory SQLite database (which other processes
+cannot see) fall back to the serial extract_features_bulk call.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from models import Player
+from ml import model_store
+
+EXTRACT_WORKERS = int(os.getenv('ML_EXTRACT_WORKERS', str(min(8, os.cpu_count() or 1))))
+EXTRACT_CHUNK_SIZE = int(os.getenv('ML_EXTRACT_CHUNK_SIZE', '1000'))
+# 'spawn' keeps workers clear of the parent's threads and open connections; 'fork' starts faster
+EXTRACT_START_METHOD = os.getenv('ML_EXTRACT_START_METHOD', 'spawn')
+BULK_ARRAYS = ('player_ids', 'raw', 'normalized', 'present', 'level_factor', 'confidence')
+
+# Per-worker state, set by _init_worker
+_worker_sessions = None
+_worker_service = None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(database_url: str):
+    global _worker_sessions, _worker_service
+    # Imported here, in the worker: ml_service imports this module
+    from ml_service import ml_service
+    import database
+    # A forked child must not touch the pooled connections it inherited from the parent
+    database.engine.dispose(close=False)
+    _worker_service = ml_service
+    _worker_sessions = sessionmaker(bind=create_engine(database_url), autocommit=False, autoflush=False)
+
+
+def _extract_chunk(player_ids: List[int], mode: str, season: Optional[int], service_state: Dict) -> Optional[dict]:
+    for attr in model_store.SERVICE_ATTRS:
+        if attr in service_state:
+            setattr(_worker_service, attr, service_state[attr])
+        elif hasattr(_worker_service, attr):
+            delattr(_worker_service, attr)
+    db = _worker_sessions()
+    try:
+        return _worker_service.extract_features_bulk(db, player_ids=player_ids, mode=mode, season=season)
+    finally:
+        db.close()
+
+
+def _get_pool(database_url: str, workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_key
+    key = (database_url, workers, EXTRACT_START_METHOD)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(EXTRACT_START_METHOD),
+                                        initializer=_init_worker, initargs=(database_url,))
+            _pool_key = key
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the worker processes; the next parallel extraction starts a new pool."""
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool, _pool_key = None, None
+
+
+atexit.register(shutdown_pool)
+
+
+def merge_bulk(parts: Sequence[Optional[dict]]) -> Optional[dict]:
+    """Concatenate extract_features_bulk results of disjoint player chunks, in order."""
+    parts = [p for p in parts if p is not None]
+    if not parts:
+        return None
+    merged = {name: np.concatenate([p[name] for p in parts]) for name in BULK_ARRAYS}
+    merged["level"] = [level for p in parts for level in p["level"]]
+    return merged
+
+
+def _shareable_url(db: Session) -> Optional[str]:
+    url = db.get_bind().url
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return None
+    return url.render_as_string(hide_password=False)
+
+
+def extract_features(service, db: Session, player_ids: Optional[List[int]] = None, mode: str = 'all',
+                     season: Optional[int] = None, workers: Optional[int] = None,
+                     chunk_size: Optional[int] = None) -> Optional[dict]:
+    """extract_features_bulk for player_ids (everyone when None) in a pool of worker processes."""
+    workers = workers or EXTRACT_WORKERS
+    chunk_size = chunk_size or EXTRACT_CHUNK_SIZE
+    if player_ids is None:
+        ids = [pid for (pid,) in db.query(Player.id).order_by(Player.id).all() if isinstance(pid, int)]
+    else:
+        ids = [int(pid) for pid in player_ids]
+    database_url = _shareable_url(db)
+    if workers <= 1 or len(ids) <= chunk_size or database_url is None:
+        return service.extract_features_bulk(db, player_ids=player_ids, mode=mode, season=season)
+    start = time.time()
+    # At most chunk_size players per task, and at least one task per worker
+    size = min(chunk_size, -(-len(ids) // workers))
+    chunks = [ids[i:i + size] for i in range(0, len(ids), size)]
+    state = {attr: getattr(service, attr) for attr in model_store.SERVICE_ATTRS if hasattr(service, attr)}
+    pool = _get_pool(database_url, workers)
+    try:
+        parts = list(pool.map(_extract_chunk, chunks, repeat(mode), repeat(season), repeat(state)))
+    except BrokenProcessPool:
+        # A worker died; drop the pool so the next call starts a fresh one
+        shutdown_pool()
+        raise
+    merged = merge_bulk(parts)
+    elapsed = time.time() - start
+    print(f"[PERF] Parallel extraction ({mode}) of {len(ids)} players in {len(chunks)} chunks on {workers} workers took {elapsed:.2f}s")
+    return merged
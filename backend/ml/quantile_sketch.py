@@ -0,0 +1,172 @@
+"""
+Mergeable streaming quantile sketches for feature normalization.
+
+QuantileSketch is a KLL sketch: a stack of compactors where an item at level h stands for
+2**h input values. When a level outgrows its capacity it is sorted and every other item moves
+up a level, so memory stays O(k log(n / k)) and the rank error around 1/k whatever the stream
+length. Two sketches of disjoint data merge by concatenating their levels and compacting, so
+worker chunks can be sketched independently and combined. Until the first compaction the
+sketch holds every value and quantile() equals np.percentile (linear interpolation).
+
+Compaction offsets alternate per level instead of being drawn at random, so the same values
+in the same order always give the same ranges.
+
+CohortSketches keeps one sketch per feature column for each cohort ('all', 'level:AAA',
+'position:IF', ...) plus the ids of the players it has seen, and is saved with joblib so later
+runs can add new players without re-reading everyone. Values cannot be removed, so a player's
+changed or new seasons only reach the sketches through a full rebuild.
+"""
+import os
+import joblib
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_K = 200
+SKETCH_FORMAT_VERSION = 1
+
+
+class QuantileSketch:
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.compactions: List[int] = [0]
+
+    @property
+    def n(self) -> int:
+        """Number of values the sketch stands for."""
+        return int(sum(len(items) << h for h, items in enumerate(self.levels)))
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def update(self, values) -> 'QuantileSketch':
+        """Add values (NaNs are skipped)."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Fold another sketch (of disjoint data) into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+            self.compactions.append(0)
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+            self.compactions[h] += other.compactions[h]
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                items = np.sort(items)
+                # An odd item out stays behind at this level
+                keep = items[:1] if len(items) % 2 else items[:0]
+                pairs = items[len(keep):]
+                offset = self.compactions[h] % 2
+                self.compactions[h] += 1
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                    self.compactions.append(0)
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], pairs[offset::2]])
+            h += 1
+
+    def quantile(self, q):
+        """Value at quantile q (0-1, scalar or array); NaN when the sketch is empty."""
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float('nan')
+        weights = np.concatenate([np.full(len(items), float(1 << h)) for h, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, weights = items[order], weights[order]
+        # Rank at the centre of each item's weight; with unit weights this is 0..n-1, as in np.percentile
+        centers = np.cumsum(weights) - weights / 2.0 - 0.5
+        result = np.interp(np.asarray(q, dtype=float) * (weights.sum() - 1), centers, items)
+        return result if np.ndim(q) else float(result)
+
+    def percentile(self, p):
+        return self.quantile(np.asarray(p, dtype=float) / 100.0)
+
+
+class CohortSketches:
+    """Per-cohort, per-column quantile sketches of a feature matrix, plus the player ids they include."""
+
+    def __init__(self, n_features: int, k: int = DEFAULT_K):
+        self.n_features = n_features
+        self.k = k
+        self.cohorts: Dict[str, List[QuantileSketch]] = {}
+        self.player_ids = set()
+
+    def _sketches(self, cohort: str) -> List[QuantileSketch]:
+        if cohort not in self.cohorts:
+            self.cohorts[cohort] = [QuantileSketch(self.k) for _ in range(self.n_features)]
+        return self.cohorts[cohort]
+
+    def update(self, player_ids: Sequence[int], matrix: np.ndarray, include: np.ndarray,
+               cohorts_by_row: Sequence[Iterable[str]]):
+        """
+        Add the rows of a player x feature matrix. include masks the values that count
+        (missing or excluded values are False); cohorts_by_row lists the cohorts of each row
+        besides 'all'.
+        """
+        matrix = np.where(include, np.asarray(matrix, dtype=float), np.nan)
+        groups: Dict[str, List[int]] = {'all': list(range(len(player_ids)))}
+        for row, cohorts in enumerate(cohorts_by_row):
+            for cohort in cohorts:
+                groups.setdefault(cohort, []).append(row)
+        for cohort, rows in groups.items():
+            block = matrix[rows]
+            for col, sketch in enumerate(self._sketches(cohort)):
+                sketch.update(block[:, col])
+        self.player_ids.update(int(pid) for pid in player_ids)
+        return self
+
+    def merge(self, other: 'CohortSketches') -> 'CohortSketches':
+        if other.n_features != self.n_features:
+            raise ValueError(f"Cannot merge sketches of {other.n_features} features into {self.n_features}")
+        for cohort, sketches in other.cohorts.items():
+            for mine, theirs in zip(self._sketches(cohort), sketches):
+                mine.merge(theirs)
+        self.player_ids.update(other.player_ids)
+        return self
+
+    def ranges(self, cohort: str = 'all', low: float = 10, high: float = 90) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(mins, maxs) at the low/high percentiles of each column; 0/1 for empty columns, None for an unknown cohort."""
+        if cohort not in self.cohorts:
+            return None
+        mins = np.array([s.percentile(low) if s.n else 0.0 for s in self.cohorts[cohort]])
+        maxs = np.array([s.percentile(high) if s.n else 1.0 for s in self.cohorts[cohort]])
+        return mins, maxs
+
+
+def save_sketches(sketches: CohortSketches, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    joblib.dump({'format_version': SKETCH_FORMAT_VERSION, 'sketches': sketches}, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def load_sketches(path: str, n_features: Optional[int] = None) -> Optional[CohortSketches]:
+    """Saved sketches, or None when missing, of another format or of a different feature width."""
+    if not os.path.exists(path):
+        return None
+    try:
+        saved = joblib.load(path)
+    except (EOFError, ValueError) as e:
+        print(f"[ML] Could not read normalization sketches {path}: {e}")
+        return None
+    if saved.get('format_version') != SKETCH_FORMAT_VERSION:
+        return None
+    sketches = saved['sketches']
+    if n_features is not None and sketches.n_features != n_features:
+        return None
+    return sketches
@@ -0,0 +1,139 @@
+"""
+Matrix form of BaseballMLService.calculate_mlb_show_ratings: every tool grade, overall,
+potential and confidence for a whole population at once. Grades and tools are looked up by
+feature name and tool membership in ml.feature_registry, so the same functions read any layout.
+"""
+import numpy as np
+from typing import Dict, List
+from ml import feature_registry
+
+DEFAULT_TOOL = 40.0
+
+# Show grade -> feature it reads
+HITTER_GRADE_FEATURES = {
+    'contact_left': 'hitting.ba', 'contact_right': 'hitting.ba',
+    'power_left': 'hitting.slg', 'power_right': 'hitting.slg',
+    'vision': 'hitting.bb_pct', 'discipline': 'hitting.so_pct',
+    'fielding': 'fielding.fld_pct', 'arm_strength': 'fielding.a', 'arm_accuracy': 'fielding.a',
+    'speed': 'hitting.sb', 'stealing': 'hitting.sb',
+}
+HITTER_GRADE_COLUMNS = list(HITTER_GRADE_FEATURES)
+HITTER_OVERALL_WEIGHTS = np.array([0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.05, 0.05, 0.1, 0.05])
+# Pitcher grade -> (registry tool, inverted); a tool's grade is the mean of its member features
+PITCHER_GRADE_TOOLS = {
+    'k_rating': ('k', False), 'bb_rating': ('bb', True), 'gb_rating': ('gb', False),
+    'hr_rating': ('hr', True), 'command_rating': ('command', False),
+}
+# k, bb, gb, hr, command, then fielding, arm_strength, speed, stealing
+PITCHER_OVERALL_WEIGHTS = np.array([0.2, 0.2, 0.1, 0.1, 0.2, 0.05, 0.05, 0.05, 0.05])
+PITCHER_OVERALL_HITTER_GRADES = ['fielding', 'arm_strength', 'speed', 'stealing']
+# Tools averaged (top N) into a season overall
+SEASON_TOOLS = {
+    'hitting': (['contact', 'power', 'discipline', 'vision', 'fielding', 'arm_strength', 'arm_accuracy', 'speed', 'stealing'], 4),
+    'pitching': (['k', 'bb', 'gb', 'hr', 'command'], 3),
+}
+
+
+def feature_columns(normalized: np.ndarray, positions: List[int], present: np.ndarray = None, clip: bool = True) -> np.ndarray:
+    """Columns at the given layout positions (clipped to 0-99), DEFAULT_TOOL where missing or at position -1."""
+    out = np.full((normalized.shape[0], len(positions)), DEFAULT_TOOL)
+    positions = np.asarray(positions, dtype=np.int64)
+    ok = positions >= 0
+    values = normalized[:, positions[ok]]
+    if clip:
+        values = np.clip(values, 0, 99)
+    out[:, ok] = values if present is None else np.where(present[:, positions[ok]], values, DEFAULT_TOOL)
+    return out
+
+
+def tool_values(normalized: np.ndarray, mode: str, present: np.ndarray = None, clip: bool = True) -> Dict[str, np.ndarray]:
+    """Every tool of a mode's layout: mean of its member features."""
+    return {
+        tool: feature_columns(normalized, members, present, clip).mean(axis=1)
+        for tool, members in feature_registry.tool_members(mode).items()
+    }
+
+
+def _tool(tools: Dict[str, np.ndarray], name: str, n_rows: int) -> np.ndarray:
+    return tools[name] if name in tools else np.full(n_rows, DEFAULT_TOOL)
+
+
+def hitter_grades(normalized: np.ndarray, mode: str = 'all', present: np.ndarray = None) -> Dict[str, np.ndarray]:
+    positions = [feature_registry.feature_index(mode, name) for name in HITTER_GRADE_FEATURES.values()]
+    columns = feature_columns(normalized, positions, present)
+    return {grade: columns[:, i] for i, grade in enumerate(HITTER_GRADE_FEATURES)}
+
+
+def pitcher_grades(normalized: np.ndarray, mode: str = 'all', present: np.ndarray = None) -> Dict[str, np.ndarray]:
+    tools = tool_values(normalized, mode, present)
+    grades = {}
+    for grade, (tool, inverted) in PITCHER_GRADE_TOOLS.items():
+        values = _tool(tools, tool, normalized.shape[0])
+        grades[grade] = 100 - values if inverted else values
+    return grades
+
+
+def season_overalls(normalized: np.ndarray, mode: str) -> np.ndarray:
+    """Per-row overall of a (seasons x features) normalized matrix: mean of the top hitting (4) or pitching (3) tools."""
+    if mode not in SEASON_TOOLS:
+        return np.full(normalized.shape[0], DEFAULT_TOOL)
+    names, top_n = SEASON_TOOLS[mode]
+    tools = tool_values(normalized, mode, clip=False)
+    matrix = np.column_stack([_tool(tools, name, normalized.shape[0]) for name in names])
+    top_tools = -np.sort(-matrix, axis=1)[:, :top_n]
+    return top_tools.mean(axis=1)
+
+
+def _weighted_overall(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    return np.clip((values * weights).sum(axis=1) / weights.sum(), 0, 99)
+
+
+def hitter_overall(hitter: Dict[str, np.ndarray]) -> np.ndarray:
+    return _weighted_overall(np.column_stack([hitter[g] for g in HITTER_GRADE_COLUMNS]), HITTER_OVERALL_WEIGHTS)
+
+
+def pitcher_overall(pitcher: Dict[str, np.ndarray], hitter: Dict[str, np.ndarray]) -> np.ndarray:
+    values = np.column_stack([pitcher[g] for g in PITCHER_GRADE_TOOLS] + [hitter[g] for g in PITCHER_OVERALL_HITTER_GRADES])
+    return _weighted_overall(values, PITCHER_OVERALL_WEIGHTS)
+
+
+def potential_from_history(first: np.ndarray, last: np.ndarray, count: np.ndarray, overall: np.ndarray) -> np.ndarray:
+    """Last overall plus two seasons of the average yearly trend; the current overall without a trend."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        trend = (last - first) / np.maximum(count - 1, 1)
+    return np.where(count > 1, np.clip(last + trend * 2, 0, 99), overall)
+
+
+def compute_ratings(normalized: np.ndarray, present: np.ndarray, player_types: np.ndarray,
+                    history_first: np.ndarray, history_last: np.ndarray, history_count: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Ratings for every row of an 'all'-layout feature matrix. player_types holds
+    'pitcher' / 'two_way' / 'position_player' per row; the history arrays describe each row's
+    recent primary-mode overalls (first, last, number of seasons).
+    """
+    hitter = hitter_grades(normalized, 'all', present)
+    pitcher = pitcher_grades(normalized, 'all', present)
+    hit = hitter_overall(hitter)
+    pit = pitcher_overall(pitcher, hitter)
+    overall = np.select(
+        [player_types == 'pitcher', player_types == 'two_way'],
+        [pit, np.clip((hit + pit) / 2, 0, 99)],
+        default=hit,
+    )
+    grades = dict(hitter)
+    grades.update(pitcher)
+    return {
+        'grades': grades,
+        'overall_rating': overall,
+        'potential_rating': potential_from_history(history_first, history_last, history_count, overall),
+        'confidence_score': np.clip(100 - normalized.std(axis=1), 0, 100),
+    }
+
+
+def mode_summary(normalized: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-mode overall/potential/confidence reported in two-way players' hitting and pitching grades."""
+    return {
+        'overall_rating': np.clip(normalized.mean(axis=1), 0, 99),
+        'potential_rating': np.clip(normalized.max(axis=1), 0, 99),
+        'confidence_score': np.clip(100 - normalized.std(axis=1), 0, 100),
+    }
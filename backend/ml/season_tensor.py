@@ -0,0 +1,54 @@
+import numpy as np
+from typing import Dict, List
+
+
+class SeasonFeatureTensor:
+    """
+    Player x season x feature tensor for one extraction mode ('hitting' or 'pitching').
+
+    Stored sparsely: one row per (player, season) the player actually has stats for, with the
+    rows of each player contiguous (CSR layout). offsets[i]:offsets[i + 1] is the block of the
+    i-th player in player_ids, and row_seasons labels every row. Slicing a player's history is a
+    dict lookup plus an array slice, with no database access.
+    """
+
+    def __init__(self, mode: str, player_ids: np.ndarray, offsets: np.ndarray, row_seasons: np.ndarray,
+                 raw: np.ndarray, normalized: np.ndarray, present: np.ndarray,
+                 empty_normalized: np.ndarray, series: Dict[int, List[str]]):
+        self.mode = mode
+        self.player_ids = player_ids
+        self.offsets = offsets
+        self.row_seasons = row_seasons
+        self.raw = raw
+        self.normalized = normalized
+        self.present = present
+        # Normalized vector for a season with no stat rows (only level/age slots present)
+        self.empty_normalized = empty_normalized
+        # Seasons of the player's standard batting/pitching rows, oldest first (one per row)
+        self.series = series
+        self.player_index = {int(pid): i for i, pid in enumerate(player_ids)}
+
+    def __contains__(self, player_id: int) -> bool:
+        return int(player_id) in self.player_index
+
+    def __len__(self) -> int:
+        return len(self.player_ids)
+
+    def seasons_for(self, player_id: int) -> List[str]:
+        """Season labels of the player's standard table rows, oldest first."""
+        return list(self.series.get(int(player_id), []))
+
+    def rows_for(self, player_id: int, seasons: List[str]) -> np.ndarray:
+        """Tensor row of each given season of the player, -1 for a season without stat rows."""
+        i = self.player_index[int(player_id)]
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        row_of = {s: start + j for j, s in enumerate(self.row_seasons[start:end])}
+        return np.array([row_of.get(season, -1) for season in seasons], dtype=np.int64)
+
+    def normalized_for(self, player_id: int, seasons: List[str]) -> np.ndarray:
+        """Normalized feature rows for the given seasons, shape (len(seasons), n_features)."""
+        i = self.player_index[int(player_id)]
+        out = np.empty((len(seasons), self.empty_normalized.shape[1]))
+        for k, row in enumerate(self.rows_for(player_id, seasons)):
+            out[k] = self.normalized[row] if row >= 0 else self.empty_normalized[i]
+        return out
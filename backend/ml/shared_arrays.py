@@ -0,0 +1,97 @@
+"""
+Read-only NumPy arrays shared between worker processes through one memory-mapped file.
+
+Layout: a 24-byte header (magic, format version uint32, generation uint64, directory length
+uint64, all little-endian), a JSON directory {"meta": {...}, "arrays": {name: {dtype, shape,
+offset}}}, then each array's bytes at a 64-byte aligned offset. Every process maps the file
+read-only, so the arrays live once in the OS page cache however many workers use them.
+
+Writers build a new file and os.replace it over the old one with a higher generation. Mapped
+readers keep the old inode until they notice the generation in the header on disk changed
+(see SharedArrays.is_current) and remap.
+"""
+import json
+import mmap
+import os
+import struct
+import time
+import numpy as np
+from typing import Dict, Optional
+
+MAGIC = b'BBSA'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sIQQ')
+ALIGNMENT = 64
+
+
+def read_generation(path: str) -> Optional[int]:
+    """Generation in the header of the file at path, None if it is missing or not a shared-array file."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(header) < _HEADER.size:
+        return None
+    magic, version, generation, _ = _HEADER.unpack(header)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    return generation
+
+
+def write_shared_arrays(path: str, arrays: Dict[str, np.ndarray], meta: Optional[Dict] = None) -> int:
+    """Atomically replace the file at path with these arrays. Returns the new generation."""
+    previous = read_generation(path) or 0
+    # Wall-clock milliseconds keep two writers from publishing the same generation
+    generation = max(previous + 1, int(time.time() * 1000))
+    directory = {'meta': meta or {}, 'arrays': {}}
+    arrays = {name: np.ascontiguousarray(values) for name, values in arrays.items()}
+    # Offsets depend on the directory length, which depends on the offsets; one fixed-point pass settles it
+    offset = 0
+    for _ in range(2):
+        data_start = -(-(_HEADER.size + len(json.dumps(directory).encode()) + 256) // ALIGNMENT) * ALIGNMENT
+        offset = data_start
+        for name, values in arrays.items():
+            directory['arrays'][name] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+            offset = -(-(offset + values.nbytes) // ALIGNMENT) * ALIGNMENT
+    encoded = json.dumps(directory).encode()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, generation, len(encoded)))
+        f.write(encoded)
+        for name, values in arrays.items():
+            f.seek(directory['arrays'][name]['offset'])
+            f.write(values.tobytes())
+        f.truncate(max(offset, f.tell()))
+    os.replace(tmp, path)
+    return generation
+
+
+class SharedArrays:
+    """Read-only mapping of a shared-array file: arrays by name, plus its generation and meta."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.generation, dir_len = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a shared-array file of format {FORMAT_VERSION}")
+        directory = json.loads(self._mmap[_HEADER.size:_HEADER.size + dir_len])
+        self.meta = directory['meta']
+        self.arrays: Dict[str, np.ndarray] = {}
+        for name, spec in directory['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            self.arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.arrays
+
+    def is_current(self) -> bool:
+        """Whether the file on disk still has the generation this mapping was made from."""
+        return read_generation(self.path) == self.generation
@@ -1,148 +1,316 @@
 import numpy as np
-import pandas as pd
 from sklearn.neighbors import NearestNeighbors
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
-import joblib
+from sklearn.metrics import mean_squared_error, r2_score, pairwise_distances
 from typing import List, Dict, Tuple, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 import logging
 import datetime
 from sklearn.decomposition import PCA
-import models
-from models import Player, PlayerFeatures, StandardBattingStat, ValueBattingStat, AdvancedBattingStat, StandardPitchingStat, ValuePitchingStat, AdvancedPitchingStat, StandardFieldingStat, LevelWeights
+from ml.season_tensor import SeasonFeatureTensor
+from ml import model_store
+from ml.model_snapshot import ModelSnapshot, SNAPSHOT_FIELDS
+from ml.ann import build_comp_index
+from ml.comp_partitions import PartitionedCompIndex, position_group, age_bucket
+from ml import rating_engine, feature_blob, shared_arrays, feature_registry, quantile_sketch, parallel_extract, level_weights
+import threading
+from request_memo import memoized
+import career_summary
+from singleflight import fit_flight
+from models import Player, PlayerFeatures, PlayerComparison, StandardBattingStat, StandardPitchingStat, LevelWeights, DataVersion, GLOBAL_VERSION_KEY, bump_data_versions
 import re
 import time
+import os
 
 logger = logging.getLogger(__name__)
 
+# Who the comp indexes cover: 'mlb' (current MLB players) or 'bref' (every player with a Baseball-Reference id)
+COMP_INDEX_POPULATION = os.getenv('COMP_INDEX_POPULATION', 'mlb')
+
+# Feature matrices shared between worker processes through one memory-mapped file (ml.shared_arrays)
+SHARED_ARRAYS_PATH = os.getenv('ML_SHARED_ARRAYS_PATH', os.path.join(model_store.ARTIFACT_DIR, 'feature_matrix.bin'))
+SHARED_ARRAYS_CHECK_INTERVAL = float(os.getenv('ML_SHARED_ARRAYS_CHECK_INTERVAL', '1.0'))
+SHARED_FEATURE_ARRAYS = ('player_ids', 'raw', 'normalized', 'present', 'last_updated')
+
+# Streaming quantile sketches behind the data-driven normalization ranges (ml.quantile_sketch)
+NORMALIZATION_SKETCH_PATH = os.getenv('ML_NORMALIZATION_SKETCH_PATH', os.path.join(model_store.ARTIFACT_DIR, 'normalization_sketches.joblib'))
+NORMALIZATION_SKETCH_K = int(os.getenv('ML_NORMALIZATION_SKETCH_K', str(quantile_sketch.DEFAULT_K)))
+NORMALIZATION_CHUNK_SIZE = int(os.getenv('ML_NORMALIZATION_CHUNK_SIZE', '2000'))
+NORMALIZATION_PERCENTILES = (10, 90)
+
+def _positions_of(ids: np.ndarray, row_pids: np.ndarray) -> np.ndarray:
+    """Index of each row's player id within ids, or -1 for players not in ids."""
+    if len(ids) == 0:
+        return np.full(len(row_pids), -1, dtype=np.int64)
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+    pos = np.clip(np.searchsorted(sorted_ids, row_pids), 0, len(ids) - 1)
+    return np.where(sorted_ids[pos] == row_pids, order[pos], -1)
+
+def _to_float_array(values) -> np.ndarray:
+    """Parse raw column values (numbers or numeric strings) to floats, NaN where missing or unparseable."""
+    out = np.full(len(values), np.nan)
+    for i, val in enumerate(values):
+        if val is None or val == "":
+            continue
+        try:
+            out[i] = float(val)
+        except (TypeError, ValueError):
+            pass
+    return out
+
 class BaseballMLService:
     def __init__(self):
         self.scaler = StandardScaler()
         self.knn_model = NearestNeighbors(n_neighbors=10, algorithm='ball_tree')
-        self.overall_rating_model = RandomForestRegressor(n_estimators=100, random_state=42)
         self.pca = PCA(n_components=1)
         self.pca_weights = None
-        self.is_fitted = False
         self.last_n_players = 0
         self.last_n_stats = 0
-        self.metrics: dict[str, Optional[float]] = {"rmse": None, "r2": None}
         self._feature_cache = {}
         self._cache_last_loaded = None
+        # Mapping of the shared feature file the cache is served from, if any
+        self._shared: Optional[shared_arrays.SharedArrays] = None
+        self._shared_checked_at = 0.0
+        self._sync_lock = threading.Lock()
+        # Whole-population season tensors and the global data version they were built at
+        self.season_tensors: Dict[str, SeasonFeatureTensor] = {}
+        self.season_tensors_version: Optional[int] = None
+        # Current fitted model generation; replaced whole, never mutated (see publish_snapshot)
+        self.snapshot: Optional[ModelSnapshot] = None
+        self._publish_lock = threading.Lock()
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.snapshot is not None
+
+    @property
+    def metrics(self) -> Dict[str, Optional[float]]:
+        if self.snapshot is None:
+            return {"rmse": None, "r2": None}
+        return dict(self.snapshot.metrics)
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self.snapshot.model_version if self.snapshot is not None else None
+
+    @property
+    def trained_data_version(self) -> Optional[str]:
+        return self.snapshot.data_version if self.snapshot is not None else None
+
+    def publish_snapshot(self, snapshot: ModelSnapshot, expected: Optional[ModelSnapshot] = None) -> bool:
+        """
+        Make snapshot the served model generation with a single reference swap. With expected,
+        the swap only happens if that is still the served snapshot, so an update derived from an
+        older generation cannot overwrite a refit published in the meantime.
+        """
+        with self._publish_lock:
+            if expected is not None and self.snapshot is not expected:
+                return False
+            self.snapshot = snapshot
+            return True
         
     def refresh_feature_cache(self, db: Session):
-        """Load all player features from the player_features table into memory."""
-        self._feature_cache = {}
-        for pf in db.query(PlayerFeatures).all():
-            self._feature_cache[pf.player_id] = {
-                "raw": pf.raw_features,
-                "normalized": pf.normalized_features,
-                "last_updated": pf.last_updated
-            }
+        """
+        Load all stored player features into one contiguous matrix per kind (raw, normalized,
+        presence mask), decoded with a single np.frombuffer per column instead of one
+        unpickle per row, and publish them as the shared memory-mapped feature file.
+        """
+        start = time.time()
+        rows = db.query(PlayerFeatures.player_id, PlayerFeatures.raw_features, PlayerFeatures.normalized_features, PlayerFeatures.last_updated).all()
+        width = feature_registry.width('all')
+        # Rows of an older layout or format (e.g. pickles an old worker wrote) are skipped, not fatal
+        current = [row for row in rows if feature_blob.blob_matches(row.raw_features, width) and feature_blob.blob_matches(row.normalized_features, width)]
+        if len(current) < len(rows):
+            print(f"[CACHE] Skipped {len(rows) - len(current)} player features of an older layout or format; rerun /features/populate.")
+        raw, present = feature_blob.decode_matrix([row.raw_features for row in current], width)
+        normalized, _ = feature_blob.decode_matrix([row.normalized_features for row in current], width)
+        self._publish_feature_arrays({
+            'player_ids': np.array([row.player_id for row in current], dtype=np.int64),
+            'raw': raw,
+            'normalized': normalized,
+            'present': present,
+            'last_updated': np.array([row.last_updated for row in current], dtype='datetime64[us]'),
+        })
+        print(f"[CACHE] Loaded {len(current)} player features into memory in {time.time() - start:.2f}s.")
+
+    def _set_feature_cache(self, arrays: Dict[str, np.ndarray]):
+        cache = dict(arrays)
+        cache['index'] = {int(pid): i for i, pid in enumerate(arrays['player_ids'])}
+        self._feature_cache = cache
         self._cache_last_loaded = datetime.datetime.utcnow()
-        print(f"[CACHE] Loaded {len(self._feature_cache)} player features into memory.")
+
+    def _publish_feature_arrays(self, arrays: Dict[str, np.ndarray]):
+        """Write the feature matrices to the shared file and serve them from its mapping."""
+        try:
+            shared_arrays.write_shared_arrays(SHARED_ARRAYS_PATH, arrays, meta={'model_version': self.model_version})
+            self.attach_shared_arrays(reload_models=False)
+        except OSError as e:
+            print(f"[CACHE] Could not write shared feature file {SHARED_ARRAYS_PATH}: {e}; keeping a private copy")
+            self._shared = None
+            self._set_feature_cache(arrays)
+
+    def publish_shared_arrays(self):
+        """
+        Rewrite the shared file with the current feature matrices under a new generation, e.g.
+        after a refit, so every worker remaps it and picks up the new model bundle. Rows that
+        invalidate_players dropped from the index are left out, so no worker serves them again.
+        """
+        cache = self._feature_cache
+        if not cache and not self.attach_shared_arrays(reload_models=False):
+            return
+        cache = self._feature_cache
+        keep = np.array(sorted(cache['index'].values()), dtype=np.int64)
+        self._publish_feature_arrays({name: cache[name][keep] for name in SHARED_FEATURE_ARRAYS})
+
+    def attach_shared_arrays(self, reload_models: bool = True) -> bool:
+        """
+        Map the shared feature file read-only and serve features from it. When it was published
+        under a different model version than the one served here, the model bundle is reloaded
+        too. Returns False when there is no shared file yet.
+        """
+        try:
+            shared = shared_arrays.SharedArrays(SHARED_ARRAYS_PATH)
+        except (OSError, ValueError):
+            return False
+        self._shared = shared
+        self._set_feature_cache({name: shared[name] for name in SHARED_FEATURE_ARRAYS})
+        published_model = shared.meta.get('model_version')
+        if reload_models and published_model and published_model != self.model_version:
+            self.load_models()
+        return True
+
+    def shared_state_check_due(self) -> bool:
+        """Whether sync_shared_state would look at the shared file now; cheap enough for the event loop."""
+        return time.monotonic() - self._shared_checked_at >= SHARED_ARRAYS_CHECK_INTERVAL
+
+    def sync_shared_state(self):
+        """
+        Remap the shared file if another process published a new generation (checked at most
+        every SHARED_ARRAYS_CHECK_INTERVAL s). Does file I/O and may reload the model bundle, so
+        callers on an event loop run it in a thread; concurrent calls return while one syncs.
+        """
+        if not self.shared_state_check_due() or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._shared_checked_at = time.monotonic()
+            shared = self._shared
+            if shared is not None and shared.is_current():
+                return
+            if shared is None and not os.path.exists(SHARED_ARRAYS_PATH):
+                return
+            if self.attach_shared_arrays():
+                print(f"[CACHE] Remapped shared feature file generation {self._shared.generation}")
+        finally:
+            self._sync_lock.release()
 
     def get_cached_features(self, db: Session, player_id: int):
         # First check in-memory cache
-        cached = self._feature_cache.get(player_id)
-        if cached is not None:
-            return cached
-        # If not in cache, check the PlayerFeatures table in the DB
-        pf = db.query(PlayerFeatures).filter(PlayerFeatures.player_id == player_id).first()
-        if pf is not None:
-            # Add to in-memory cache for future use
-            self._feature_cache[player_id] = {
-                "raw": pf.raw_features,
-                "normalized": pf.normalized_features,
-                "last_updated": pf.last_updated
+        cache = self._feature_cache
+        row = cache.get('index', {}).get(player_id)
+        if row is not None:
+            return {
+                "raw": cache['raw'][row],
+                "normalized": cache['normalized'][row],
+                "present": cache['present'][row],
+                "last_updated": cache['last_updated'][row].item(),
             }
-            return self._feature_cache[player_id]
+        # If not in cache, check the PlayerFeatures table in the DB (not added to the shared matrix);
+        # a row of an older layout or format counts as missing
+        pf = db.query(PlayerFeatures).filter(PlayerFeatures.player_id == player_id).first()
+        width = feature_registry.width('all')
+        if pf is not None and feature_blob.blob_matches(pf.raw_features, width) and feature_blob.blob_matches(pf.normalized_features, width):
+            raw, present = feature_blob.decode_features(pf.raw_features)
+            normalized, _ = feature_blob.decode_features(pf.normalized_features)
+            return {"raw": raw, "normalized": normalized, "present": present, "last_updated": pf.last_updated}
         return None
-        
-    def compute_stat_normalization(self, db: Session):
-        """Compute min/max (or percentiles) for each stat from MLB data and cache them."""
-        players = db.query(Player).all()
-        first_feats = None
-        for player in players:
-            player_id = getattr(player, 'id', None)
-            if player_id is None:
-                continue
-            first_feats = self.extract_player_features(db, int(player_id))
-            if first_feats is not None:
-                break
-        if first_feats is None:
+
+    def compute_stat_normalization(self, db: Session, incremental: bool = False, workers: Optional[int] = None):
+        """
+        Data-driven normalization ranges: the 10th and 90th percentile of each feature's
+        non-zero values, read from streaming quantile sketches built in one pass over the bulk
+        feature matrix. Sketches are kept per cohort ('all', 'level:<level>',
+        'position:<group>') and saved to NORMALIZATION_SKETCH_PATH; with incremental=True
+        only players the saved sketches have not seen are extracted and merged in. Sketches are
+        append-only (a KLL sketch cannot remove values), so an incremental run keeps the old
+        values of known players whose stats changed and never adds their new seasons; only a
+        full run (the default) reflects corrections and new seasons of known players. The global
+        cohort sets data_driven_mins / data_driven_maxs; see cohort_normalization for the others.
+        Extraction runs on up to workers processes (default ML_EXTRACT_WORKERS).
+        """
+        start = time.time()
+        n_features = feature_registry.width('all')
+        sketches = quantile_sketch.load_sketches(NORMALIZATION_SKETCH_PATH, n_features) if incremental else None
+        player_ids = None
+        if sketches is not None:
+            known = sketches.player_ids
+            player_ids = [pid for (pid,) in db.query(Player.id).all() if pid not in known]
+        bulk = self.extract_features_parallel(db, player_ids=player_ids, workers=workers) if player_ids is None or player_ids else None
+        if bulk is not None and len(bulk["player_ids"]):
+            added = self.sketch_features(db, bulk)
+            sketches = added if sketches is None else sketches.merge(added)
+            quantile_sketch.save_sketches(sketches, NORMALIZATION_SKETCH_PATH)
+        if sketches is None:
             print("[ML] No player features found for normalization.")
             return
-        feature_len = len(first_feats['raw'])
-        stat_lists = [[] for _ in range(feature_len)]
-        for player in players:
-            player_id = getattr(player, 'id', None)
-            if player_id is None:
-                continue
-            feats = self.extract_player_features(db, int(player_id))
-            if feats is None:
-                continue
-            for i, val in enumerate(feats['raw']):
-                if val is not None and val != 0:
-                    stat_lists[i].append(val)
-        # Use 10th and 90th percentiles for more spread, only on non-zero, non-missing values
-        mins = np.array([np.percentile(stat, 10) if stat else 0.0 for stat in stat_lists])
-        maxs = np.array([np.percentile(stat, 90) if stat else 1.0 for stat in stat_lists])
+        self.normalization_sketches = sketches
+        mins, maxs = sketches.ranges('all', *NORMALIZATION_PERCENTILES)
         self.data_driven_mins = mins
         self.data_driven_maxs = maxs
+        elapsed = time.time() - start
+        print(f"[PERF] compute_stat_normalization sketched {len(bulk['player_ids']) if bulk else 0} new players "
+              f"({len(sketches.player_ids)} total, {len(sketches.cohorts)} cohorts) in {elapsed:.2f}s")
         print("[ML] Data-driven normalization mins:", mins)
         print("[ML] Data-driven normalization maxs:", maxs)
 
-    def _normalize_features(self, features: np.ndarray) -> np.ndarray:
+    def sketch_features(self, db: Session, bulk: dict, chunk_size: Optional[int] = None) -> quantile_sketch.CohortSketches:
+        """
+        Quantile sketches of an 'all'-layout bulk feature matrix, per cohort. Rows are sketched
+        in chunks that are merged, the same way sketches from separate workers combine.
+        """
+        chunk_size = chunk_size or NORMALIZATION_CHUNK_SIZE
+        ids = np.asarray(bulk["player_ids"], dtype=np.int64)
+        groups = dict(db.query(Player.id, Player.primary_position).all())
+        cohorts = [(f"level:{level}", f"position:{position_group(groups.get(int(pid)))}")
+                   for pid, level in zip(ids, bulk["level"])]
+        raw = np.asarray(bulk["raw"], dtype=float)
+        # Only non-zero, non-missing values count (missing features are stored as 0)
+        include = np.asarray(bulk["present"], dtype=bool) & (raw != 0)
+        total = quantile_sketch.CohortSketches(raw.shape[1], k=NORMALIZATION_SKETCH_K)
+        for lo in range(0, len(ids), chunk_size):
+            chunk = slice(lo, lo + chunk_size)
+            part = quantile_sketch.CohortSketches(raw.shape[1], k=NORMALIZATION_SKETCH_K)
+            total.merge(part.update(ids[chunk], raw[chunk], include[chunk], cohorts[chunk]))
+        return total
+
+    def cohort_normalization(self, cohort: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(mins, maxs) normalization ranges of one cohort ('all', 'level:AAA', 'position:IF', ...), None if unknown."""
+        sketches = getattr(self, 'normalization_sketches', None)
+        if sketches is None:
+            sketches = quantile_sketch.load_sketches(NORMALIZATION_SKETCH_PATH, feature_registry.width('all'))
+            if sketches is None:
+                return None
+            self.normalization_sketches = sketches
+        return sketches.ranges(cohort, *NORMALIZATION_PERCENTILES)
+
+    def _normalize_features(self, features: np.ndarray, mode: str = 'all') -> np.ndarray:
+        """Scale a mode's feature vector(s) to 0-100 by each slot's data-driven range, else the registry's fallback range."""
         if hasattr(self, 'data_driven_mins') and hasattr(self, 'data_driven_maxs'):
-            mins = self.data_driven_mins
-            maxs = self.data_driven_maxs
+            # Data-driven ranges are aligned on the 'all' layout
+            positions = feature_registry.canonical_positions(mode)
+            mins = np.asarray(self.data_driven_mins, dtype=float)[positions]
+            maxs = np.asarray(self.data_driven_maxs, dtype=float)[positions]
         else:
-            # Updated min/max arrays for expanded feature vector. These are rough MLB ranges; data-driven normalization is preferred.
-            mins = np.array([
-                0.200, 0.250, 80, 20, 10,  # Batting: BA, OBP, EV, HardHit%, LD%
-                0.300, 0.1, 0, 0,          # SLG, ISO, Barrel%, HR
-                5, 10, 10, 50,             # BB%, SO%, BB, SO
-                0, -10,                    # SB, rbaser
-                0.95, -20, -20,            # fld_pct, rdrs, rtot
-                0, 0,                      # a, dp
-                # Pitching (expanded)
-                10, 2, 0,                  # k_pct, bb_pct, hr_pct
-                1.5, 1.5, 0.8, 50,         # era, fip, whip, era_plus
-                0, -5, -20,                # war, waa, raa
-                0, 0, 0, 0,                # so, bb, ip, gs
-                3, 1, 0.5, 5,              # so9, bb9, hr9, h9
-                0.200, 60, 40, 40, 40, 2.0,# babip, lob_pct, era_minus, fip_minus, xfip_minus, siera
-                -5, -20, -5,               # wpa, re24, cwpa
-                0, 0                       # level_factor, age_factor
-            ])
-            maxs = np.array([
-                0.350, 0.450, 100, 55, 35, # Batting: BA, OBP, EV, HardHit%, LD%
-                0.700, 0.35, 20, 60,       # SLG, ISO, Barrel%, HR
-                18, 35, 150, 250,          # BB%, SO%, BB, SO
-                60, 10,                    # SB, rbaser
-                1.0, 20, 20,               # fld_pct, rdrs, rtot
-                50, 50,                    # a, dp
-                # Pitching (expanded)
-                50, 15, 10,                # k_pct, bb_pct, hr_pct
-                7.0, 5.0, 2.5, 250,        # era, fip, whip, era_plus
-                12, 10, 20,                # war, waa, raa
-                350, 100, 250, 40,         # so, bb, ip, gs
-                15, 7, 3, 12,              # so9, bb9, hr9, h9
-                0.350, 90, 80, 80, 80, 6.0,# babip, lob_pct, era_minus, fip_minus, xfip_minus, siera
-                10, 40, 10,                # wpa, re24, cwpa
-                100, 100                   # level_factor, age_factor
-            ])
+            mins, maxs = feature_registry.fallback_ranges(mode)
+        # Works on a single vector or a player x feature matrix (normalized along the last axis)
+        features = np.asarray(features, dtype=float)
         # Avoid divide by zero: if max==min, set normed to 0
-        normed = np.zeros_like(features, dtype=float)
-        for i in range(len(features)):
-            if maxs[i] == mins[i]:
-                normed[i] = 0.0
-            else:
-                normed[i] = (features[i] - mins[i]) / (maxs[i] - mins[i]) * 100
+        span = maxs - mins
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normed = np.where(span == 0, 0.0, (features - mins) / np.where(span == 0, 1.0, span) * 100)
         normed = np.clip(normed, 0, 100)
         # Replace any nan with 0
         normed = np.nan_to_num(normed, nan=0.0)
@@ -166,8 +334,12 @@ class BaseballMLService:
                 return "AAA"
         return "AA"  # Default fallback
     
-    def _get_level_factor(self, level: str) -> float:
-        """Convert level to factor for MLB readiness and stat weighting"""
+    def _get_level_factor(self, level: str, season=None, role: str = 'combined') -> float:
+        """
+        Convert level to factor for MLB readiness and stat weighting. The data-driven weight of
+        the role ('batting', 'pitching' or 'combined'), for the season when given, is preferred
+        when one was computed.
+        """
         # Default weights if no data-driven analysis has been done
         default_level_factors = {
             'MLB': 1.0,      # Full weight for MLB stats
@@ -181,119 +353,36 @@ class BaseballMLService:
         }
         
         # Use data-driven weights if available, otherwise fall back to defaults
+        table = getattr(self, 'level_weight_table', None) or {}
+        if season is not None and level in table.get('seasons', {}).get(str(season), {}).get(role, {}):
+            return table['seasons'][str(season)][role][level]
+        if role != 'combined' and level in table.get('weights', {}).get(role, {}):
+            return table['weights'][role][level]
         if hasattr(self, 'data_driven_level_weights'):
             return self.data_driven_level_weights.get(level, default_level_factors.get(level, 0.5))
         else:
             return default_level_factors.get(level, 0.5)
     
     def compute_level_weights_from_data(self, db: Session, force: bool = False):
-        """Compute data-driven level weights by analyzing performance differences between levels"""
-        # Only recompute if not already computed, unless force=True
-        if not force and hasattr(self, 'data_driven_level_weights') and isinstance(getattr(self, 'data_driven_level_weights', None), dict) and getattr(self, 'data_driven_level_weights', None):
+        """
+        Data-driven level weights per role and season (ml.level_weights); the combined overall
+        weights feed _get_level_factor. Without force, weights already in memory, or stored in
+        LevelWeights for the current data hash, are reused.
+        """
+        if not force and isinstance(getattr(self, 'data_driven_level_weights', None), dict) and self.data_driven_level_weights:
             return
-        if force or not hasattr(self, 'data_driven_level_weights') or not isinstance(getattr(self, 'data_driven_level_weights', None), dict) or not getattr(self, 'data_driven_level_weights', None):
-            print("[ML] Computing data-driven level weights...")
-            
-            # Get all players with stats
-            players = db.query(Player).all()
-            
-            # Collect stats by level
-            level_stats = {
-                'MLB': {'batting': [], 'pitching': []},
-                'AAA': {'batting': [], 'pitching': []},
-                'AA': {'batting': [], 'pitching': []},
-                'A+': {'batting': [], 'pitching': []},
-                'A': {'batting': [], 'pitching': []},
-                'Rk': {'batting': [], 'pitching': []}
-            }
-            
-            # Collect batting stats by level
-            for player in players:
-                player_level = getattr(player, 'level', None)
-                if not player_level or player_level not in level_stats:
-                    continue
-                    
-                # Get latest batting stats
-                bat_stats = db.query(StandardBattingStat).filter(
-                    StandardBattingStat.player_id == player.id
-                ).order_by(StandardBattingStat.season.desc()).first()
-                
-                if bat_stats:
-                    # Collect key batting metrics
-                    stats_dict = {
-                        'ba': self._safe_float(bat_stats.ba),
-                        'obp': self._safe_float(bat_stats.obp),
-                        'slg': self._safe_float(bat_stats.slg),
-                        'hr': self._safe_float(bat_stats.hr),
-                        'bb': self._safe_float(bat_stats.bb),
-                        'so': self._safe_float(bat_stats.so),
-                        'sb': self._safe_float(bat_stats.sb),
-                        'pa': self._safe_float(bat_stats.pa)
-                    }
-                    # Only include if player had meaningful playing time
-                    if stats_dict['pa'] > 50:
-                        level_stats[player_level]['batting'].append(stats_dict)
-                
-                # Get latest pitching stats
-                pit_stats = db.query(StandardPitchingStat).filter(
-                    StandardPitchingStat.player_id == player.id
-                ).order_by(StandardPitchingStat.season.desc()).first()
-                
-                if pit_stats:
-                    # Collect key pitching metrics
-                    stats_dict = {
-                        'era': self._safe_float(pit_stats.era),
-                        'ip': self._safe_float(pit_stats.ip),
-                        'so': self._safe_float(pit_stats.so),
-                        'bb': self._safe_float(pit_stats.bb),
-                        'era_plus': self._safe_float(pit_stats.era_plus),
-                        'whip': self._safe_float(pit_stats.whip)
-                    }
-                    # Only include if player had meaningful innings
-                    if stats_dict['ip'] and float(stats_dict['ip']) > 10:
-                        level_stats[player_level]['pitching'].append(stats_dict)
-            
-            # Calculate level weights based on performance differences
-            level_weights = {}
-            
-            # Use MLB as baseline (1.0)
-            level_weights['MLB'] = 1.0
-            
-            # Calculate batting weights
-            mlb_batting_avg = self._calculate_avg_performance(level_stats['MLB']['batting'])
-            if mlb_batting_avg:
-                for level in ['AAA', 'AA', 'A+', 'A', 'Rk']:
-                    if level_stats[level]['batting']:
-                        level_avg = self._calculate_avg_performance(level_stats[level]['batting'])
-                        if level_avg and mlb_batting_avg:
-                            # Calculate weight based on performance ratio
-                            batting_weight = self._calculate_performance_ratio(level_avg, mlb_batting_avg)
-                            level_weights[level] = batting_weight
-            
-            # Calculate pitching weights (inverse for ERA - lower is better)
-            mlb_pitching_avg = self._calculate_avg_performance(level_stats['MLB']['pitching'])
-            if mlb_pitching_avg:
-                for level in ['AAA', 'AA', 'A+', 'A', 'Rk']:
-                    if level_stats[level]['pitching']:
-                        level_avg = self._calculate_avg_performance(level_stats[level]['pitching'])
-                        if level_avg and mlb_pitching_avg:
-                            # For pitching, lower ERA is better, so we invert the ratio
-                            pitching_weight = self._calculate_performance_ratio(mlb_pitching_avg, level_avg)
-                            # Combine with existing batting weight if available
-                            if level in level_weights:
-                                level_weights[level] = (level_weights[level] + pitching_weight) / 2
-                            else:
-                                level_weights[level] = pitching_weight
-            
-            # Ensure weights are reasonable (between 0.1 and 1.0)
-            for level in level_weights:
-                level_weights[level] = max(0.1, min(1.0, level_weights[level]))
-            
-            # Store the computed weights
-            self.data_driven_level_weights = level_weights
-            
-            print(f"[ML] Data-driven level weights computed: {level_weights}")
-    
+        data_hash = level_weights.data_hash(db)
+        if not force and self.load_level_weights(db, data_hash=data_hash):
+            print(f"[CACHE] Level weights for data hash {data_hash} loaded from the database")
+            return
+        print("[ML] Computing data-driven level weights...")
+        start = time.time()
+        table = level_weights.compute_level_weights(db, hash_value=data_hash)
+        self.level_weight_table = table
+        self.data_driven_level_weights = table['weights']['combined']
+        print(f"[ML] Data-driven level weights computed: {self.data_driven_level_weights}")
+        print(f"[PERF] Level weights for {len(table['seasons'])} seasons computed in {time.time() - start:.2f}s")
+
     def _safe_float(self, val):
         """Safely convert value to float"""
         try:
@@ -301,170 +390,201 @@ class BaseballMLService:
         except (TypeError, ValueError):
             return 0.0
     
-    def _calculate_avg_performance(self, stats_list):
-        """Calculate average performance across multiple stats"""
-        if not stats_list:
-            return None
-        
-        # Define which stats to use for performance calculation
-        batting_metrics = ['ba', 'obp', 'slg', 'hr', 'bb', 'so', 'sb']
-        pitching_metrics = ['era', 'so', 'bb', 'era_plus', 'whip']
-        
-        # Determine if this is batting or pitching stats
-        if 'ba' in stats_list[0]:
-            metrics = batting_metrics
-        else:
-            metrics = pitching_metrics
-        
-        # Calculate averages for each metric
-        averages = {}
-        for metric in metrics:
-            values = [self._safe_float(stat.get(metric, 0)) for stat in stats_list]
-            values = [v for v in values if v > 0]  # Filter out zeros
-            if values:
-                averages[metric] = np.mean(values)
-        
-        return averages if averages else None
-    
-    def _calculate_performance_ratio(self, level_avg, mlb_avg):
-        """Calculate performance ratio between levels"""
-        if not level_avg or not mlb_avg:
-            return 0.5  # Default fallback
-        
-        # Calculate weighted average of performance ratios
-        ratios = []
-        weights = []
-        
-        # Batting metrics (higher is better)
-        batting_metrics = ['ba', 'obp', 'slg', 'hr', 'bb', 'sb']
-        for metric in batting_metrics:
-            if metric in level_avg and metric in mlb_avg and mlb_avg[metric] > 0:
-                ratio = level_avg[metric] / mlb_avg[metric]
-                ratios.append(ratio)
-                weights.append(1.0)  # Equal weight for now
-        
-        # Pitching metrics (lower ERA is better, higher SO is better)
-        if 'era' in level_avg and 'era' in mlb_avg and mlb_avg['era'] > 0:
-            # Invert ERA ratio since lower is better
-            era_ratio = mlb_avg['era'] / level_avg['era']
-            ratios.append(era_ratio)
-            weights.append(1.0)
-        
-        if 'so' in level_avg and 'so' in mlb_avg and mlb_avg['so'] > 0:
-            so_ratio = level_avg['so'] / mlb_avg['so']
-            ratios.append(so_ratio)
-            weights.append(1.0)
-        
-        # Calculate weighted average
-        if ratios:
-            weighted_avg = float(np.average(ratios, weights=weights))
-            return max(0.1, min(1.0, weighted_avg))  # Clamp between 0.1 and 1.0
-        
-        return 0.5  # Default fallback
-    
     def extract_player_features(self, db: Session, player_id: int, mode: str = 'all', season: Optional[int] = None) -> Optional[dict]:
-        start = time.time()
         """Extract feature vector for a player, split by mode: 'hitting', 'pitching', or 'all' (default). If season is provided, fetch stats for that season."""
         try:
-            player = db.query(Player).filter(Player.id == player_id).first()
-            if not player:
-                return None
-            player_level = getattr(player, 'level', 'MLB')
-            level_factor = self._get_level_factor(player_level)
-            # Helper to aggregate all available values for a feature from a given model and column
-            def aggregate_feature(model, attr, is_percentage=False):
-                q = db.query(model).filter(model.player_id == player_id)
-                if season is not None and hasattr(model, 'season'):
-                    q = q.filter(model.season == str(season))
-                vals = [getattr(row, attr, None) for row in q.all() if getattr(row, attr, None) not in (None, "")]
-            def safe_float(val):
-                try:
-                    return float(val)
-                except (TypeError, ValueError):
-                        return None
-                vals = [safe_float(v) for v in vals if safe_float(v) is not None]
-                if not vals:
-                    return None
-                mean_val = float(np.mean([v for v in vals if v is not None]))
-                if is_percentage:
-                    if mean_val > 0.5:
-                        diff_from_avg = mean_val - 0.250
-                        weighted_diff = diff_from_avg * level_factor
-                        return 0.250 + weighted_diff
-                    else:
-                        return mean_val * level_factor
-                else:
-                    return mean_val * level_factor
-            # Build feature lists from correct tables
-            hitting_feats = [
-                aggregate_feature(StandardBattingStat, 'ba', is_percentage=True),
-                aggregate_feature(StandardBattingStat, 'obp', is_percentage=True),
-                aggregate_feature(AdvancedBattingStat, 'ev'),
-                aggregate_feature(AdvancedBattingStat, 'hardh_pct', is_percentage=True),
-                aggregate_feature(AdvancedBattingStat, 'ld_pct', is_percentage=True),
-                aggregate_feature(StandardBattingStat, 'slg', is_percentage=True),
-                aggregate_feature(AdvancedBattingStat, 'iso', is_percentage=True),
-                aggregate_feature(AdvancedBattingStat, 'barrel_pct', is_percentage=True),
-                aggregate_feature(StandardBattingStat, 'hr'),
-                aggregate_feature(AdvancedBattingStat, 'bb_pct', is_percentage=True),
-                aggregate_feature(AdvancedBattingStat, 'so_pct', is_percentage=True),
-                aggregate_feature(StandardBattingStat, 'bb'),
-                aggregate_feature(StandardBattingStat, 'so'),
-                aggregate_feature(StandardBattingStat, 'sb'),
-                aggregate_feature(ValueBattingStat, 'rbaser'),
-            ]
-            fielding_feats = [
-                aggregate_feature(StandardFieldingStat, 'fld_pct', is_percentage=True),
-                aggregate_feature(StandardFieldingStat, 'rdrs'),
-                aggregate_feature(StandardFieldingStat, 'rtot'),
-                aggregate_feature(StandardFieldingStat, 'a'),
-                aggregate_feature(StandardFieldingStat, 'dp'),
-            ]
-            pitching_feats = [
-                aggregate_feature(AdvancedPitchingStat, 'k_pct', is_percentage=True),
-                aggregate_feature(AdvancedPitchingStat, 'bb_pct', is_percentage=True),
-                aggregate_feature(AdvancedPitchingStat, 'hr_pct', is_percentage=True),
-                aggregate_feature(StandardPitchingStat, 'era'),
-                aggregate_feature(StandardPitchingStat, 'fip'),
-                aggregate_feature(StandardPitchingStat, 'whip'),
-                aggregate_feature(StandardPitchingStat, 'era_plus'),
-                aggregate_feature(ValuePitchingStat, 'war'),
-                aggregate_feature(ValuePitchingStat, 'waa'),
-                aggregate_feature(ValuePitchingStat, 'raa'),
-                aggregate_feature(StandardPitchingStat, 'so'),
-                aggregate_feature(StandardPitchingStat, 'bb'),
-                aggregate_feature(StandardPitchingStat, 'ip'),
-                aggregate_feature(StandardPitchingStat, 'gs'),
-                aggregate_feature(StandardPitchingStat, 'so9'),
-                aggregate_feature(StandardPitchingStat, 'bb9'),
-                aggregate_feature(StandardPitchingStat, 'hr9'),
-                aggregate_feature(StandardPitchingStat, 'h9'),
-                aggregate_feature(AdvancedPitchingStat, 'babip', is_percentage=True),
-                aggregate_feature(AdvancedPitchingStat, 'lob_pct', is_percentage=True),
-                aggregate_feature(AdvancedPitchingStat, 'era_minus'),
-                aggregate_feature(AdvancedPitchingStat, 'fip_minus'),
-                aggregate_feature(AdvancedPitchingStat, 'xfip_minus'),
-                aggregate_feature(AdvancedPitchingStat, 'siera'),
-                aggregate_feature(AdvancedPitchingStat, 'wpa'),
-                aggregate_feature(AdvancedPitchingStat, 're24'),
-                aggregate_feature(AdvancedPitchingStat, 'cwpa'),
-            ]
-            # Combine features based on mode
-            if mode == 'hitting':
-                feats = hitting_feats + fielding_feats + [level_factor * 100, 1.0]
-            elif mode == 'pitching':
-                feats = pitching_feats + fielding_feats + [level_factor * 100, 1.0]
-            else:
-                feats = hitting_feats + fielding_feats + pitching_feats + [level_factor * 100, 1.0]
-            # Only keep present features for normalization and rating
-            present_feats = [f for f in feats if f is not None]
-            normed = self._normalize_features(np.array([f if f is not None else 0.0 for f in feats]))
-            # Confidence: percent of features present
-            confidence = 100.0 * len(present_feats) / len(feats) if feats else 0.0
-            return {"raw": np.array([f if f is not None else 0.0 for f in feats]), "normalized": normed, "level": player_level, "level_factor": level_factor, "confidence": confidence, "present": [f is not None for f in feats]}
+            bulk = self.extract_features_bulk(db, player_ids=[player_id], mode=mode, season=season)
+            return self.rows_by_player(bulk).get(int(player_id))
         except Exception as e:
             logger.error(f"Error extracting features for player {player_id}: {e}")
             return None
+
+    def extract_features_bulk(self, db: Session, player_ids: Optional[List[int]] = None, mode: str = 'all', season: Optional[int] = None) -> Optional[dict]:
+        """
+        Player x feature matrix (see _extract_features_bulk), memoized for the current request
+        by (player ids, mode, season).
+        """
+        key = ('features', None if player_ids is None else tuple(sorted(int(pid) for pid in player_ids)), mode, season)
+        return memoized(key, lambda: self._extract_features_bulk(db, player_ids=player_ids, mode=mode, season=season))
+
+    def _extract_features_bulk(self, db: Session, player_ids: Optional[List[int]] = None, mode: str = 'all', season: Optional[int] = None) -> Optional[dict]:
+        """
+        Extract the player x feature matrix for many players at once.
+        The layout's feature registry compiles to one GROUP BY player_id query per stat table,
+        so every column is averaged inside the database and the cost is one round trip per
+        table for the whole population.
+        Returns arrays aligned on "player_ids": raw, normalized, present (bool mask),
+        level_factor and confidence, plus the list of levels. Rows are identical to what
+        extract_player_features returns for the same player.
+        """
+        if player_ids is not None and len(player_ids) == 0:
+            return None
+        ids, levels = self._query_player_levels(db, player_ids)
+        level_factors = np.array([self._get_level_factor(level) for level in levels], dtype=float)
+        means = np.full((len(ids), len(feature_registry.layout(mode))), np.nan)
+        for _, positions, row_pids, _, _, avgs in self._aggregate_stats(db, mode, ids, player_ids is not None, season=season):
+            rows = _positions_of(ids, row_pids)
+            keep = rows >= 0
+            for c_i, cols in enumerate(positions):
+                means[np.ix_(rows[keep], cols)] = avgs[keep, c_i][:, None]
+        raw, normalized, present, confidence = self._pack_features(mode, means, level_factors)
+        return {
+            "player_ids": ids,
+            "raw": raw,
+            "normalized": normalized,
+            "present": present,
+            "level": levels,
+            "level_factor": level_factors,
+            "confidence": confidence,
+        }
+
+    def extract_features_parallel(self, db: Session, player_ids: Optional[List[int]] = None, mode: str = 'all',
+                                  season: Optional[int] = None, workers: Optional[int] = None) -> Optional[dict]:
+        """extract_features_bulk split into player chunks across worker processes (ml.parallel_extract); serial for small populations."""
+        return parallel_extract.extract_features(self, db, player_ids=player_ids, mode=mode, season=season, workers=workers)
+
+    def build_season_tensor(self, db: Session, mode: str = 'hitting', player_ids: Optional[List[int]] = None) -> SeasonFeatureTensor:
+        """Player x season x feature tensor (see _build_season_tensor), memoized for the current request."""
+        key = ('season_tensor', None if player_ids is None else tuple(sorted(int(pid) for pid in player_ids)), mode)
+        return memoized(key, lambda: self._build_season_tensor(db, mode, player_ids=player_ids))
+
+    def _build_season_tensor(self, db: Session, mode: str = 'hitting', player_ids: Optional[List[int]] = None) -> SeasonFeatureTensor:
+        """
+        Build the player x season x feature tensor for a mode, one GROUP BY player_id, season
+        query per stat table. Each (player, season) slice equals
+        extract_player_features(db, player_id, mode, season).
+        """
+        ids, levels = self._query_player_levels(db, player_ids)
+        n_feats = len(feature_registry.layout(mode))
+        level_factors = np.array([self._get_level_factor(level) for level in levels], dtype=float)
+        series_model = StandardPitchingStat if mode == 'pitching' else StandardBattingStat
+        fetched = list(self._aggregate_stats(db, mode, ids, player_ids is not None, by_season=True))
+        # Encode every (player, season) pair that has at least one stat row
+        season_labels = sorted({s for *_, seasons, _, _ in fetched for s in seasons if s is not None})
+        season_code = {s: i for i, s in enumerate(season_labels)}
+        n_seasons = max(len(season_labels), 1)
+        keyed = []
+        for model, positions, row_pids, seasons, counts, avgs in fetched:
+            pos = _positions_of(ids, row_pids)
+            codes = np.array([season_code.get(s, -1) if s is not None else -1 for s in seasons], dtype=np.int64)
+            keys = np.where((pos >= 0) & (codes >= 0), pos * n_seasons + codes, -1)
+            keyed.append((model, positions, keys, counts, avgs))
+        all_keys = np.concatenate([k[k >= 0] for _, _, k, _, _ in keyed]) if keyed else np.array([], dtype=np.int64)
+        pair_keys = np.unique(all_keys)
+        means = np.full((len(pair_keys), n_feats), np.nan)
+        series: Dict[int, List[str]] = {}
+        for model, positions, keys, counts, avgs in keyed:
+            keep = keys >= 0
+            pair_rows = np.searchsorted(pair_keys, keys[keep])
+            for c_i, cols in enumerate(positions):
+                means[np.ix_(pair_rows, cols)] = avgs[keep, c_i][:, None]
+            if model is series_model:
+                # Season of every standard table row, oldest first, as the history endpoints report it
+                for key, count in zip(keys[keep], counts[keep]):
+                    series.setdefault(int(ids[key // n_seasons]), []).extend([season_labels[key % n_seasons]] * int(count))
+        for pid in series:
+            series[pid].sort()
+        pair_players = pair_keys // n_seasons
+        raw, normalized, present, _ = self._pack_features(mode, means, level_factors[pair_players])
+        _, empty_normalized, _, _ = self._pack_features(mode, np.full((len(ids), n_feats), np.nan), level_factors)
+        return SeasonFeatureTensor(
+            mode=mode,
+            player_ids=ids,
+            offsets=np.searchsorted(pair_players, np.arange(len(ids) + 1)),
+            row_seasons=np.array([season_labels[k % n_seasons] for k in pair_keys], dtype=object),
+            raw=raw,
+            normalized=normalized,
+            present=present,
+            empty_normalized=empty_normalized,
+            series=series,
+        )
+
+    def build_season_tensors(self, db: Session):
+        """Precompute the hitting and pitching season tensors for every player."""
+        start = time.time()
+        version = self.global_data_version(db)
+        self.set_season_tensors({mode: self.build_season_tensor(db, mode) for mode in ('hitting', 'pitching')}, version)
+        elapsed = time.time() - start
+        print(f"[PERF] build_season_tensors took {elapsed:.2f}s")
+
+    def global_data_version(self, db: Session) -> int:
+        """The 'global' data_versions counter, bumped by every write in any process; read once per request."""
+        return memoized(('global_data_version',), lambda: db.query(DataVersion.version).filter(DataVersion.key == GLOBAL_VERSION_KEY).scalar() or 0)
+
+    def set_season_tensors(self, tensors: Dict[str, SeasonFeatureTensor], version: int):
+        """Serve whole-population season tensors built from the data at global data version version."""
+        self.season_tensors = tensors
+        self.season_tensors_version = version
+
+    def _current_season_tensors(self, db: Session) -> Dict[str, SeasonFeatureTensor]:
+        """
+        The precomputed season tensors while no write (ingest scripts, other workers) has moved the
+        global data version since they were built; dropped otherwise, so lookups build
+        per-player tensors from the current rows.
+        """
+        if self.season_tensors and self.global_data_version(db) != self.season_tensors_version:
+            print("[CACHE] Data changed since the season tensors were built; dropping them")
+            self.season_tensors = {}
+            self.season_tensors_version = None
+        return self.season_tensors
+
+    def _query_player_levels(self, db: Session, player_ids: Optional[List[int]]) -> Tuple[np.ndarray, list]:
+        player_q = db.query(Player.id, Player.level)
+        if player_ids is not None:
+            player_q = player_q.filter(Player.id.in_(list(player_ids)))
+        player_rows = player_q.all()
+        ids = np.array([int(pid) for pid, _ in player_rows], dtype=np.int64)
+        return ids, [level for _, level in player_rows]
+
+    def _aggregate_stats(self, db: Session, mode: str, ids: np.ndarray, restrict: bool, season: Optional[int] = None, by_season: bool = False):
+        """
+        Run a layout's compiled aggregate queries (ml.feature_registry.compile_aggregates).
+        Yields (model, layout positions per column, player ids, seasons or None, row counts,
+        groups x columns float AVGs with NaN where the column was all NULL).
+        """
+        if len(ids) == 0:
+            return
+        restrict_ids = ids.tolist() if restrict else None
+        for model, positions, stmt in feature_registry.compile_aggregates(mode, by_season, restrict_ids, season):
+            rows = db.execute(stmt).all()
+            if not rows:
+                continue
+            offset = 2 if by_season else 1
+            row_pids = np.array([r[0] for r in rows], dtype=np.int64)
+            seasons = [r[1] for r in rows] if by_season else None
+            counts = np.array([r[offset] for r in rows], dtype=np.int64)
+            # AVG of an integer column comes back as Decimal on PostgreSQL; None (all NULL) becomes NaN
+            avgs = np.array([r[offset + 1:] for r in rows], dtype=float).reshape(len(rows), len(positions))
+            yield model, positions, row_pids, seasons, counts, avgs
+
+    def _pack_features(self, mode: str, means: np.ndarray, level_factors: np.ndarray):
+        """Apply level weighting to grouped means and append the level/age slots. Returns raw, normalized, present, confidence."""
+        n_rows = means.shape[0]
+        # Level-factor weighting; percentages above .500 are treated as rates around a .250 baseline
+        is_pct = feature_registry.is_pct_mask(mode)
+        lf = level_factors[:, None]
+        weighted = np.where(is_pct & (means > 0.5), 0.250 + (means - 0.250) * lf, means * lf)
+        present = np.concatenate([~np.isnan(means), np.ones((n_rows, 2), dtype=bool)], axis=1)
+        raw = np.concatenate([np.nan_to_num(weighted, nan=0.0), lf * 100, np.ones((n_rows, 1))], axis=1)
+        normalized = self._normalize_features(raw, mode)
+        confidence = 100.0 * present.sum(axis=1) / present.shape[1]
+        return raw, normalized, present, confidence
+
+    def rows_by_player(self, bulk: Optional[dict]) -> Dict[int, dict]:
+        """Split a bulk feature matrix into per-player dicts shaped like extract_player_features output."""
+        if bulk is None:
+            return {}
+        rows = {}
+        for i, pid in enumerate(bulk["player_ids"]):
+            rows[int(pid)] = {
+                "raw": bulk["raw"][i],
+                "normalized": bulk["normalized"][i],
+                "level": bulk["level"][i],
+                "level_factor": float(bulk["level_factor"][i]),
+                "confidence": float(bulk["confidence"][i]),
+                "present": [bool(p) for p in bulk["present"][i]],
+            }
+        return rows
     
     def _get_age_factor(self, graduation_year: int) -> float:
         """Convert graduation year to age factor"""
@@ -482,9 +602,30 @@ class BaseballMLService:
         else:
             return max(0.6, 1.0 - (age - 30) * 0.05)
     
-    def fit_models(self, db: Session):
-        """Fit separate models for pitchers and position players using the correct feature sets."""
+    def fit_models(self, db: Session, workers: Optional[int] = None):
+        """Fit the models synchronously and publish them. Stored comps of the previous generation are dropped."""
+        snapshot = self.build_snapshot(db, workers=workers)
+        if snapshot is not None:
+            self.publish_snapshot(snapshot)
+            self.invalidate_comparisons(db)
+
+    def build_snapshot(self, db: Session, progress=None, workers: Optional[int] = None) -> Optional[ModelSnapshot]:
+        """
+        _build_snapshot, at most one at a time per process: a caller arriving while a fit is
+        running waits for it and gets the same snapshot (its own progress is not reported).
+        """
+        return fit_flight.do('fit', lambda: self._build_snapshot(db, progress=progress, workers=workers))
+
+    def _build_snapshot(self, db: Session, progress=None, workers: Optional[int] = None) -> Optional[ModelSnapshot]:
+        """
+        Fit separate models for pitchers and position players using the correct feature sets and
+        return them as a new ModelSnapshot. The served snapshot is not touched; progress, if
+        given, is called as progress(stage, fraction) between steps. Feature extraction runs on
+        up to workers processes (default ML_EXTRACT_WORKERS).
+        """
+        report = progress or (lambda stage, fraction: None)
         try:
+            report('level_weights', 0.0)
             # Compute data-driven level weights first (do not force recompute unless needed)
             self.compute_level_weights_from_data(db, force=False)
             
@@ -493,13 +634,21 @@ class BaseballMLService:
             pitcher_feats, pitcher_ids, pitcher_overalls = [], [], []
             hitter_feats, hitter_ids, hitter_overalls = [], [], []
             
+            # Extract each mode's feature matrix in bulk, then walk players in query order
+            report('extract_features', 0.1)
+            ptypes = {int(p.id): self.get_player_type(p) for p in players if getattr(p, 'id', None) is not None}
+            hit_ids = [pid for pid, t in ptypes.items() if t in ('position_player', 'dh', 'two_way')]
+            pit_ids = [pid for pid, t in ptypes.items() if t in ('pitcher', 'two_way')]
+            hit_rows = self.rows_by_player(self.extract_features_parallel(db, player_ids=hit_ids, mode='hitting', workers=workers))
+            pit_rows = self.rows_by_player(self.extract_features_parallel(db, player_ids=pit_ids, mode='pitching', workers=workers))
+            
             for player in players:
                 player_id = getattr(player, 'id', None)
                 if player_id is None:
                     continue
-                ptype = self.get_player_type(player)
+                ptype = ptypes[int(player_id)]
                 if ptype == 'pitcher':
-                    feats = self.extract_player_features(db, int(player_id), mode='pitching')
+                    feats = pit_rows.get(int(player_id))
                     if feats is not None and np.any(feats["raw"] != 0):
                         pitcher_feats.append(feats["normalized"])
                         pitcher_ids.append(int(player_id))
@@ -516,7 +665,7 @@ class BaseballMLService:
                         pitcher_target = (era_score * 0.25 + k_score * 0.25 + bb_score * 0.2 + whip_score * 0.2 + war_score * 0.1)
                         pitcher_overalls.append(pitcher_target)
                 elif ptype in ('position_player', 'dh'):
-                    feats = self.extract_player_features(db, int(player_id), mode='hitting')
+                    feats = hit_rows.get(int(player_id))
                     if feats is not None and np.any(feats["raw"] != 0):
                         hitter_feats.append(feats["normalized"])
                         hitter_ids.append(int(player_id))
@@ -538,8 +687,8 @@ class BaseballMLService:
                         hitter_overalls.append(hitter_target)
                 elif ptype == 'two_way':
                     # Add to both
-                    feats_hit = self.extract_player_features(db, int(player_id), mode='hitting')
-                    feats_pit = self.extract_player_features(db, int(player_id), mode='pitching')
+                    feats_hit = hit_rows.get(int(player_id))
+                    feats_pit = pit_rows.get(int(player_id))
                     if feats_hit is not None and np.any(feats_hit["raw"] != 0):
                         hitter_feats.append(feats_hit["normalized"])
                         hitter_ids.append(int(player_id))
@@ -569,47 +718,292 @@ class BaseballMLService:
                         pitcher_target = (era_score * 0.25 + k_score * 0.25 + bb_score * 0.2 + whip_score * 0.2 + war_score * 0.1)
                         pitcher_overalls.append(pitcher_target)
             
+            fitted = {'metrics': {"rmse": None, "r2": None}}
             # Fit pitcher model
+            report('fit_pitching', 0.5)
             if len(pitcher_feats) >= 10:
                 Xp = np.array(pitcher_feats)
                 yp = np.array(pitcher_overalls)
-                self.scaler_pit = StandardScaler().fit(Xp)
-                self.knn_model_pit = NearestNeighbors(n_neighbors=10, algorithm='ball_tree').fit(self.scaler_pit.transform(Xp))
-                self.pca_pit = PCA(n_components=1).fit(Xp)
-                self.pca_weights_pit = self.pca_pit.components_[0]
-                self.pitcher_ids = pitcher_ids
-                self.Xp_scaled = self.scaler_pit.transform(Xp)
+                scaler_pit = StandardScaler().fit(Xp)
+                pca_pit = PCA(n_components=1).fit(Xp)
+                fitted.update(
+                    scaler_pit=scaler_pit,
+                    knn_model_pit=build_comp_index(scaler_pit.transform(Xp)),
+                    pca_pit=pca_pit,
+                    pca_weights_pit=pca_pit.components_[0],
+                    pitcher_ids=pitcher_ids,
+                    Xp_scaled=scaler_pit.transform(Xp),
+                )
             
             # Fit hitter model
+            report('fit_hitting', 0.65)
             if len(hitter_feats) >= 10:
                 Xh = np.array(hitter_feats)
                 yh = np.array(hitter_overalls)
-                self.scaler_hit = StandardScaler().fit(Xh)
-                self.knn_model_hit = NearestNeighbors(n_neighbors=10, algorithm='ball_tree').fit(self.scaler_hit.transform(Xh))
-                self.pca_hit = PCA(n_components=1).fit(Xh)
-                self.pca_weights_hit = self.pca_hit.components_[0]
-                self.hitter_ids = hitter_ids
-                self.Xh_scaled = self.scaler_hit.transform(Xh)
+                scaler_hit = StandardScaler().fit(Xh)
+                pca_hit = PCA(n_components=1).fit(Xh)
+                fitted.update(
+                    scaler_hit=scaler_hit,
+                    knn_model_hit=build_comp_index(scaler_hit.transform(Xh)),
+                    pca_hit=pca_hit,
+                    pca_weights_hit=pca_hit.components_[0],
+                    hitter_ids=hitter_ids,
+                    Xh_scaled=scaler_hit.transform(Xh),
+                )
                 
                 # --- Train RandomForestRegressor for overall rating and compute metrics ---
                 if len(Xh) > 10:
+                    report('fit_overall_rating', 0.75)
                     X_train, X_test, y_train, y_test = train_test_split(Xh, yh, test_size=0.2, random_state=42)
-                    self.overall_rating_model.fit(X_train, y_train)
-                    y_pred = self.overall_rating_model.predict(X_test)
-                    self.metrics['rmse'] = float(mean_squared_error(y_test, y_pred) ** 0.5)
-                    self.metrics['r2'] = float(r2_score(y_test, y_pred))
-                else:
-                    self.metrics['rmse'] = None
-                    self.metrics['r2'] = None
-            else:
-                self.metrics['rmse'] = None
-                self.metrics['r2'] = None
+                    overall_rating_model = RandomForestRegressor(n_estimators=100, random_state=42).fit(X_train, y_train)
+                    y_pred = overall_rating_model.predict(X_test)
+                    fitted['overall_rating_model'] = overall_rating_model
+                    fitted['metrics'] = {
+                        'rmse': float(mean_squared_error(y_test, y_pred) ** 0.5),
+                        'r2': float(r2_score(y_test, y_pred)),
+                    }
+            
+            if COMP_INDEX_POPULATION == 'bref':
+                # Scalers and models stay fit on MLB players; only the searchable population grows
+                report('index_population', 0.85)
+                for mode, types, scaler_attr, ids_attr, x_attr, knn_attr in (
+                    ('hitting', ('position_player', 'dh', 'two_way'), 'scaler_hit', 'hitter_ids', 'Xh_scaled', 'knn_model_hit'),
+                    ('pitching', ('pitcher', 'two_way'), 'scaler_pit', 'pitcher_ids', 'Xp_scaled', 'knn_model_pit'),
+                ):
+                    if scaler_attr not in fitted:
+                        continue
+                    index_ids, index_X = self._comp_population_rows(db, mode, types, fitted[scaler_attr])
+                    if len(index_ids) >= 10:
+                        fitted.update({ids_attr: index_ids, x_attr: index_X, knn_attr: build_comp_index(index_X)})
             
-            self.is_fitted = True
+            report('comp_partitions', 0.88)
+            for mode, ids_attr, x_attr, part_attr in (
+                ('hitting', 'hitter_ids', 'Xh_scaled', 'comp_partitions_hit'),
+                ('pitching', 'pitcher_ids', 'Xp_scaled', 'comp_partitions_pit'),
+            ):
+                if ids_attr in fitted:
+                    fitted[part_attr] = self.build_comp_partitions(db, mode, fitted[ids_attr], fitted[x_attr])
+            
+            report('fitted', 0.9)
+            return ModelSnapshot(
+                model_version=datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S'),
+                data_version=model_store.compute_data_version(db),
+                **fitted,
+            )
         except Exception as e:
             logger.error(f"Error fitting models: {e}")
-            self.metrics['rmse'] = None
-            self.metrics['r2'] = None
+            return None
+    
+    def save_models(self, db: Session) -> Optional[Dict]:
+        """Persist the served snapshot as a versioned artifact bundle."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        return model_store.save_bundle(self, snapshot, db)
+
+    def load_models(self) -> bool:
+        """Restore the latest persisted model bundle. Returns False when none is available."""
+        bundle = model_store.load_bundle()
+        if bundle is None:
+            return False
+        state = bundle['state']
+        for attr in model_store.SERVICE_ATTRS:
+            if attr in state:
+                setattr(self, attr, state[attr])
+        self.publish_snapshot(ModelSnapshot(
+            model_version=bundle['meta']['model_version'],
+            data_version=bundle['meta']['data_version'],
+            **{name: value for name, value in state.items() if name in SNAPSHOT_FIELDS},
+        ))
+        print(f"[ML] Loaded model bundle {self.model_version} (data version {self.trained_data_version})")
+        return True
+
+    def _partition_keys(self, db: Session, mode: str, player_ids: Optional[List[int]] = None) -> Dict[int, Tuple[str, int, str]]:
+        """(position group, most recent season, age bucket in that season) per player from the mode's standard table."""
+        model = StandardPitchingStat if mode == 'pitching' else StandardBattingStat
+        player_q = db.query(Player.id, Player.primary_position)
+        stat_q = db.query(model.player_id, model.season, model.age)
+        if player_ids is not None:
+            player_q = player_q.filter(Player.id.in_(list(player_ids)))
+            stat_q = stat_q.filter(model.player_id.in_(list(player_ids)))
+        latest: Dict[int, Tuple[int, float]] = {}
+        rows = stat_q.all()
+        seasons = _to_float_array([r[1] for r in rows])
+        ages = _to_float_array([r[2] for r in rows])
+        for (pid, _, _), season, age in zip(rows, seasons, ages):
+            if np.isnan(season):
+                continue
+            if int(pid) not in latest or season > latest[int(pid)][0]:
+                latest[int(pid)] = (int(season), age)
+        keys = {}
+        for pid, primary_position in player_q.all():
+            season, age = latest.get(int(pid), (-1, np.nan))
+            keys[int(pid)] = (position_group(primary_position), season, age_bucket(age))
+        return keys
+
+    def build_comp_partitions(self, db: Session, mode: str, ids: List[int], X: np.ndarray,
+                              previous: Optional[PartitionedCompIndex] = None, changed=None) -> PartitionedCompIndex:
+        """
+        Partitioned comp index over an index matrix. With previous, keys of unchanged players are
+        reused so only the changed players are looked up.
+        """
+        if previous is not None and changed is not None:
+            keys = {int(pid): (pos, int(season), bucket) for pid, pos, season, bucket in zip(previous.ids, previous.positions, previous.last_seasons, previous.age_buckets)}
+            keys.update(self._partition_keys(db, mode, [pid for pid in ids if pid in changed or pid not in keys]))
+        else:
+            keys = self._partition_keys(db, mode, None if COMP_INDEX_POPULATION == 'bref' or len(ids) > 5000 else ids)
+        missing = ('UT', -1, 'unknown')
+        return PartitionedCompIndex(
+            ids, X,
+            [keys.get(int(pid), missing)[0] for pid in ids],
+            [keys.get(int(pid), missing)[1] for pid in ids],
+            [keys.get(int(pid), missing)[2] for pid in ids],
+        )
+
+    def _in_comp_population(self, player, population: Optional[str] = None) -> bool:
+        if (population or COMP_INDEX_POPULATION) == 'bref':
+            return getattr(player, 'bref_id', None) is not None
+        return getattr(player, 'level', None) == 'MLB'
+
+    def _comp_population_rows(self, db: Session, mode: str, types: Tuple[str, ...], scaler, population: Optional[str] = None) -> Tuple[List[int], np.ndarray]:
+        """Ids and scaled feature rows of every indexable player of the given types, from one bulk extraction."""
+        players = db.query(Player.id, Player.primary_position, Player.level, Player.bref_id).all()
+        wanted = {int(p.id) for p in players if self._in_comp_population(p, population) and self.get_player_type(p) in types}
+        bulk = self.extract_features_bulk(db, mode=mode)
+        if bulk is None or not wanted:
+            return [], np.empty((0, 0))
+        rows = [i for i, pid in enumerate(bulk["player_ids"]) if int(pid) in wanted and np.any(bulk["raw"][i] != 0)]
+        if not rows:
+            return [], np.empty((0, 0))
+        return [int(pid) for pid in bulk["player_ids"][rows]], scaler.transform(bulk["normalized"][rows])
+
+    def invalidate_players(self, player_ids: List[int]):
+        """Drop in-memory state derived from these players' stats after they changed."""
+        # Stale rows stay in the cached matrix but are no longer indexed, so lookups go to the DB
+        index = self._feature_cache.get('index', {})
+        for pid in player_ids:
+            index.pop(int(pid), None)
+        # A precomputed season tensor holding stale rows is dropped whole; lookups fall back to per-player tensors
+        for mode, tensor in list(self.season_tensors.items()):
+            if any(pid in tensor for pid in player_ids):
+                del self.season_tensors[mode]
+
+    def refresh_comp_index(self, db: Session, player_ids: List[int]) -> Dict[str, set]:
+        """
+        Re-embed only the given players in the fitted hitter/pitcher comp indexes: their rows are
+        re-extracted and transformed with the existing scalers, new MLB players are appended and
+        players who no longer qualify are dropped. The comp indexes are rebuilt from the stored
+        matrices, so no other player is re-extracted and the scalers are not refit. A mode's
+        index is only rebuilt when one of its rows moved, entered or left. The result is
+        published as a new snapshot unless a refit replaced the served one meanwhile.
+        Returns {mode: ids of the rows that moved, entered or left} for the rebuilt modes.
+        """
+        moved_by_mode: Dict[str, set] = {}
+        base = self.snapshot
+        if base is None or not player_ids:
+            return moved_by_mode
+        players = db.query(Player).filter(Player.id.in_(list(player_ids))).all()
+        ptypes = {int(p.id): self.get_player_type(p) for p in players if self._in_comp_population(p)}
+        changed = {int(pid) for pid in player_ids}
+        changes = {}
+        for mode, types, ids_attr, x_attr, knn_attr, part_attr in (
+            ('hitting', ('position_player', 'dh', 'two_way'), 'hitter_ids', 'Xh_scaled', 'knn_model_hit', 'comp_partitions_hit'),
+            ('pitching', ('pitcher', 'two_way'), 'pitcher_ids', 'Xp_scaled', 'knn_model_pit', 'comp_partitions_pit'),
+        ):
+            scaler, _, index_ids, index_X = base.comp_model(mode)
+            if scaler is None or index_X is None:
+                continue
+            eligible = [pid for pid, t in ptypes.items() if t in types]
+            rows = self.rows_by_player(self.extract_features_bulk(db, player_ids=eligible, mode=mode)) if eligible else {}
+            rows = {pid: feats for pid, feats in rows.items() if np.any(feats["raw"] != 0)}
+            moved = set()
+            ids, X = [], []
+            for pid, vec in zip(index_ids, index_X):
+                if int(pid) in changed and int(pid) not in rows:
+                    moved.add(int(pid))
+                    continue
+                ids.append(pid)
+                X.append(vec)
+            position = {int(pid): i for i, pid in enumerate(ids)}
+            for pid, feats in rows.items():
+                scaled = scaler.transform(feats["normalized"].reshape(1, -1))[0]
+                if pid in position:
+                    if np.array_equal(X[position[pid]], scaled):
+                        continue
+                    X[position[pid]] = scaled
+                else:
+                    position[pid] = len(ids)
+                    ids.append(pid)
+                    X.append(scaled)
+                moved.add(pid)
+            if not moved or len(X) < 10:
+                continue
+            X = np.array(X)
+            changes[ids_attr] = ids
+            changes[x_attr] = X
+            changes[knn_attr] = build_comp_index(X)
+            changes[part_attr] = self.build_comp_partitions(db, mode, ids, X, previous=base.comp_partitions(mode), changed=changed)
+            moved_by_mode[mode] = moved
+        if changes and not self.publish_snapshot(base.replace(**changes), expected=base):
+            print("[ML] Models were refit during the comp index refresh; keeping the refit.")
+            return {}
+        if moved_by_mode:
+            print(f"[ML] Comp indexes {', '.join(moved_by_mode)} refreshed for {len(player_ids)} changed players.")
+        return moved_by_mode
+
+    def players_with_affected_comps(self, db: Session, previous: ModelSnapshot, moved_by_mode: Dict[str, set]) -> set:
+        """
+        Players whose stored comps may differ now that the index rows of moved_by_mode moved,
+        entered or left since the previous snapshot: those whose stored comps name a moved row,
+        and those an old or new position of a moved row may lie within reach of. For the latter,
+        a player's nearest stored comp c at distance d bounds the distance to any row x from
+        below by |x - c| - d (triangle inequality), so x can only be among the player's
+        neighbors when |x - c| - d <= r, r being the player's farthest stored distance.
+        """
+        current = self.snapshot
+        moved_ids = set().union(*moved_by_mode.values()) if moved_by_mode else set()
+        if current is None or not moved_ids:
+            return set()
+        affected = set()
+        for i in range(0, len(moved_ids), 500):
+            batch = list(moved_ids)[i:i + 500]
+            affected.update(pid for (pid,) in db.query(PlayerComparison.player_id).filter(PlayerComparison.comp_player_id.in_(batch)).distinct().all())
+        nearest = dict(db.query(PlayerComparison.player_id, PlayerComparison.comp_player_id).filter(PlayerComparison.rank == 0).all())
+        stored = db.query(
+            PlayerComparison.player_id, func.min(PlayerComparison.distance), func.max(PlayerComparison.distance), func.count(PlayerComparison.id),
+        ).group_by(PlayerComparison.player_id).all()
+        # A player holding fewer comps than others took the whole index, so any new row joins its list
+        most = max((count for *_, count in stored), default=0)
+        reach = {pid: (float(d0 or 0.0), float(r or 0.0) if count >= most else np.inf) for pid, d0, r, count in stored}
+        for mode, moved in moved_by_mode.items():
+            positions = []
+            for snapshot in (previous, current):
+                _, _, index_ids, index_X = snapshot.comp_model(mode) if snapshot is not None else (None, None, None, None)
+                if index_ids is None or index_X is None:
+                    continue
+                rows = [i for i, pid in enumerate(index_ids) if int(pid) in moved]
+                if rows:
+                    positions.append(np.asarray(index_X)[rows])
+            _, _, index_ids, index_X = current.comp_model(mode)
+            if not positions or index_ids is None:
+                continue
+            positions = np.vstack(positions)
+            row_of = {int(pid): i for i, pid in enumerate(index_ids)}
+            candidates = [(pid, row_of[c]) for pid, c in nearest.items() if pid not in affected and c in row_of]
+            if not candidates:
+                continue
+            anchors = sorted({row for _, row in candidates})
+            anchor_X = np.asarray(index_X)[anchors]
+            closest = np.full(len(anchors), np.inf)
+            for start in range(0, len(positions), 256):
+                block = positions[start:start + 256]
+                closest = np.minimum(closest, pairwise_distances(anchor_X, block).min(axis=1))
+            closest_of = dict(zip(anchors, closest))
+            for pid, row in candidates:
+                d0, r = reach[pid]
+                if closest_of[row] - d0 <= r:
+                    affected.add(pid)
+        return affected
     
     def _calculate_basic_overall_rating(self, features: np.ndarray) -> float:
         """Calculate basic overall rating from features"""
@@ -623,32 +1017,24 @@ class BaseballMLService:
     def get_similar_players(self, db: Session, player_id: int, k: int = 5) -> List[Dict]:
         start = time.time()
         """Find similar MLB players using KNN"""
-        if not self.is_fitted:
-            self.fit_models(db)
-        player = db.query(Player).filter(Player.id == player_id).first()
+        # Read the snapshot once so scaler, index and ids all come from the same generation
+        snapshot = self.snapshot
+        if snapshot is None:
+            return []
+        player = self._player(db, player_id)
         if not player:
             return []
         ptype = self.get_player_type(player)
-        features = None
-        scaler = None
-        knn_model = None
-        player_ids = None
         if ptype == 'pitcher':
-            if not hasattr(self, 'scaler_pit') or not hasattr(self, 'knn_model_pit') or not hasattr(self, 'pitcher_ids'):
-                return []
-            scaler = self.scaler_pit
-            knn_model = self.knn_model_pit
-            player_ids = self.pitcher_ids
-            features = self.extract_player_features(db, int(player_id), mode='pitching')
+            mode = 'pitching'
         elif ptype in ('position_player', 'dh'):
-            if not hasattr(self, 'scaler_hit') or not hasattr(self, 'knn_model_hit') or not hasattr(self, 'hitter_ids'):
-                return []
-            scaler = self.scaler_hit
-            knn_model = self.knn_model_hit
-            player_ids = self.hitter_ids
-            features = self.extract_player_features(db, int(player_id), mode='hitting')
+            mode = 'hitting'
         else:
             return []
+        scaler, knn_model, player_ids, _ = snapshot.comp_model(mode)
+        if scaler is None or knn_model is None or player_ids is None:
+            return []
+        features = self.extract_player_features(db, int(player_id), mode=mode)
         if features is None or scaler is None or knn_model is None or player_ids is None:
             return []
         try:
@@ -661,7 +1047,7 @@ class BaseballMLService:
         today = datetime.date.today().isoformat()
         for i, (distance, idx) in enumerate(zip(distances[0][1:], indices[0][1:])):  # Skip first (self)
             similar_player_id = player_ids[idx]
-            player = db.query(Player).filter(Player.id == similar_player_id).first()
+            player = self._player(db, similar_player_id)
             if player:
                 similar_players.append({
                     'id': i,
@@ -676,6 +1062,179 @@ class BaseballMLService:
         print(f"[PERF] get_similar_players for player {player_id} took {elapsed:.2f}s")
         return similar_players
     
+    def get_filtered_similar_players(self, db: Session, player_id: int, k: int = 5, same_position: bool = False,
+                                     same_age: bool = False, since_season: Optional[int] = None,
+                                     until_season: Optional[int] = None) -> List[Dict]:
+        """
+        get_similar_players restricted to comps at the player's position group and/or age bucket
+        and/or with a most recent season in [since_season, until_season]. Only the matching
+        partitions are searched, so filtered queries return a full k like unfiltered ones.
+        """
+        start = time.time()
+        snapshot = self.snapshot
+        if snapshot is None:
+            return []
+        player = db.query(Player).filter(Player.id == player_id).first()
+        if not player:
+            return []
+        ptype = self.get_player_type(player)
+        if ptype == 'pitcher':
+            mode = 'pitching'
+        elif ptype in ('position_player', 'dh'):
+            mode = 'hitting'
+        else:
+            return []
+        scaler, _, _, _ = snapshot.comp_model(mode)
+        partitions = snapshot.comp_partitions(mode)
+        if scaler is None or partitions is None:
+            return []
+        features = self.extract_player_features(db, int(player_id), mode=mode)
+        if features is None:
+            return []
+        position, _, bucket = self._partition_keys(db, mode, [int(player_id)]).get(int(player_id), ('UT', -1, 'unknown'))
+        comps = partitions.kneighbors(
+            scaler.transform(features["normalized"].reshape(1, -1))[0], k,
+            positions=[position] if same_position else None,
+            age_buckets=[bucket] if same_age else None,
+            since_season=since_season, until_season=until_season,
+            exclude_ids=[int(player_id)],
+        )
+        comp_ids = [comp_id for comp_id, _ in comps]
+        meta = {
+            int(pid): (full_name, team)
+            for pid, full_name, team in db.query(Player.id, Player.full_name, Player.team).filter(Player.id.in_(comp_ids)).all()
+        } if comp_ids else {}
+        today = datetime.date.today().isoformat()
+        similar_players = [{
+            'id': i,
+            'mlb_player_id': comp_id,
+            'mlb_player_name': meta[comp_id][0],
+            'mlb_player_team': meta[comp_id][1],
+            'similarity_score': 1.0 / (1.0 + distance),
+            'comparison_reason': 'Statistical similarity',
+            'comp_date': today
+        } for i, (comp_id, distance) in enumerate(comps) if comp_id in meta]
+        elapsed = time.time() - start
+        print(f"[PERF] get_filtered_similar_players for player {player_id} took {elapsed:.2f}s")
+        return similar_players
+
+    def _comp_neighbors(self, db: Session, player_ids: Optional[List[int]] = None, k: int = 10) -> Dict[int, List[Tuple[int, float]]]:
+        """
+        Nearest comps for many players with one feature extraction and one kneighbors call per
+        model. Returns {player_id: [(comp_player_id, distance), ...]} nearest first, with the
+        query's own nearest hit skipped as in get_similar_players.
+        """
+        player_q = db.query(Player)
+        if player_ids is not None:
+            player_q = player_q.filter(Player.id.in_(list(player_ids)))
+        ptypes = {int(p.id): self.get_player_type(p) for p in player_q.all()}
+        neighbors: Dict[int, List[Tuple[int, float]]] = {}
+        snapshot = self.snapshot
+        if snapshot is None:
+            return neighbors
+        for mode, types in (('hitting', ('position_player', 'dh')), ('pitching', ('pitcher',))):
+            wanted = [pid for pid, t in ptypes.items() if t in types]
+            scaler, knn_model, index_ids, _ = snapshot.comp_model(mode)
+            if not wanted or scaler is None or knn_model is None or index_ids is None:
+                continue
+            # Whole-population runs extract everyone in one pass rather than through a huge IN list
+            bulk = self.extract_features_bulk(db, player_ids=wanted if player_ids is not None else None, mode=mode)
+            if bulk is None:
+                continue
+            wanted_set = set(wanted)
+            rows = [i for i, pid in enumerate(bulk["player_ids"]) if int(pid) in wanted_set]
+            if not rows:
+                continue
+            features_scaled = scaler.transform(bulk["normalized"][rows])
+            distances, indices = knn_model.kneighbors(features_scaled, n_neighbors=min(k + 1, len(index_ids)))
+            for row, pid in enumerate(bulk["player_ids"][rows]):
+                neighbors[int(pid)] = [(int(index_ids[j]), float(d)) for d, j in zip(distances[row][1:], indices[row][1:])]
+        return neighbors
+
+    def get_similar_players_bulk(self, db: Session, player_ids: List[int], k: int = 5) -> Dict[int, List[Dict]]:
+        """
+        get_similar_players for many players in one pass: bulk feature rows, one kneighbors
+        call per model and one IN query for every neighbor's name and team.
+        """
+        start = time.time()
+        neighbors = self._comp_neighbors(db, list(player_ids), k=k)
+        comp_ids = {comp_id for comps in neighbors.values() for comp_id, _ in comps}
+        meta = {
+            int(pid): (full_name, team)
+            for pid, full_name, team in db.query(Player.id, Player.full_name, Player.team).filter(Player.id.in_(comp_ids)).all()
+        } if comp_ids else {}
+        today = datetime.date.today().isoformat()
+        results: Dict[int, List[Dict]] = {}
+        for pid, comps in neighbors.items():
+            results[pid] = [{
+                'id': i,
+                'mlb_player_id': comp_id,
+                'mlb_player_name': meta[comp_id][0],
+                'mlb_player_team': meta[comp_id][1],
+                'similarity_score': 1.0 / (1.0 + distance),
+                'comparison_reason': 'Statistical similarity',
+                'comp_date': today
+            } for i, (comp_id, distance) in enumerate(comps) if comp_id in meta]
+        elapsed = time.time() - start
+        print(f"[PERF] get_similar_players_bulk for {len(player_ids)} players took {elapsed:.2f}s")
+        return results
+
+    def compute_comparisons(self, db: Session, player_ids: Optional[List[int]] = None, k: int = 10) -> int:
+        """Batch job: compute top-k comps for the given players (default: everyone) and store them in player_comparisons."""
+        start = time.time()
+        if not self.is_fitted:
+            print("[ML] No fitted models; run scripts/train_models.py before computing comps.")
+            return 0
+        neighbors = self._comp_neighbors(db, player_ids, k=k)
+        stale = db.query(PlayerComparison)
+        if player_ids is not None:
+            stale = stale.filter(PlayerComparison.player_id.in_(list(player_ids)))
+        stale.delete(synchronize_session=False)
+        now = datetime.datetime.utcnow()
+        db.bulk_insert_mappings(PlayerComparison, [
+            {
+                'player_id': pid,
+                'rank': rank,
+                'comp_player_id': comp_id,
+                'distance': distance,
+                'similarity_score': 1.0 / (1.0 + distance),
+                'computed_at': now,
+            }
+            for pid, comps in neighbors.items()
+            for rank, (comp_id, distance) in enumerate(comps)
+        ])
+        bump_data_versions(db, neighbors.keys())
+        db.commit()
+        elapsed = time.time() - start
+        print(f"[PERF] compute_comparisons for {len(neighbors)} players took {elapsed:.2f}s")
+        return len(neighbors)
+
+    def get_stored_comparisons(self, db: Session, player_id: int, k: int = 5) -> List[Dict]:
+        """Read precomputed comps from player_comparisons, shaped like get_similar_players output."""
+        rows = (
+            db.query(PlayerComparison, Player.full_name, Player.team)
+            .join(Player, Player.id == PlayerComparison.comp_player_id)
+            .filter(PlayerComparison.player_id == player_id)
+            .order_by(PlayerComparison.rank)
+            .limit(k)
+            .all()
+        )
+        return [{
+            'id': comp.rank,
+            'mlb_player_id': comp.comp_player_id,
+            'mlb_player_name': full_name,
+            'mlb_player_team': team,
+            'similarity_score': comp.similarity_score,
+            'comparison_reason': 'Statistical similarity',
+            'comp_date': comp.computed_at.date().isoformat() if comp.computed_at else None,
+        } for comp, full_name, team in rows]
+
+    def invalidate_comparisons(self, db: Session):
+        """Stored comps refer to the previous index generation; drop them after a refit."""
+        db.query(PlayerComparison).delete(synchronize_session=False)
+        bump_data_versions(db)
+        db.commit()
+    
     def get_player_type(self, player) -> str:
         """
         Classify player as 'pitcher', 'position_player', or 'two_way' using only primary_position.
@@ -738,279 +1297,167 @@ class BaseballMLService:
         potential = min(99, current_overall + scaling * trend)
         return potential
 
-    def _get_recent_overalls(self, db, player_id: int, mode: str, n_seasons: int = 3) -> list:
-        if mode == 'hitting':
-            stats = db.query(StandardBattingStat).filter(StandardBattingStat.player_id == player_id).order_by(StandardBattingStat.season.asc()).all()
-        elif mode == 'pitching':
-            stats = db.query(StandardPitchingStat).filter(StandardPitchingStat.player_id == player_id).order_by(StandardPitchingStat.season.asc()).all()
-        else:
-            return []
-        overalls = []
-        for stat in stats[-n_seasons:]:
-            season = getattr(stat, 'season', None)
-            feats = self.extract_player_features(db, player_id, mode=mode, season=season)
-            if feats is None:
-                continue
-            norm = feats["normalized"]
-            if mode == 'hitting':
-                contact = np.mean([norm[0], norm[1], norm[2], norm[3], norm[4]])
-                power = np.mean([norm[5], norm[6], norm[7], norm[8]])
-                discipline = np.mean([norm[9], norm[10], norm[11], norm[12]])
-                vision = np.mean([norm[9], norm[10], norm[0]])
-                fielding = norm[15] if len(norm) > 17 else 40.0
-                arm_strength = norm[18] if len(norm) > 19 else 40.0
-                arm_accuracy = norm[18] if len(norm) > 18 else 40.0
-                speed = norm[13] if len(norm) > 14 else 40.0
-                stealing = norm[13] if len(norm) > 14 else 40.0
-                tool_vals = [float(x) if x is not None else 40.0 for x in [contact, power, discipline, vision, fielding, arm_strength, arm_accuracy, speed, stealing]]
-                top_tools = sorted(tool_vals, reverse=True)[:4]
-                overall = np.mean(top_tools)
-            elif mode == 'pitching':
-                k_rating = norm[0] if len(norm) > 0 else 40.0
-                bb_rating = 100 - (norm[1] if len(norm) > 1 else 40.0)
-                gb_rating = norm[19] if len(norm) > 19 else 40.0
-                hr_rating = 100 - (norm[2] if len(norm) > 2 else 40.0)
-                command_rating = float(np.mean([norm[3], norm[4], norm[5], norm[20], norm[21], norm[22], norm[23], norm[7], norm[9]]))
-                tool_vals = [float(x) if x is not None else 40.0 for x in [k_rating, bb_rating, gb_rating, hr_rating, command_rating]]
-                top_tools = sorted(tool_vals, reverse=True)[:3]
-                overall = np.mean(top_tools)
-            else:
-                overall = 40.0
-            overalls.append(overall)
-        return overalls[-n_seasons:]
+    def _season_tensor_for(self, db: Session, player_id: int, mode: str, tensors: Optional[Dict[str, SeasonFeatureTensor]] = None) -> SeasonFeatureTensor:
+        """Precomputed season tensor if it covers the player, else a one-player tensor (one query per table)."""
+        tensor = (tensors if tensors is not None else self._current_season_tensors(db)).get(mode)
+        if tensor is not None and player_id in tensor:
+            return tensor
+        return self.build_season_tensor(db, mode, player_ids=[player_id])
 
-    def _get_recent_overalls_with_seasons(self, db, player_id: int, mode: str, n_seasons: int = 5) -> list:
+    def _overalls_from_normalized(self, norm: np.ndarray, mode: str) -> np.ndarray:
+        """Per-season overall from a (seasons x features) normalized matrix: mean of the top hitting (4) or pitching (3) tools."""
+        return rating_engine.season_overalls(norm, mode)
+
+    def _get_recent_overalls(self, db, player_id: int, mode: str, n_seasons: int = 3, tensor: Optional[SeasonFeatureTensor] = None) -> list:
+        history = self._get_recent_overalls_with_seasons(db, player_id, mode, n_seasons=n_seasons, tensor=tensor)
+        return [h["overall"] for h in history]
+
+    def _get_recent_overalls_with_seasons(self, db, player_id: int, mode: str, n_seasons: int = 5, tensor: Optional[SeasonFeatureTensor] = None) -> list:
         """
         Fetch the last n_seasons' (season, overall) for a player (batting or pitching), oldest to newest.
+        Sliced from the season tensor, so the whole series is one vectorized computation.
         """
-        if mode == 'hitting':
-            stats = db.query(StandardBattingStat).filter(StandardBattingStat.player_id == player_id).order_by(StandardBattingStat.season.asc()).all()
-        elif mode == 'pitching':
-            stats = db.query(StandardPitchingStat).filter(StandardPitchingStat.player_id == player_id).order_by(StandardPitchingStat.season.asc()).all()
-        else:
+        if mode not in ('hitting', 'pitching'):
             return []
-        results = []
-        for stat in stats[-n_seasons:]:
-            season = getattr(stat, 'season', None)
-            feats = self.extract_player_features(db, player_id, mode=mode, season=season)
-            if feats is None:
-                continue
-            norm = feats["normalized"]
-            if mode == 'hitting':
-                contact = np.mean([norm[0], norm[1], norm[2], norm[3], norm[4]])
-                power = np.mean([norm[5], norm[6], norm[7], norm[8]])
-                discipline = np.mean([norm[9], norm[10], norm[11], norm[12]])
-                vision = np.mean([norm[9], norm[10], norm[0]])
-                fielding = norm[15] if len(norm) > 17 else 40.0
-                arm_strength = norm[18] if len(norm) > 19 else 40.0
-                arm_accuracy = norm[18] if len(norm) > 18 else 40.0
-                speed = norm[13] if len(norm) > 14 else 40.0
-                stealing = norm[13] if len(norm) > 14 else 40.0
-                tool_vals = [float(x) if x is not None else 40.0 for x in [contact, power, discipline, vision, fielding, arm_strength, arm_accuracy, speed, stealing]]
-                top_tools = sorted(tool_vals, reverse=True)[:4]
-                overall = np.mean(top_tools)
-            elif mode == 'pitching':
-                k_rating = norm[0] if len(norm) > 0 else 40.0
-                bb_rating = 100 - (norm[1] if len(norm) > 1 else 40.0)
-                gb_rating = norm[19] if len(norm) > 19 else 40.0
-                hr_rating = 100 - (norm[2] if len(norm) > 2 else 40.0)
-                command_rating = float(np.mean([norm[3], norm[4], norm[5], norm[20], norm[21], norm[22], norm[23], norm[7], norm[9]]))
-                tool_vals = [float(x) if x is not None else 40.0 for x in [k_rating, bb_rating, gb_rating, hr_rating, command_rating]]
-                top_tools = sorted(tool_vals, reverse=True)[:3]
-                overall = np.mean(top_tools)
-            else:
-                overall = 40.0
-            results.append({"season": season, "overall": overall})
-        return results[-n_seasons:]
+        if tensor is None:
+            tensor = self._season_tensor_for(db, player_id, mode)
+        if player_id not in tensor:
+            return []
+        seasons = tensor.seasons_for(player_id)[-n_seasons:]
+        if not seasons:
+            return []
+        overalls = self._overalls_from_normalized(tensor.normalized_for(player_id, seasons), mode)
+        return [{"season": season, "overall": float(overall)} for season, overall in zip(seasons, overalls)]
 
-    def calculate_mlb_show_ratings(self, db: Session, player_id: int) -> Dict:
-        if not hasattr(self, 'pca_weights_hit') or not hasattr(self, 'pca_weights_pit'):
-            self.fit_models(db)
-        player = db.query(Player).filter(Player.id == player_id).first()
-        if not player:
+    def calculate_mlb_show_ratings(self, db: Session, player_id: int, tensors: Optional[Dict[str, SeasonFeatureTensor]] = None) -> Dict:
+        """MLB The Show style grades, overall, potential and confidence of one player ({} if unknown)."""
+        return self.calculate_mlb_show_ratings_bulk(db, [player_id], tensors=tensors).get(player_id, {})
+
+    def _recent_overalls_bulk(self, db: Session, player_ids: List[int], mode: str, n_seasons: int = 5,
+                              tensors: Optional[Dict[str, SeasonFeatureTensor]] = None) -> Dict[int, list]:
+        """_get_recent_overalls_with_seasons for many players: every season overall is computed in one pass over the tensor."""
+        tensor = (tensors if tensors is not None else self._current_season_tensors(db)).get(mode)
+        if tensor is None or any(pid not in tensor for pid in player_ids):
+            tensor = self.build_season_tensor(db, mode, player_ids=list(player_ids))
+        row_overalls = self._overalls_from_normalized(tensor.normalized, mode)
+        empty_overalls = self._overalls_from_normalized(tensor.empty_normalized, mode)
+        histories = {}
+        for pid in player_ids:
+            seasons = tensor.seasons_for(pid)[-n_seasons:] if pid in tensor else []
+            rows = tensor.rows_for(pid, seasons) if seasons else []
+            fallback = empty_overalls[tensor.player_index[int(pid)]] if seasons else None
+            histories[pid] = [
+                {"season": season, "overall": float(row_overalls[row] if row >= 0 else fallback)}
+                for season, row in zip(seasons, rows)
+            ]
+        return histories
+
+    def calculate_mlb_show_ratings_bulk(self, db: Session, player_ids: Optional[List[int]] = None, bulk: Optional[dict] = None,
+                                        tensors: Optional[Dict[str, SeasonFeatureTensor]] = None) -> Dict[int, Dict]:
+        """
+        calculate_mlb_show_ratings for many players (everyone when player_ids is None), keyed by
+        player id. Grades, overalls, potentials and confidences come from matrix operations over
+        the whole 'all'-mode feature matrix (ml.rating_engine); pass bulk to reuse an
+        extract_features_bulk result that covers the players.
+        """
+        start = time.time()
+        player_q = db.query(Player.id, Player.primary_position)
+        if player_ids is not None:
+            player_q = player_q.filter(Player.id.in_(list(player_ids)))
+        types = {int(row.id): self.get_player_type(row) for row in player_q.all() if isinstance(row.id, int)}
+        if bulk is None:
+            bulk = self.extract_features_bulk(db, player_ids=list(types) if player_ids is not None else None)
+        if bulk is None or not types:
             return {}
-        ptype = self.get_player_type(player)
-        feats_dict = self.extract_player_features(db, player_id)
-        if feats_dict is None:
-                return {}
-        feats = feats_dict["normalized"]
-        present = feats_dict.get("present", [True]*len(feats))
-        # Only use present features for overall calculation
-        def f(idx, default=40.0):
-            try:
-                val = float(np.clip(feats[idx], 0, 99)) if present[idx] else None
-                return val if val is not None else default
-            except Exception:
-                return default
-        # Hitting ratings (indices based on feature vector)
-        grades = {
-            'contact_left': f(0),
-            'contact_right': f(0),
-            'power_left': f(5),
-            'power_right': f(5),
-            'vision': f(9),
-            'discipline': f(10),
-            'fielding': f(15),
-            'arm_strength': f(18),
-            'arm_accuracy': f(18),
-            'speed': f(13),
-            'stealing': f(13),
+        positions = [i for i, pid in enumerate(bulk["player_ids"]) if int(pid) in types]
+        ids = [int(bulk["player_ids"][i]) for i in positions]
+        normalized = np.asarray(bulk["normalized"], dtype=float)[positions]
+        present = np.asarray(bulk["present"], dtype=bool)[positions]
+        player_types = np.array([types[pid] for pid in ids], dtype=object)
+
+        hitters = [pid for pid in ids if types[pid] != 'pitcher']
+        pitchers = [pid for pid in ids if types[pid] in ('pitcher', 'two_way')]
+        histories = {
+            'hitting': self._recent_overalls_bulk(db, hitters, 'hitting', tensors=tensors) if hitters else {},
+            'pitching': self._recent_overalls_bulk(db, pitchers, 'pitching', tensors=tensors) if pitchers else {},
         }
-        # --- Weighted mean for overall ---
-        if ptype == 'pitcher':
-            # Pitcher weights
-            weights = np.array([
-                0.2,  # k_rating (0)
-                0.2,  # bb_rating (1)
-                0.1,  # gb_rating (19)
-                0.1,  # hr_rating (2)
-                0.2,  # command_rating (mean of 3,4,5,20,21,22,23,7,9)
-                0.05, # fielding (15)
-                0.05, # arm_strength (18)
-                0.05, # speed (13)
-                0.05, # stealing (13)
-            ])
-            # Feature vector for pitcher overall
-            pitcher_feats = np.array([
-                f(0),
-                100 - (f(1) if f(1) is not None else 40.0),
-                f(19),
-                100 - (f(2) if f(2) is not None else 40.0),
-                float(np.mean([x for x in [f(3), f(4), f(5), f(20), f(21), f(22), f(23), f(7), f(9)] if x is not None])),
-                f(15),
-                f(18),
-                f(13),
-                f(13),
-            ])
-            overall_rating = float(np.clip(np.average(pitcher_feats, weights=weights), 0, 99))
-        elif ptype == 'two_way':
-            # Compute both hitting and pitching overalls, then average
-            # Hitting weights
-            hit_weights = np.array([0.1,0.1,0.1,0.1,0.1,0.1,0.1,0.05,0.05,0.1,0.05])
-            hit_feats = np.array([
-                f(0), f(0), f(5), f(5), f(9), f(10), f(15), f(18), f(18), f(13), f(13)
-            ])
-            hitting_overall = float(np.clip(np.average(hit_feats, weights=hit_weights), 0, 99))
-            # Pitching weights (same as above)
-            pit_weights = np.array([
-                0.2, 0.2, 0.1, 0.1, 0.2, 0.05, 0.05, 0.05, 0.05
-            ])
-            pit_feats = np.array([
-                f(0), 100 - (f(1) if f(1) is not None else 40.0), f(19), 100 - (f(2) if f(2) is not None else 40.0), float(np.mean([x for x in [f(3), f(4), f(5), f(20), f(21), f(22), f(23), f(7), f(9)] if x is not None])), f(15), f(18), f(13), f(13)
-            ])
-            pitching_overall = float(np.clip(np.average(pit_feats, weights=pit_weights), 0, 99))
-            overall_rating = float(np.clip((hitting_overall + pitching_overall) / 2, 0, 99))
-        else:
-            # Position player weights
-            weights = np.array([0.1,0.1,0.1,0.1,0.1,0.1,0.1,0.05,0.05,0.1,0.05])
-            feats_vec = np.array([
-                f(0), f(0), f(5), f(5), f(9), f(10), f(15), f(18), f(18), f(13), f(13)
-            ])
-            overall_rating = float(np.clip(np.average(feats_vec, weights=weights), 0, 99))
-        # --- Potential: project from historical overalls ---
-        historical = self._get_recent_overalls(db, player_id, 'hitting' if ptype != 'pitcher' else 'pitching', n_seasons=5)
-        if historical and len(historical) > 1:
-            trend = (historical[-1] - historical[0]) / (len(historical) - 1)
-            potential_rating = float(np.clip(historical[-1] + trend * 2, 0, 99))
-        else:
-            potential_rating = overall_rating
-        # --- Confidence: stddev of features, scaled to 0-100 ---
-        confidence_score = float(np.clip(100 - np.std(feats), 0, 100))
-        # Pitcher-specific ratings
-        if ptype == 'pitcher':
-            grades['k_rating'] = f(0)
-            grades['bb_rating'] = 100 - (f(1) if f(1) is not None else 40.0)
-            grades['gb_rating'] = f(19)
-            grades['hr_rating'] = 100 - (f(2) if f(2) is not None else 40.0)
-            grades['command_rating'] = float(np.mean([x for x in [f(3), f(4), f(5), f(20), f(21), f(22), f(23), f(7), f(9)] if x is not None]))
-            historical_overalls = self._get_recent_overalls_with_seasons(db, player_id, 'pitching', n_seasons=5)
-            return {
+        primary = [histories['pitching' if types[pid] == 'pitcher' else 'hitting'][pid] for pid in ids]
+        count = np.array([len(h) for h in primary])
+        first = np.array([h[0]["overall"] if h else np.nan for h in primary])
+        last = np.array([h[-1]["overall"] if h else np.nan for h in primary])
+        rated = rating_engine.compute_ratings(normalized, present, player_types, first, last, count)
+
+        results = {}
+        for row, pid in enumerate(ids):
+            ptype = types[pid]
+            grades = {name: float(rated['grades'][name][row]) for name in rating_engine.HITTER_GRADE_COLUMNS}
+            if ptype == 'pitcher':
+                grades.update({name: float(values[row]) for name, values in rated['grades'].items() if name not in grades})
+            results[pid] = {
                 'grades': grades,
                 'player_type': ptype,
-                'overall_rating': overall_rating,
-                'potential_rating': potential_rating,
-                'confidence_score': confidence_score,
-                'historical_overalls': historical_overalls,
-            }
-        # If two-way, return both hitting and pitching ratings
-        if ptype == 'two_way':
-            feats_hit = self.extract_player_features(db, player_id, mode='hitting')
-            feats_pit = self.extract_player_features(db, player_id, mode='pitching')
-            def f2(feats, idx, default=40.0):
-                try:
-                    return float(np.clip(feats["normalized"][idx], 0, 99))
-                except Exception:
-                    return default
-            hitting_history = self._get_recent_overalls_with_seasons(db, player_id, 'hitting', n_seasons=5)
-            pitching_history = self._get_recent_overalls_with_seasons(db, player_id, 'pitching', n_seasons=5)
-            grades = {
-                'hitting': {
-                    'contact_left': f2(feats_hit, 0),
-                    'contact_right': f2(feats_hit, 0),
-                    'power_left': f2(feats_hit, 5),
-                    'power_right': f2(feats_hit, 5),
-                    'vision': f2(feats_hit, 9),
-                    'discipline': f2(feats_hit, 10),
-                    'fielding': f2(feats_hit, 15),
-                    'arm_strength': f2(feats_hit, 18),
-                    'arm_accuracy': f2(feats_hit, 18),
-                    'speed': f2(feats_hit, 13),
-                    'stealing': f2(feats_hit, 13),
-                    'overall_rating': float(np.clip(np.mean(feats_hit["normalized"]), 0, 99)) if feats_hit else 40.0,
-                    'potential_rating': float(np.clip(np.max(feats_hit["normalized"]), 0, 99)) if feats_hit else 40.0,
-                    'confidence_score': float(np.clip(100 - np.std(feats_hit["normalized"]), 0, 100)) if feats_hit else 0.0,
-                    'player_type': 'position_player',
-                    'historical_overalls': hitting_history,
-                },
-                'pitching': {
-                    'k_rating': f2(feats_pit, 0),
-                    'bb_rating': 100 - (f2(feats_pit, 1) if f2(feats_pit, 1) is not None else 40.0),
-                    'gb_rating': f2(feats_pit, 19),
-                    'hr_rating': 100 - (f2(feats_pit, 2) if f2(feats_pit, 2) is not None else 40.0),
-                    'command_rating': float(np.mean([x for x in [f2(feats_pit, 3), f2(feats_pit, 4), f2(feats_pit, 5), f2(feats_pit, 20), f2(feats_pit, 21), f2(feats_pit, 22), f2(feats_pit, 23), f2(feats_pit, 7), f2(feats_pit, 9)] if x is not None])),
-                    'overall_rating': float(np.clip(np.mean(feats_pit["normalized"]), 0, 99)) if feats_pit else 40.0,
-                    'potential_rating': float(np.clip(np.max(feats_pit["normalized"]), 0, 99)) if feats_pit else 40.0,
-                    'confidence_score': float(np.clip(100 - np.std(feats_pit["normalized"]), 0, 100)) if feats_pit else 0.0,
-                    'player_type': 'pitcher',
-                    'historical_overalls': pitching_history,
-                },
-            }
-            return {
-                'grades': grades,
-                'player_type': 'two_way',
-                'overall_rating': overall_rating,
-                'potential_rating': potential_rating,
-                'confidence_score': confidence_score,
+                'overall_rating': float(rated['overall_rating'][row]),
+                'potential_rating': float(rated['potential_rating'][row]),
+                'confidence_score': float(rated['confidence_score'][row]),
             }
-        # For position players (not pitcher or two_way), return grades
-        historical_overalls = self._get_recent_overalls_with_seasons(db, player_id, 'hitting', n_seasons=5)
-        return {
-            'grades': grades,
-            'player_type': ptype,
-            'overall_rating': overall_rating,
-            'potential_rating': potential_rating,
-            'confidence_score': confidence_score,
-            'historical_overalls': historical_overalls,
-        }
+            if ptype != 'two_way':
+                results[pid]['historical_overalls'] = primary[row]
+
+        two_way = [pid for pid in ids if types[pid] == 'two_way']
+        if two_way:
+            # Per-mode grades read the hitting/pitching layouts directly, without the presence mask
+            split = {}
+            for mode in ('hitting', 'pitching'):
+                mode_bulk = self.extract_features_bulk(db, player_ids=two_way, mode=mode)
+                order = {int(pid): i for i, pid in enumerate(mode_bulk["player_ids"])}
+                mode_norm = np.asarray(mode_bulk["normalized"], dtype=float)[[order[pid] for pid in two_way]]
+                grades = rating_engine.hitter_grades(mode_norm, mode) if mode == 'hitting' else rating_engine.pitcher_grades(mode_norm, mode)
+                grades.update(rating_engine.mode_summary(mode_norm))
+                split[mode] = grades
+            for row, pid in enumerate(two_way):
+                nested = {}
+                for mode, ptype in (('hitting', 'position_player'), ('pitching', 'pitcher')):
+                    nested[mode] = {name: float(values[row]) for name, values in split[mode].items()}
+                    nested[mode]['player_type'] = ptype
+                    nested[mode]['historical_overalls'] = histories[mode][pid]
+                results[pid]['grades'] = nested
+        elapsed = time.time() - start
+        print(f"[PERF] calculate_mlb_show_ratings_bulk rated {len(results)} players in {elapsed:.2f}s")
+        return results
 
     def store_level_weights(self, db: Session):
-        """Persist the current data_driven_level_weights to the DB."""
+        """Persist the current level weights (per role and season when computed) to the DB under their data hash."""
+        table = getattr(self, 'level_weight_table', None)
+        weights_json = table if table else self.data_driven_level_weights
+        data_hash = table.get('data_hash') if table else None
         lw = db.query(LevelWeights).first()
-        if lw and isinstance(getattr(lw, 'weights_json', None), dict):
-            setattr(lw, 'weights_json', self.data_driven_level_weights)
+        if lw is not None:
+            setattr(lw, 'weights_json', weights_json)
+            setattr(lw, 'data_hash', data_hash)
             setattr(lw, 'last_updated', datetime.datetime.utcnow())
         else:
-            lw = LevelWeights(weights_json=self.data_driven_level_weights)
+            lw = LevelWeights(weights_json=weights_json, data_hash=data_hash)
             db.add(lw)
         db.commit()
 
-    def load_level_weights(self, db: Session):
-        """Load level weights from the DB if present."""
-        lw = db.query(LevelWeights).order_by(LevelWeights.last_updated.desc()).first()
-        if lw is not None and isinstance(getattr(lw, 'weights_json', None), dict):
-            self.data_driven_level_weights = lw.weights_json
-            return True
-        return False
+    def load_level_weights(self, db: Session, data_hash: Optional[str] = None):
+        """Load level weights from the DB if present (only those stored for data_hash, when given)."""
+        query = db.query(LevelWeights)
+        if data_hash is not None:
+            query = query.filter(LevelWeights.data_hash == data_hash)
+        lw = query.order_by(LevelWeights.last_updated.desc()).first()
+        weights_json = getattr(lw, 'weights_json', None)
+        if not isinstance(weights_json, dict):
+            return False
+        if weights_json.get('format_version') == level_weights.LEVEL_WEIGHTS_FORMAT_VERSION:
+            self.level_weight_table = weights_json
+            self.data_driven_level_weights = weights_json['weights']['combined']
+        elif data_hash is None and 'weights' not in weights_json:
+            # Flat {level: weight} rows written before per-role/season weights
+            self.data_driven_level_weights = weights_json
+        else:
+            return False
+        return True
 
     def _hof_probability(self, projected_career_war: float, player_type: str = "position_player") -> float:
         # Thresholds based on historical HOF inductees
@@ -1025,101 +1472,37 @@ class BaseballMLService:
         # Clamp to [0, 0.99]
         return float(np.clip(prob, 0, 0.99))
 
+    def _player(self, db: Session, player_id: int) -> Optional[Player]:
+        """Player row by id, memoized for the current request and session."""
+        return memoized(('player', db, int(player_id)), lambda: db.query(Player).filter(Player.id == player_id).first())
+
+    def _career_summaries(self, db: Session, player_ids: List[int]) -> Dict[int, Dict]:
+        """player_career_summary rows of player_ids, memoized for the current request."""
+        ids = tuple(sorted(set(int(pid) for pid in player_ids)))
+        return memoized(('career_summary', ids), lambda: career_summary.career_summaries(db, list(ids)))
+
     def predict_mlb_success(self, db, player_id: int):
-        player = db.query(Player).filter(Player.id == player_id).first()
+        player = self._player(db, player_id)
         if not player:
             return None
         ptype = self.get_player_type(player)
         level = getattr(player, 'level', None)
         age = getattr(player, 'age', None) or 24  # fallback if missing
         is_mlb = (level == 'MLB')
-        # --- Career WAR calculation ---
-        def get_batting_career_war():
-            war = 0.0
-            seasons = set(
-                row.season for row in db.query(StandardBattingStat)
-                .filter(StandardBattingStat.player_id == player_id, StandardBattingStat.level == 'MLB').all()
-                if row.season is not None
-            )
-            for row in db.query(StandardBattingStat).filter(StandardBattingStat.player_id == player_id, StandardBattingStat.level == 'MLB').all():
-                if getattr(row, 'season', None) in seasons:
-                    war += getattr(row, 'war', 0.0) or 0.0
-            return war
-        def get_pitching_career_war():
-            war = 0.0
-            pitching_seasons = set(
-                row.season for row in db.query(StandardPitchingStat)
-                .filter(StandardPitchingStat.player_id == player_id, StandardPitchingStat.level == 'MLB').all()
-                if row.season is not None
-            )
-            for row in db.query(StandardPitchingStat).filter(StandardPitchingStat.player_id == player_id, StandardPitchingStat.level == 'MLB').all():
-                if getattr(row, 'season', None) in pitching_seasons:
-                    war += getattr(row, 'war', 0.0) or 0.0
-            return war
-        def get_mlb_debut_year():
-            # Find the earliest MLB season in batting or pitching
-            seasons = [row.season for row in db.query(StandardBattingStat).filter(StandardBattingStat.player_id == player_id, StandardBattingStat.level == 'MLB').all() if row.season]
-            seasons += [row.season for row in db.query(StandardPitchingStat).filter(StandardPitchingStat.player_id == player_id, StandardPitchingStat.level == 'MLB').all() if row.season]
-            if seasons:
-                return min(seasons)
-            return None
-        batting_career_war = get_batting_career_war()
-        pitching_career_war = get_pitching_career_war()
-        career_war = batting_career_war + pitching_career_war
-        debut_year = get_mlb_debut_year()
         # --- Similar players for comps ---
         similar = self.get_similar_players(db, player_id, k=5)
-        def get_similar_career_wars():
-            wars = []
-            for comp in similar:
-                comp_id = comp.get('mlb_player_id')
-                if not comp_id:
-                    continue
-                # For each comp, sum MLB WAR (batting + pitching) using MLB seasons only
-                # Batting
-                mlb_bat_seasons = set(
-                    row.season for row in db.query(StandardBattingStat)
-                    .filter(StandardBattingStat.player_id == comp_id, StandardBattingStat.level == 'MLB').all()
-                    if row.season is not None
-                )
-                bwar = 0.0
-                for row in db.query(StandardBattingStat).filter(StandardBattingStat.player_id == comp_id, StandardBattingStat.level == 'MLB').all():
-                    if getattr(row, 'season', None) in mlb_bat_seasons:
-                        bwar += getattr(row, 'war', 0.0) or 0.0
-                # Pitching
-                mlb_pit_seasons = set(
-                    row.season for row in db.query(StandardPitchingStat)
-                    .filter(StandardPitchingStat.player_id == comp_id, StandardPitchingStat.level == 'MLB').all()
-                    if row.season is not None
-                )
-                pwar = 0.0
-                for row in db.query(StandardPitchingStat).filter(StandardPitchingStat.player_id == comp_id, StandardPitchingStat.level == 'MLB').all():
-                    if getattr(row, 'season', None) in mlb_pit_seasons:
-                        pwar += getattr(row, 'war', 0.0) or 0.0
-                wars.append(bwar + pwar)
-            return wars
-        comp_wars = get_similar_career_wars()
+        comp_ids = [comp.get('mlb_player_id') for comp in similar if comp.get('mlb_player_id')]
+        # Career WAR, debut and comp careers: one player_career_summary read for everyone
+        summaries = self._career_summaries(db, [player_id] + comp_ids)
+        summary = summaries[int(player_id)]
+        career_war = summary['career_war']
+        debut_year = summary['debut_season']
+        comp_wars = [summaries[int(comp_id)]['career_war'] for comp_id in comp_ids]
         # --- ETA calculation ---
-        comp_ages = []
-        for comp in similar:
-            comp_id = comp.get('mlb_player_id')
-            if not comp_id:
-                continue
-            comp_debut = None
-            for row in db.query(StandardBattingStat).filter(StandardBattingStat.player_id == comp_id, StandardBattingStat.level == 'MLB').all():
-                if row.season:
-                    comp_debut = row.season
-                    break
-            for row in db.query(StandardPitchingStat).filter(StandardPitchingStat.player_id == comp_id, StandardPitchingStat.level == 'MLB').all():
-                if row.season:
-                    comp_debut = row.season
-                    break
-            comp_player = db.query(Player).filter(Player.id == comp_id).first()
-            comp_age = getattr(comp_player, 'age', None)
-            if comp_debut and comp_age:
-                comp_ages.append(comp_debut - (comp_age or 24))
+        comp_ages = [summaries[int(comp_id)]['debut_age'] for comp_id in comp_ids if summaries[int(comp_id)]['debut_age']]
         if comp_ages:
-            eta_mlb = age + int(np.mean(comp_ages))
+            # Comps' average age at debut, at least a year out
+            eta_mlb = max(age + 1, int(np.mean(comp_ages)))
         else:
             eta_mlb = age + 2
         # Projected career WAR: blended approach considering current performance and comps
@@ -0,0 +1,87 @@
+"""
+Background model refits. The new generation is fitted on a worker thread with its own session
+while requests keep reading the currently published snapshot, then swapped in at once.
+"""
+import datetime
+import threading
+import time
+from typing import Dict, Optional
+from database import SessionLocal
+from ml_service import ml_service
+
+
+class RefitStatus:
+    """Progress of the current (or last) background refit, shared with the admin endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = 'idle'
+        self.stage: Optional[str] = None
+        self.progress = 0.0
+        self.started_at: Optional[datetime.datetime] = None
+        self.finished_at: Optional[datetime.datetime] = None
+        self.error: Optional[str] = None
+        self.model_version: Optional[str] = None
+
+    def update(self, **values):
+        with self._lock:
+            for attr, value in values.items():
+                setattr(self, attr, value)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'stage': self.stage,
+                'progress': round(self.progress, 3),
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+                'error': self.error,
+                'model_version': self.model_version,
+                'serving_model_version': ml_service.model_version,
+            }
+
+
+refit_status = RefitStatus()
+_refit_lock = threading.Lock()
+
+
+def _run_refit(recompute_comparisons: bool):
+    start = time.time()
+    db = SessionLocal()
+    try:
+        snapshot = ml_service.build_snapshot(db, progress=lambda stage, fraction: refit_status.update(stage=stage, progress=fraction))
+        if snapshot is None:
+            raise RuntimeError("model fit failed; see the [ML] log")
+        ml_service.publish_snapshot(snapshot)
+        refit_status.update(stage='save_bundle', progress=0.92, model_version=snapshot.model_version)
+        ml_service.save_models(db)
+        # A new shared-file generation makes the other worker processes load the new bundle
+        ml_service.publish_shared_arrays()
+        if recompute_comparisons:
+            # Rows are replaced in one transaction, so readers see old or new comps, never none
+            refit_status.update(stage='comparisons', progress=0.95)
+            ml_service.compute_comparisons(db)
+        else:
+            ml_service.invalidate_comparisons(db)
+        refit_status.update(state='succeeded', stage='done', progress=1.0, finished_at=datetime.datetime.utcnow())
+        print(f"[PERF] Background refit {snapshot.model_version} took {time.time() - start:.2f}s")
+    except Exception as e:
+        db.rollback()
+        refit_status.update(state='failed', error=str(e), finished_at=datetime.datetime.utcnow())
+        print(f"[ML] Background refit failed: {e}")
+    finally:
+        db.close()
+        _refit_lock.release()
+
+
+def start_refit(recompute_comparisons: bool = True) -> bool:
+    """Start a background refit. Returns False if one is already running."""
+    if not _refit_lock.acquire(blocking=False):
+        return False
+    refit_status.update(
+        state='running', stage='queued', progress=0.0, error=None, model_version=None,
+        started_at=datetime.datetime.utcnow(), finished_at=None,
+    )
+    threading.Thread(target=_run_refit, args=(recompute_comparisons,), name='model-refit', daemon=True).start()
+    return True
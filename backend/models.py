@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, JSON, UniqueConstraint
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, JSON, UniqueConstraint, event
+from sqlalchemy.orm import relationship, Session
+from sqlalchemy.dialects.postgresql import JSONB, insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import re
 from sqlalchemy.ext.mutable import MutableList
-from sqlalchemy import PickleType
+from sqlalchemy import PickleType, LargeBinary
 try:
     from backend.database import Base
 except ImportError:
@@ -84,12 +85,12 @@ class StandardBattingStat(Base):
     cs = Column(Integer)
     bb = Column(Integer)
     so = Column(Integer)
-    ba = Column(String)
-    obp = Column(String)
-    slg = Column(String)
-    ops = Column(String)
+    ba = Column(Float)
+    obp = Column(Float)
+    slg = Column(Float)
+    ops = Column(Float)
     ops_plus = Column(Integer)
-    roba = Column(String)
+    roba = Column(Float)
     rbat_plus = Column(Integer)
     tb = Column(Integer)
     gidp = Column(Integer)
@@ -122,8 +123,8 @@ class ValueBattingStat(Base):
     rrep = Column(Float)
     rar = Column(Float)
     war = Column(Float)
-    waa_wl_pct = Column(String)
-    wl_162_pct = Column(String)
+    waa_wl_pct = Column(Float)
+    wl_162_pct = Column(Float)
     owar = Column(Float)
     dwar = Column(Float)
     orar = Column(Float)
@@ -142,28 +143,28 @@ class AdvancedBattingStat(Base):
     level = Column(String, nullable=True, default="MLB")
     lg = Column(String)
     pa = Column(Integer)
-    roba = Column(String)
+    roba = Column(Float)
     rbat_plus = Column(Integer)
-    babip = Column(String)
-    iso = Column(String)
-    hr_pct = Column(String)
-    so_pct = Column(String)
-    bb_pct = Column(String)
-    ev = Column(String)
-    hardh_pct = Column(String)
-    ld_pct = Column(String)
-    gb_pct = Column(String)
-    fb_pct = Column(String)
-    gb_fb = Column(String)
-    pull_pct = Column(String)
-    cent_pct = Column(String)
-    oppo_pct = Column(String)
-    wpa = Column(String)
-    cwpa = Column(String)
-    re24 = Column(String)
-    rs_pct = Column(String)
-    sb_pct = Column(String)
-    xbt_pct = Column(String)
+    babip = Column(Float)
+    iso = Column(Float)
+    hr_pct = Column(Float)
+    so_pct = Column(Float)
+    bb_pct = Column(Float)
+    ev = Column(Float)
+    hardh_pct = Column(Float)
+    ld_pct = Column(Float)
+    gb_pct = Column(Float)
+    fb_pct = Column(Float)
+    gb_fb = Column(Float)
+    pull_pct = Column(Float)
+    cent_pct = Column(Float)
+    oppo_pct = Column(Float)
+    wpa = Column(Float)
+    cwpa = Column(Float)
+    re24 = Column(Float)
+    rs_pct = Column(Float)
+    sb_pct = Column(Float)
+    xbt_pct = Column(Float)
     pos = Column(String)
     awards = Column(String)
     player = relationship('Player', back_populates='advanced_batting_stats')
@@ -181,15 +182,15 @@ class StandardPitchingStat(Base):
     lg = Column(String)
     w = Column(Integer)
     l = Column(Integer)
-    wl_pct = Column(String)
-    era = Column(String)
+    wl_pct = Column(Float)
+    era = Column(Float)
     g = Column(Integer)
     gs = Column(Integer)
     gf = Column(Integer)
     cg = Column(Integer)
     sho = Column(Integer)
     sv = Column(Integer)
-    ip = Column(String)
+    ip = Column(Float)  # true thirds: 123.1 on the page is stored as 123.333...
     h = Column(Integer)
     r = Column(Integer)
     er = Column(Integer)
@@ -202,13 +203,13 @@ class StandardPitchingStat(Base):
     wp = Column(Integer)
     bf = Column(Integer)
     era_plus = Column(Integer)
-    fip = Column(String)
-    whip = Column(String)
-    h9 = Column(String)
-    hr9 = Column(String)
-    bb9 = Column(String)
-    so9 = Column(String)
-    so_w = Column(String)
+    fip = Column(Float)
+    whip = Column(Float)
+    h9 = Column(Float)
+    hr9 = Column(Float)
+    bb9 = Column(Float)
+    so9 = Column(Float)
+    so_w = Column(Float)
     awards = Column(String)
     player = relationship('Player', back_populates='standard_pitching_stats')
     __table_args__ = (UniqueConstraint('player_id', 'season', 'team', name='_std_pitching_uc'),)
@@ -224,17 +225,17 @@ class ValuePitchingStat(Base):
     lg = Column(String)
     waa = Column(Float)
     war = Column(Float)
-    ra9 = Column(String)
-    fip = Column(String)
-    wpa = Column(String)
-    re24 = Column(String)
-    cwpa = Column(String)
+    ra9 = Column(Float)
+    fip = Column(Float)
+    wpa = Column(Float)
+    re24 = Column(Float)
+    cwpa = Column(Float)
     raa = Column(Float)
     rrep = Column(Float)
     rar = Column(Float)
     g = Column(Integer)
     gs = Column(Integer)
-    ip = Column(String)
+    ip = Column(Float)  # true thirds: 123.1 on the page is stored as 123.333...
     bf = Column(Integer)
     awards = Column(String)
     player = relationship('Player', back_populates='value_pitching_stats')
@@ -249,23 +250,23 @@ class AdvancedPitchingStat(Base):
     team = Column(String)
     level = Column(String, nullable=True, default="MLB")
     lg = Column(String)
-    ip = Column(String)
-    k_pct = Column(String)
-    bb_pct = Column(String)
-    hr_pct = Column(String)
-    babip = Column(String)
-    lob_pct = Column(String)
-    era_minus = Column(String)
-    fip_minus = Column(String)
-    xfip_minus = Column(String)
-    siera = Column(String)
-    pli = Column(String)
-    inli = Column(String)
-    gmli = Column(String)
-    exli = Column(String)
-    wpa = Column(String)
-    re24 = Column(String)
-    cwpa = Column(String)
+    ip = Column(Float)  # true thirds: 123.1 on the page is stored as 123.333...
+    k_pct = Column(Float)
+    bb_pct = Column(Float)
+    hr_pct = Column(Float)
+    babip = Column(Float)
+    lob_pct = Column(Float)
+    era_minus = Column(Float)
+    fip_minus = Column(Float)
+    xfip_minus = Column(Float)
+    siera = Column(Float)
+    pli = Column(Float)
+    inli = Column(Float)
+    gmli = Column(Float)
+    exli = Column(Float)
+    wpa = Column(Float)
+    re24 = Column(Float)
+    cwpa = Column(Float)
     awards = Column(String)
     player = relationship('Player', back_populates='advanced_pitching_stats')
     __table_args__ = (UniqueConstraint('player_id', 'season', 'team', name='_adv_pitching_uc'),)
@@ -284,22 +285,22 @@ class StandardFieldingStat(Base):
     g = Column(Integer)
     gs = Column(Integer)
     cg = Column(Integer)
-    inn = Column(String)
+    inn = Column(Float)  # true thirds: 123.1 on the page is stored as 123.333...
     ch = Column(Integer)
     po = Column(Integer)
     a = Column(Integer)
     e = Column(Integer)
     dp = Column(Integer)
-    fld_pct = Column(String)
-    lgfld_pct = Column(String)
+    fld_pct = Column(Float)
+    lgfld_pct = Column(Float)
     rtot = Column(Integer)
     rtot_yr = Column(Integer)
     rdrs = Column(Integer)
     rdrs_yr = Column(Integer)
-    rf9 = Column(String)
-    lgrf9 = Column(String)
-    rfg = Column(String)
-    lgrfg = Column(String)
+    rf9 = Column(Float)
+    lgrf9 = Column(Float)
+    rfg = Column(Float)
+    lgrfg = Column(Float)
     awards = Column(String)
     player = relationship('Player', back_populates='standard_fielding_stats')
     __table_args__ = (UniqueConstraint('player_id', 'season', 'team', 'pos', name='_std_fielding_uc'),)
@@ -307,8 +308,9 @@ class StandardFieldingStat(Base):
 class PlayerFeatures(Base):
     __tablename__ = 'player_features'
     player_id = Column(Integer, ForeignKey('players.id'), primary_key=True)
-    raw_features = Column(PickleType, nullable=False)
-    normalized_features = Column(PickleType, nullable=False)
+    # ml.feature_blob records: version byte, presence bitmask, float32 little-endian values
+    raw_features = Column(LargeBinary, nullable=False)
+    normalized_features = Column(LargeBinary, nullable=False)
     last_updated = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     player = relationship('Player')
 
@@ -316,6 +318,7 @@ class LevelWeights(Base):
     __tablename__ = 'level_weights'
     id = Column(Integer, primary_key=True)
     weights_json = Column(JSON)
+    data_hash = Column(String, index=True)  # ml.level_weights.data_hash of the rows the weights came from
     last_updated = Column(DateTime, default=datetime.datetime.utcnow)
 
 class PlayerRatings(Base):
@@ -349,3 +352,130 @@ class PlayerRatings(Base):
     # Optionally, add team, level, etc. for denormalized fast access
     team = Column(String)
     level = Column(String)
+
+class PlayerComparison(Base):
+    """Precomputed top-k statistical comps per player, rebuilt by the batch comp job."""
+    __tablename__ = 'player_comparisons'
+    id = Column(Integer, primary_key=True)
+    player_id = Column(Integer, ForeignKey('players.id'), index=True, nullable=False)
+    rank = Column(Integer, nullable=False)
+    comp_player_id = Column(Integer, ForeignKey('players.id'), index=True, nullable=False)
+    distance = Column(Float, nullable=False)
+    similarity_score = Column(Float)
+    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+    __table_args__ = (UniqueConstraint('player_id', 'rank', name='_player_comparison_rank_uc'),)
+
+class PlayerCareerSummary(Base):
+    """MLB career totals per player (career_summary.refresh_career_summaries), refreshed with features and ratings."""
+    __tablename__ = 'player_career_summary'
+    player_id = Column(Integer, ForeignKey('players.id'), primary_key=True)
+    batting_war = Column(Float, nullable=False, default=0.0)
+    pitching_war = Column(Float, nullable=False, default=0.0)
+    career_war = Column(Float, nullable=False, default=0.0)
+    peak_war = Column(Float)  # best single MLB season, batting + pitching
+    debut_season = Column(Integer)
+    mlb_seasons = Column(Integer, nullable=False, default=0)
+    debut_age = Column(Integer)
+    last_updated = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class DirtyPlayer(Base):
+    """Queue of players whose stat rows changed since their features/ratings were last recomputed."""
+    __tablename__ = 'dirty_players'
+    player_id = Column(Integer, ForeignKey('players.id'), primary_key=True)
+    marked_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class DataVersion(Base):
+    """
+    Change counters: 'global' and 'player:<id>' (each player's own data) behind conditional GETs,
+    and 'stats', moved only by player and stat-row changes (the model bundle's data version).
+    """
+    __tablename__ = 'data_versions'
+    key = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+GLOBAL_VERSION_KEY = 'global'
+STATS_VERSION_KEY = 'stats'
+VERSION_BATCH_SIZE = 1000
+
+def player_version_key(player_id) -> str:
+    return f"player:{int(player_id)}"
+
+def bump_data_versions(session, player_ids=(), keys=()):
+    """
+    Increment the global data version, those of player_ids and any other keys, in the session's
+    transaction. One INSERT ... ON CONFLICT DO UPDATE per batch, so concurrent writers never
+    lose a bump.
+    """
+    keys = [GLOBAL_VERSION_KEY] + list(keys) + [player_version_key(pid) for pid in sorted(set(int(p) for p in player_ids))]
+    now = datetime.datetime.utcnow()
+    table = DataVersion.__table__
+    insert = {'postgresql': postgresql_insert, 'sqlite': sqlite_insert}.get(session.get_bind().dialect.name)
+    for i in range(0, len(keys), VERSION_BATCH_SIZE):
+        batch = keys[i:i + VERSION_BATCH_SIZE]
+        if insert is None:
+            for key in batch:
+                row = session.get(DataVersion, key)
+                if row is None:
+                    session.add(DataVersion(key=key, version=1, updated_at=now))
+                else:
+                    row.version, row.updated_at = row.version + 1, now
+            continue
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['key'],
+            set_={'version': table.c.version + 1, 'updated_at': stmt.excluded.updated_at},
+        )
+        session.execute(stmt, [{'key': key, 'version': 1, 'updated_at': now} for key in batch])
+
+def mark_players_dirty(session, player_ids):
+    """
+    Queue player_ids in dirty_players (re-marking those already queued), in the session's
+    transaction. One INSERT ... ON CONFLICT DO UPDATE per batch, so concurrent ingests marking
+    the same player never collide on its primary key.
+    """
+    player_ids = sorted(set(int(pid) for pid in player_ids))
+    now = datetime.datetime.utcnow()
+    table = DirtyPlayer.__table__
+    insert = {'postgresql': postgresql_insert, 'sqlite': sqlite_insert}.get(session.get_bind().dialect.name)
+    for i in range(0, len(player_ids), VERSION_BATCH_SIZE):
+        batch = player_ids[i:i + VERSION_BATCH_SIZE]
+        if insert is None:
+            for pid in batch:
+                session.merge(DirtyPlayer(player_id=pid, marked_at=now))
+            continue
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=['player_id'], set_={'marked_at': stmt.excluded.marked_at})
+        session.execute(stmt, [{'player_id': pid, 'marked_at': now} for pid in batch])
+
+# Tables whose changes invalidate a player's features and ratings
+STAT_MODELS = (
+    StandardBattingStat, ValueBattingStat, AdvancedBattingStat,
+    StandardPitchingStat, ValuePitchingStat, AdvancedPitchingStat,
+    StandardFieldingStat,
+)
+
+@event.listens_for(Session, 'before_flush')
+def mark_dirty_players(session, flush_context, instances):
+    """
+    Enqueue the player of every stat row inserted, updated or deleted through the ORM, plus
+    players whose own row was updated (level and position feed the features), and bump the
+    data versions of those players and the global one. Bulk Core statements bypass this hook
+    and must mark players themselves.
+    """
+    player_ids = set()
+    changed = list(session.new) + [obj for obj in session.dirty if session.is_modified(obj)] + list(session.deleted)
+    if not any(isinstance(obj, STAT_MODELS + (Player,)) for obj in changed):
+        return
+    for obj in changed:
+        if isinstance(obj, STAT_MODELS):
+            pid = getattr(obj, 'player_id', None)
+        elif isinstance(obj, Player) and obj not in session.new:
+            pid = getattr(obj, 'id', None)
+        else:
+            continue
+        if pid is not None:
+            player_ids.add(int(pid))
+    mark_players_dirty(session, player_ids)
+    # New players (ids not assigned yet) still move the global and stats versions
+    bump_data_versions(session, player_ids, keys=(STATS_VERSION_KEY,))
@@ -0,0 +1,122 @@
+"""
+Everything the player page shows, assembled in one request (GET /player/{id}/profile).
+
+The database parts (bio, ratings, stat tables) come from the request's session: the player row
+and every requested stat relationship are loaded with selectinload, one query per table. The ML
+parts (comps, prediction) each cost a comp search. When both are requested they run on
+PROFILE_WORKERS threads, each with its own session because a Session is not thread-safe, while
+the request session loads the database parts. The threads run in a copy of the request's
+context, so they share its request memo (features extracted by one are reused by the other).
+An ML part that fails is logged, returned as null and named in 'unavailable'; the database
+parts are still served.
+
+fields selects parts: bio, ratings, comps, prediction, any stat table name, or 'stats' for
+every stat table. The default is all of them.
+"""
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy.orm import Session, selectinload
+from database import SessionLocal
+from models import Player, PlayerRatings
+from ml_service import ml_service
+
+PROFILE_WORKERS = int(os.getenv('PROFILE_WORKERS', '4'))
+BIO_FIELDS = [
+    'full_name', 'birth_date', 'primary_position', 'positions_raw', 'positions', 'bats', 'throws',
+    'height', 'weight', 'team', 'source_url',
+]
+# Profile field name: Player relationship
+STAT_TABLES = {
+    'standard_batting': 'standard_batting_stats',
+    'value_batting': 'value_batting_stats',
+    'advanced_batting': 'advanced_batting_stats',
+    'standard_pitching': 'standard_pitching_stats',
+    'value_pitching': 'value_pitching_stats',
+    'advanced_pitching': 'advanced_pitching_stats',
+    'standard_fielding': 'standard_fielding_stats',
+}
+ML_FIELDS = ('comps', 'prediction')
+PROFILE_FIELDS = ('bio', 'ratings') + tuple(STAT_TABLES) + ML_FIELDS
+
+_executor = ThreadPoolExecutor(max_workers=PROFILE_WORKERS, thread_name_prefix='profile')
+
+
+def model_to_dict(obj):
+    return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Requested parts in PROFILE_FIELDS order; raises ValueError naming unknown fields."""
+    if not fields:
+        return list(PROFILE_FIELDS)
+    requested = set()
+    for name in (f.strip() for f in fields.split(',')):
+        if name == 'stats':
+            requested.update(STAT_TABLES)
+        elif name:
+            requested.add(name)
+    unknown = sorted(requested - set(PROFILE_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown profile fields: {', '.join(unknown)}; expected any of {', '.join(PROFILE_FIELDS + ('stats',))}")
+    return [name for name in PROFILE_FIELDS if name in requested]
+
+
+def player_comps(db: Session, player_id: int) -> List[Dict]:
+    """Stored comps, or a live comp search when the batch job has not covered the player (as /mlb_comps)."""
+    return ml_service.get_stored_comparisons(db, player_id) or ml_service.get_similar_players(db, player_id)
+
+
+def _in_own_session(fn, player_id: int):
+    db = SessionLocal()
+    try:
+        return fn(db, player_id)
+    finally:
+        db.close()
+
+
+def _ml_part(name: str, fn):
+    """fn returning (value, failed), with a failure logged so it cannot fail the whole profile."""
+    def part(db: Session, player_id: int):
+        try:
+            return fn(db, player_id), False
+        except Exception as e:
+            print(f"[ML] Profile {name} for player {player_id} failed: {e}")
+            return None, True
+    return part
+
+
+def build_profile(db: Session, player_id: int, fields: Sequence[str]) -> Optional[Dict]:
+    """
+    The requested parts of a player's profile, or None when the player does not exist. ML parts
+    that failed are None and listed under 'unavailable'.
+    """
+    ml_parts = {'comps': _ml_part('comps', player_comps), 'prediction': _ml_part('prediction', ml_service.predict_mlb_success)}
+    ml_requested = [name for name in ML_FIELDS if name in fields]
+    futures = {}
+    if len(ml_requested) > 1:
+        futures = {name: _executor.submit(contextvars.copy_context().run, _in_own_session, ml_parts[name], player_id)
+                   for name in ml_requested}
+    try:
+        tables = [name for name in STAT_TABLES if name in fields]
+        options = [selectinload(getattr(Player, STAT_TABLES[name])) for name in tables]
+        player = db.query(Player).options(*options).filter(Player.id == player_id).first()
+        if player is None:
+            return None
+        profile = {'player_id': player_id}
+        if 'bio' in fields:
+            profile['bio'] = {name: getattr(player, name) for name in BIO_FIELDS}
+        if 'ratings' in fields:
+            rating = db.query(PlayerRatings).filter(PlayerRatings.player_id == player_id).first()
+            profile['ratings'] = model_to_dict(rating) if rating else None
+        if tables:
+            profile['stats'] = {name: [model_to_dict(row) for row in getattr(player, STAT_TABLES[name])] for name in tables}
+        for name in ml_requested:
+            profile[name], failed = futures[name].result() if name in futures else ml_parts[name](db, player_id)
+            if failed:
+                profile.setdefault('unavailable', []).append(name)
+        return profile
+    finally:
+        for future in futures.values():
+            future.cancel()
@@ -0,0 +1,159 @@
+"""
+Recompute stored PlayerFeatures / PlayerRatings / PlayerCareerSummary rows, either for the whole
+population or only for the players the stat-table change tracking (models.DirtyPlayer) has queued.
+"""
+import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from models import Player, PlayerFeatures, PlayerRatings, DirtyPlayer, bump_data_versions
+from ml_service import ml_service
+from bulk_upsert import upsert_rows, existing_keys
+from ml.feature_blob import encode_features
+from career_summary import career_summary_rows, write_career_summary_rows
+
+HITTING_GRADE_FIELDS = [
+    'contact_left', 'contact_right', 'power_left', 'power_right', 'vision', 'discipline',
+    'fielding', 'arm_strength', 'arm_accuracy', 'speed', 'stealing',
+]
+PITCHING_GRADE_FIELDS = ['k_rating', 'bb_rating', 'gb_rating', 'hr_rating', 'command_rating']
+
+
+RATING_COLUMNS = [
+    'player_id', 'overall_rating', 'potential_rating', 'confidence_score', 'player_type',
+    'last_updated', 'team', 'level',
+] + HITTING_GRADE_FIELDS + PITCHING_GRADE_FIELDS + ['historical_overalls']
+FEATURE_COLUMNS = ['player_id', 'raw_features', 'normalized_features', 'last_updated']
+# Players per compute_comparisons call (one IN list and one kneighbors batch each)
+COMP_BATCH_SIZE = 5000
+
+
+def ratings_row(player, ratings: Dict, now: Optional[datetime.datetime] = None) -> Tuple:
+    """Flatten calculate_mlb_show_ratings output into PlayerRatings values, ordered like RATING_COLUMNS."""
+    grades = ratings.get('grades', {})
+    # For two-way, flatten both hitting and pitching
+    if ratings.get('player_type') == 'two_way':
+        hitting = grades.get('hitting', {})
+        pitching = grades.get('pitching', {})
+        historical = None  # Optionally, could merge both
+    else:
+        hitting = pitching = grades
+        historical = ratings.get('historical_overalls')
+    return (
+        player.id,
+        ratings.get('overall_rating'),
+        ratings.get('potential_rating'),
+        ratings.get('confidence_score'),
+        ratings.get('player_type'),
+        now or datetime.datetime.utcnow(),
+        player.team,
+        player.level,
+        *[hitting.get(field) for field in HITTING_GRADE_FIELDS],
+        *[pitching.get(field) for field in PITCHING_GRADE_FIELDS],
+        historical,
+    )
+
+
+def upsert_player_features(db: Session, features_by_player: Dict[int, dict]) -> int:
+    """Write extracted feature vectors to player_features in batched upserts. Returns the number of rows written."""
+    now = datetime.datetime.utcnow()
+    rows = [
+        (pid, encode_features(feats['raw'], feats['present']), encode_features(feats['normalized'], feats['present']), now)
+        for pid, feats in features_by_player.items()
+    ]
+    written = upsert_rows(db, PlayerFeatures, FEATURE_COLUMNS, rows)
+    bump_data_versions(db, features_by_player)
+    return written
+
+
+def rating_rows(db: Session, players: List, tensors=None, bulk: Optional[dict] = None) -> List[Tuple]:
+    """Compute (in one batch) PlayerRatings values for the given players (anything with id, team and level)."""
+    rated = ml_service.calculate_mlb_show_ratings_bulk(db, [p.id for p in players], bulk=bulk, tensors=tensors)
+    now = datetime.datetime.utcnow()
+    return [ratings_row(player, rated[player.id], now) for player in players if rated.get(player.id)]
+
+
+def write_rating_rows(db: Session, rows: List[Tuple]):
+    """Write rating_rows output in batched upserts. Returns (created, updated)."""
+    existing = existing_keys(db, PlayerRatings, [row[0] for row in rows])
+    upsert_rows(db, PlayerRatings, RATING_COLUMNS, rows)
+    bump_data_versions(db, [row[0] for row in rows])
+    updated = sum(1 for row in rows if row[0] in existing)
+    return len(rows) - updated, updated
+
+
+def upsert_player_ratings(db: Session, players: List, tensors=None, bulk: Optional[dict] = None):
+    """
+    Compute (in one batch) and write ratings for the given players (anything with id, team and
+    level) in batched upserts. Returns (created, updated).
+    """
+    return write_rating_rows(db, rating_rows(db, players, tensors=tensors, bulk=bulk))
+
+
+def refresh_players(db: Session, player_ids: Optional[List[int]] = None, workers: Optional[int] = None) -> Dict:
+    """
+    Recompute features, ratings and career summaries for the given players, or for everyone when
+    player_ids is None. Feature extraction of large populations runs on up to workers processes.
+    Everything is computed before the first write, so on SQLite the write lock is only held
+    for the upserts and concurrent chunks (populate_jobs) do not time out waiting for it.
+    """
+    player_q = db.query(Player.id, Player.team, Player.level)
+    if player_ids is not None:
+        player_q = player_q.filter(Player.id.in_(list(player_ids)))
+    players = [p for p in player_q.all() if isinstance(p.id, int)]
+    bulk = ml_service.extract_features_parallel(db, player_ids=player_ids, workers=workers)
+    features_by_player = ml_service.rows_by_player(bulk)
+    # Historical overalls are sliced from season tensors built for exactly these players
+    tensors = {mode: ml_service.build_season_tensor(db, mode, player_ids=player_ids) for mode in ('hitting', 'pitching')}
+    ratings = rating_rows(db, players, tensors=tensors, bulk=bulk)
+    summaries = career_summary_rows(db, [p.id for p in players])
+    upsert_player_features(db, features_by_player)
+    created, updated = write_rating_rows(db, ratings)
+    summaries_written = write_career_summary_rows(db, summaries)
+    if player_ids is None:
+        # Read after this refresh's own bumps; a later write anywhere makes the tensors stale
+        ml_service.set_season_tensors(tensors, ml_service.global_data_version(db))
+    return {"players_created": created, "players_updated": updated, "features_written": len(features_by_player),
+            "career_summaries_written": summaries_written}
+
+
+def recompute_dirty_players(db: Session, chunk_size: int = 200, progress=None) -> Dict:
+    """
+    Refresh features, ratings and comp-index rows only for players queued in dirty_players,
+    committing per chunk. A player re-marked while its chunk was being processed stays queued.
+    progress(chunk_players, total_queued, chunk_result) is called after each committed chunk.
+    Stored comps are recomputed once at the end, for the changed players and the players whose
+    comps the moved index rows may enter or leave (BaseballMLService.players_with_affected_comps).
+    """
+    queued = db.query(DirtyPlayer.player_id, DirtyPlayer.marked_at).order_by(DirtyPlayer.marked_at).all()
+    totals = {"players_recomputed": 0, "players_created": 0, "players_updated": 0}
+    previous = ml_service.snapshot
+    changed, moved_by_mode = set(), {}
+    for i in range(0, len(queued), chunk_size):
+        chunk = queued[i:i + chunk_size]
+        player_ids = [int(pid) for pid, _ in chunk]
+        ml_service.invalidate_players(player_ids)
+        result = refresh_players(db, player_ids)
+        for mode, moved in ml_service.refresh_comp_index(db, player_ids).items():
+            moved_by_mode.setdefault(mode, set()).update(moved)
+        changed.update(player_ids)
+        for pid, marked_at in chunk:
+            db.query(DirtyPlayer).filter(DirtyPlayer.player_id == pid, DirtyPlayer.marked_at == marked_at).delete(synchronize_session=False)
+        db.commit()
+        totals["players_recomputed"] += len(player_ids)
+        totals["players_created"] += result["players_created"]
+        totals["players_updated"] += result["players_updated"]
+        if progress:
+            progress(len(player_ids), len(queued), result)
+    if changed and ml_service.is_fitted:
+        recompute = sorted(changed | ml_service.players_with_affected_comps(db, previous, moved_by_mode))
+        for i in range(0, len(recompute), COMP_BATCH_SIZE):
+            ml_service.compute_comparisons(db, recompute[i:i + COMP_BATCH_SIZE])
+        totals["comps_recomputed"] = len(recompute)
+    if queued:
+        print(f"[ML] Recomputed {totals['players_recomputed']} dirty players.")
+    return totals
+
+
+def clear_dirty_players(db: Session):
+    """Empty the queue after a full recompute has covered every player."""
+    db.query(DirtyPlayer).delete(synchronize_session=False)
@@ -0,0 +1,201 @@
+"""
+Background jobs for the /features/populate and /ratings/populate endpoints. The endpoint only
+registers a job; the players are split into chunks that a worker pool refreshes, each chunk in
+its own session and transaction, so a failure partway through keeps every chunk already
+committed.
+"""
+import datetime
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from database import SessionLocal
+from models import Player
+from ml_service import ml_service
+from player_refresh import refresh_players, recompute_dirty_players, clear_dirty_players, upsert_player_features
+
+POPULATE_CHUNK_SIZE = int(os.getenv('POPULATE_CHUNK_SIZE', '500'))
+POPULATE_WORKERS = int(os.getenv('POPULATE_WORKERS', '4'))
+# Finished jobs kept for status queries
+MAX_FINISHED_JOBS = 50
+
+
+class PopulateJob:
+    """Status and progress of one populate run, shared with the status endpoint."""
+
+    def __init__(self, kind: str, incremental: bool = False):
+        self._lock = threading.Lock()
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.incremental = incremental
+        self.state = 'queued'
+        self.total_players = 0
+        self.players_done = 0
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.players_created = 0
+        self.players_updated = 0
+        self.created_at = datetime.datetime.utcnow()
+        self.started_at: Optional[datetime.datetime] = None
+        self.finished_at: Optional[datetime.datetime] = None
+        self.error: Optional[str] = None
+
+    def update(self, **values):
+        with self._lock:
+            for attr, value in values.items():
+                setattr(self, attr, value)
+
+    def chunk_finished(self, n_players: int, result: Dict):
+        with self._lock:
+            self.chunks_done += 1
+            self.players_done += n_players
+            self.players_created += result.get('players_created', 0)
+            self.players_updated += result.get('players_updated', 0)
+
+    @property
+    def running(self) -> bool:
+        return self.state in ('queued', 'running')
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'job_id': self.job_id,
+                'kind': self.kind,
+                'incremental': self.incremental,
+                'state': self.state,
+                'progress': round(self.players_done / self.total_players, 3) if self.total_players else (1.0 if self.state == 'succeeded' else 0.0),
+                'total_players': self.total_players,
+                'players_done': self.players_done,
+                'chunks_total': self.chunks_total,
+                'chunks_done': self.chunks_done,
+                'players_created': self.players_created,
+                'players_updated': self.players_updated,
+                'created_at': self.created_at.isoformat(),
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+                'error': self.error,
+            }
+
+
+_jobs: Dict[str, PopulateJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def get_job(job_id: str) -> Optional[PopulateJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def list_jobs() -> List[PopulateJob]:
+    with _jobs_lock:
+        return sorted(_jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+
+def _prune_finished():
+    """Drop the oldest finished jobs beyond MAX_FINISHED_JOBS. Caller holds _jobs_lock."""
+    finished = sorted((j for j in _jobs.values() if not j.running), key=lambda j: j.created_at)
+    for old in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[old.job_id]
+
+
+def _refresh_chunk(kind: str, player_ids: List[int]) -> Dict:
+    """Refresh one chunk in its own session and commit it."""
+    db = SessionLocal()
+    try:
+        if kind == 'features':
+            count = upsert_player_features(db, ml_service.rows_by_player(ml_service.extract_features_bulk(db, player_ids=player_ids)))
+            result = {'players_updated': count}
+        else:
+            result = refresh_players(db, player_ids)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _run_chunked(job: PopulateJob, chunk_size: int, workers: int):
+    db = SessionLocal()
+    try:
+        player_ids = [pid for (pid,) in db.query(Player.id).order_by(Player.id).all() if isinstance(pid, int)]
+    finally:
+        db.close()
+    chunks = [player_ids[i:i + chunk_size] for i in range(0, len(player_ids), chunk_size)]
+    job.update(total_players=len(player_ids), chunks_total=len(chunks))
+    failed = threading.Event()
+    errors = []
+
+    def work(chunk):
+        if failed.is_set():
+            return
+        try:
+            job.chunk_finished(len(chunk), _refresh_chunk(job.kind, chunk))
+        except Exception as e:
+            failed.set()
+            errors.append(f"chunk starting at player {chunk[0]}: {e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=f'populate-{job.kind}') as pool:
+        for future in as_completed([pool.submit(work, chunk) for chunk in chunks]):
+            future.result()
+    if errors:
+        raise RuntimeError('; '.join(errors))
+    db = SessionLocal()
+    try:
+        if job.kind == 'ratings':
+            # Every player was refreshed, so nothing stays queued for the incremental path
+            clear_dirty_players(db)
+            db.commit()
+            ml_service.build_season_tensors(db)
+        ml_service.refresh_feature_cache(db)
+    finally:
+        db.close()
+
+
+def _run_incremental(job: PopulateJob, chunk_size: int):
+    db = SessionLocal()
+    try:
+        def progress(done: int, total: int, result: Dict):
+            job.update(total_players=total, chunks_total=-(-total // chunk_size))
+            job.chunk_finished(done, result)
+        recompute_dirty_players(db, chunk_size=chunk_size, progress=progress)
+    finally:
+        db.close()
+
+
+def _run_job(job: PopulateJob, chunk_size: int, workers: int):
+    start = time.time()
+    job.update(state='running', started_at=datetime.datetime.utcnow())
+    try:
+        if job.incremental:
+            _run_incremental(job, chunk_size)
+        else:
+            _run_chunked(job, chunk_size, workers)
+        job.update(state='succeeded', finished_at=datetime.datetime.utcnow())
+        print(f"[PERF] Populate job {job.job_id} ({job.kind}) took {time.time() - start:.2f}s")
+    except Exception as e:
+        job.update(state='failed', error=str(e), finished_at=datetime.datetime.utcnow())
+        print(f"[ML] Populate job {job.job_id} ({job.kind}) failed after {job.chunks_done} chunks: {e}")
+
+
+def start_populate_job(kind: str, incremental: bool = False, chunk_size: Optional[int] = None,
+                       workers: Optional[int] = None) -> Tuple[PopulateJob, bool]:
+    """
+    Start a 'features' or 'ratings' populate job. Returns (job, started); started is False
+    when a job of the same kind was already running, which is returned instead.
+    """
+    with _jobs_lock:
+        for job in _jobs.values():
+            if job.kind == kind and job.running:
+                return job, False
+        _prune_finished()
+        job = PopulateJob(kind, incremental=incremental)
+        _jobs[job.job_id] = job
+    threading.Thread(
+        target=_run_job, args=(job, chunk_size or POPULATE_CHUNK_SIZE, workers or POPULATE_WORKERS),
+        name=f'populate-{kind}-{job.job_id[:8]}', daemon=True,
+    ).start()
+    return job, True
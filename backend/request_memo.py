@@ -0,0 +1,102 @@
+"""
+Request-scoped memoization of feature extraction and repeated queries.
+
+An HTTP middleware opens a RequestMemo for each request (request_scope). Inside it,
+memoized(key, compute) returns the value already computed under the same key in that request
+instead of computing it again. Keys are tuples such as ('features', player_ids, mode, season)
+or ('mlb_stat_rows', table, player_id). Outside a request scope, for example in scripts or
+populate jobs, memoized simply calls compute, so the ML service can use it everywhere.
+
+Values are shared between callers in the same request and must be treated as read-only. Work
+a request hands to threads (player_profile) shares the memo when submitted through
+contextvars.copy_context().run; concurrent misses of one key then compute it once.
+ORM objects belong to one Session, so keys of such values include the session.
+memo_stats counts the lookups, the misses (work done) and the hits (duplicate work avoided)
+across all requests, by key kind.
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from singleflight import SingleFlight
+
+
+class RequestMemo:
+    """Values computed during one request, by key."""
+
+    def __init__(self):
+        self.values: Dict[Hashable, object] = {}
+        self.hits = 0
+        self.misses = 0
+        # Threads of one request missing the same key wait for a single compute
+        self.flight = SingleFlight('request_memo')
+
+
+class MemoStats:
+    """Process-wide counters of request memo lookups, shared with the admin endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def record(self, kind: str, hit: bool):
+        with self._lock:
+            counts = self.hits if hit else self.misses
+            counts[kind] = counts.get(kind, 0) + 1
+
+    def request_finished(self):
+        with self._lock:
+            self.requests += 1
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            kinds = sorted(set(self.hits) | set(self.misses))
+            return {
+                'requests': self.requests,
+                'hits': sum(self.hits.values()),
+                'misses': sum(self.misses.values()),
+                'by_kind': {kind: {'hits': self.hits.get(kind, 0), 'misses': self.misses.get(kind, 0)} for kind in kinds},
+            }
+
+
+memo_stats = MemoStats()
+_current: ContextVar[Optional[RequestMemo]] = ContextVar('request_memo', default=None)
+
+
+@contextmanager
+def request_scope():
+    """Memoize within the block (one request). Nested scopes reuse the outer one."""
+    if _current.get() is not None:
+        yield _current.get()
+        return
+    memo = RequestMemo()
+    token = _current.set(memo)
+    try:
+        yield memo
+    finally:
+        _current.reset(token)
+        memo_stats.request_finished()
+
+
+def memoized(key: Tuple, compute: Callable):
+    """compute(), or the value it returned earlier in this request for the same key. key[0] names the kind."""
+    memo = _current.get()
+    if memo is None:
+        return compute()
+    computed = []
+
+    def compute_once():
+        if key not in memo.values:
+            memo.values[key] = compute()
+            computed.append(True)
+        return memo.values[key]
+
+    value = memo.values[key] if key in memo.values else memo.flight.do(key, compute_once)
+    if computed:
+        memo.misses += 1
+    else:
+        memo.hits += 1
+    memo_stats.record(key[0], hit=not computed)
+    return value
@@ -0,0 +1,207 @@
+"""
+Response cache for the ML-backed endpoints (/player/{id}/prediction, /player/{id}/mlb_comps).
+
+Entries are keyed by the response's ETag (data_version.conditional_get). The ETag covers the
+path and query, the data versions the response depends on and the served model version, so an
+ingest, a rating write or a refit moves later requests to new keys. Stale entries are never
+served; they age out by TTL or by LRU eviction.
+
+Values are stored JSON-encoded through a backend:
+- 'memory': a size-bounded LRU with per-entry TTL, local to the process (the default; also the
+  stand-in for tests).
+- 'redis': any Redis-compatible server (RESPONSE_CACHE_URL), shared by every worker. Entries are
+  written with SET EX; size-bounded eviction is the server's maxmemory-policy (allkeys-lru).
+
+ResponseCache counts hits and misses; evictions come from the backend.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+from fastapi.encoders import jsonable_encoder
+from singleflight import response_flight
+
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL', 'redis://localhost:6379/0')
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '2048'))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '900'))
+KEY_PREFIX = 'statcast:response:'
+
+
+class CacheBackend:
+    """Byte-string store with per-entry TTL. Backends must be safe to call from several threads."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {}
+
+
+class InMemoryBackend(CacheBackend):
+    """LRU of at most max_entries values, each dropped ttl seconds after it was written."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'backend': 'memory', 'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'evictions': self.evictions, 'expirations': self.expirations}
+
+
+class RedisBackend(CacheBackend):
+    """Entries in a Redis-compatible server, under KEY_PREFIX. Requires the redis package."""
+
+    def __init__(self, url: str = RESPONSE_CACHE_URL, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package (pip install redis)") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(KEY_PREFIX + key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(KEY_PREFIX + key, value, ex=max(1, int(ttl)))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=KEY_PREFIX + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> Dict:
+        info = self.client.info('stats')
+        return {'backend': 'redis', 'evictions': info.get('evicted_keys', 0), 'expirations': info.get('expired_keys', 0)}
+
+
+def build_backend(name: Optional[str] = None) -> CacheBackend:
+    name = name or RESPONSE_CACHE_BACKEND
+    if name == 'memory':
+        return InMemoryBackend()
+    if name == 'redis':
+        return RedisBackend()
+    raise ValueError(f"Unknown response cache backend: {name}")
+
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _backend(self) -> CacheBackend:
+        # Built on first use so importing this module never connects anywhere
+        if self.backend is None:
+            self.backend = build_backend()
+        return self.backend
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get_or_compute(self, key: str, compute: Callable, cacheable: Optional[Callable] = None):
+        """
+        The JSON-decoded value cached under key, or compute() (cached unless it raises or
+        cacheable(value) is false).
+        Concurrent misses of a key share one compute() (singleflight.response_flight). A
+        failing backend is counted and bypassed: the response is computed as if uncached.
+        """
+        try:
+            cached = self._backend().get(key)
+        except Exception as e:
+            print(f"[CACHE] Response cache read failed: {e}")
+            self._count('errors')
+            return response_flight.do(key, lambda: jsonable_encoder(compute()))
+        if cached is not None:
+            self._count('hits')
+            return json.loads(cached)
+        self._count('misses')
+        return response_flight.do(key, lambda: self._compute_and_store(key, compute, cacheable))
+
+    def _compute_and_store(self, key: str, compute: Callable, cacheable: Optional[Callable] = None):
+        value = jsonable_encoder(compute())
+        if cacheable is not None and not cacheable(value):
+            return value
+        try:
+            self._backend().set(key, json.dumps(value).encode(), self.ttl)
+        except Exception as e:
+            print(f"[CACHE] Response cache write failed: {e}")
+            self._count('errors')
+        return value
+
+    def clear(self):
+        self._backend().clear()
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            counts = {'hits': self.hits, 'misses': self.misses, 'errors': self.errors, 'ttl': self.ttl}
+        try:
+            counts.update(self._backend().stats())
+        except Exception as e:
+            counts['backend_error'] = str(e)
+        return counts
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(response, compute: Callable, cacheable: Optional[Callable] = None):
+    """
+    compute() for an endpoint whose validators conditional_get has set on response, cached under
+    its ETag. A value cacheable rejects is served without validators, so clients do not keep it.
+    """
+    etag = response.headers.get('etag')
+    if etag is None:
+        return compute()
+    # The ETag names the endpoint, player, query, data versions and model generation
+    value = response_cache.get_or_compute(etag.strip('"'), compute, cacheable)
+    if cacheable is not None and not cacheable(value):
+        for header in ('etag', 'last-modified'):
+            if header in response.headers:
+                del response.headers[header]
+        response.headers['cache-control'] = 'no-store'
+    return value
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException
+from model_refit import refit_status, start_refit
+from request_memo import memo_stats
+from response_cache import response_cache
+from singleflight import flight_stats
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.post("/refit", status_code=202)
+def trigger_refit(recompute_comparisons: bool = True):
+    if not start_refit(recompute_comparisons=recompute_comparisons):
+        raise HTTPException(status_code=409, detail="A model refit is already running")
+    return refit_status.to_dict()
+
+@router.get("/refit")
+def get_refit_status():
+    return refit_status.to_dict()
+
+@router.get("/memo-stats")
+def get_memo_stats():
+    # hits = extractions and queries a request would otherwise have repeated
+    return memo_stats.to_dict()
+
+@router.get("/response-cache")
+def get_response_cache_stats():
+    return response_cache.to_dict()
+
+@router.delete("/response-cache", status_code=204)
+def clear_response_cache():
+    response_cache.clear()
+
+@router.get("/single-flight")
+def get_single_flight_stats():
+    # coalesced = concurrent identical computations that waited on one already running
+    return flight_stats()
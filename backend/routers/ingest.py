@@ -54,6 +54,11 @@ def update_ml(background_tasks: BackgroundTasks):
     background_tasks.add_task(run_script, ["python", "scripts/master_ingest_and_ml.py"])
     return {"status": "Started ML update"}
 
+@router.post("/train-models")
+def train_models(background_tasks: BackgroundTasks):
+    background_tasks.add_task(run_script, ["python", "scripts/train_models.py"])
+    return {"status": "Started model training"}
+
 @router.post("/debug-ml")
 def debug_ml(background_tasks: BackgroundTasks):
     background_tasks.add_task(run_script, ["python", "scripts/debug_ml_service.py"])
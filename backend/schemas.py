@@ -241,6 +241,10 @@ class PlayerComparisonSchema(BaseModel):
     class Config:
         orm_mode = True
 
+class PlayerCompsRequest(BaseModel):
+    player_ids: List[int]
+    k: int = 5
+
 class MLBSuccessPrediction(BaseModel):
     mlb_debut_probability: float
     projected_career_war: float
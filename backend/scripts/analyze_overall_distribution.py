@@ -20,10 +20,15 @@ def main():
         missing = 0
         total = len(players)
         print(f"[DEBUG] Found {total} MLB players. Starting analysis...")
+        ml_service.build_season_tensors(db)
+        # Features for every player in one parallel extraction pass, then ratings as one batch
+        player_ids = [int(p.id) for p in players if getattr(p, 'id', None) is not None]
+        bulk = ml_service.extract_features_parallel(db, player_ids=player_ids) if player_ids else None
+        rated = ml_service.calculate_mlb_show_ratings_bulk(db, player_ids, bulk=bulk) if bulk is not None else {}
         for idx, player in enumerate(players):
             ptype = ml_service.get_player_type(player)
-            name = getattr(player, 'full_name', f'ID {getattr(player, 'id', 'unknown')}')
             player_id = getattr(player, 'id', None)
+            name = getattr(player, 'full_name', None) or f"ID {player_id}"
             if player_id is None:
                 print(f"[DEBUG]   Player {name} missing id, skipping.")
                 missing += 1
@@ -31,7 +36,7 @@ def main():
             if idx % 100 == 0:
                 print(f"[DEBUG] Processing player {idx+1}/{total}: {name} ({ptype})")
             player_id = int(player_id)
-            ratings = ml_service.calculate_mlb_show_ratings(db, player_id)
+            ratings = rated.get(player_id)
             if not ratings:
                 print(f"[DEBUG]   No ratings for {name} (ID {player_id}, type {ptype})")
                 missing += 1
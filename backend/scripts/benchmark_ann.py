@@ -0,0 +1,81 @@
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# Ensure backend directory is in sys.path for flat imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sklearn.neighbors import NearestNeighbors
+from ml.ann import RPForestIndex, recall_at_k
+
+
+def load_vectors(mode: str) -> np.ndarray:
+    """Scaled comp vectors of every Baseball-Reference player, using the published model bundle's scalers."""
+    from database import SessionLocal
+    from ml_service import ml_service
+    db = SessionLocal()
+    try:
+        if not ml_service.load_models():
+            print("[ML] No model bundle found; run scripts/train_models.py first.")
+            sys.exit(1)
+        scaler = ml_service.snapshot.comp_model(mode)[0]
+        types = ('pitcher', 'two_way') if mode == 'pitching' else ('position_player', 'dh', 'two_way')
+        _, X = ml_service._comp_population_rows(db, mode, types, scaler, population='bref')
+        return X
+    finally:
+        db.close()
+
+
+def timed_queries(index, Q: np.ndarray, k: int):
+    start = time.time()
+    _, indices = index.kneighbors(Q, n_neighbors=k)
+    return indices, len(Q) / max(time.time() - start, 1e-9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rp_forest comp index against the exact ball tree (recall@k and QPS).")
+    parser.add_argument('--mode', choices=['hitting', 'pitching'], default='hitting')
+    parser.add_argument('--synthetic', type=int, default=0, help='Benchmark N random vectors instead of the database population')
+    parser.add_argument('--dims', type=int, default=22, help='Vector width for --synthetic')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--trees', default='8,16,32', help='Comma-separated n_trees values')
+    parser.add_argument('--leaf_sizes', default='32,128', help='Comma-separated leaf_size values')
+    parser.add_argument('--probes', default='0,2,4,8', help='Comma-separated query-time probes values')
+    parser.add_argument('--save', help='Write the last rp_forest built to this .npz path')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((args.synthetic, args.dims)) if args.synthetic else load_vectors(args.mode)
+    if len(X) <= args.k:
+        print(f"[ANN] Only {len(X)} vectors; nothing to benchmark.")
+        return
+    Q = X[rng.choice(len(X), min(args.queries, len(X)), replace=False)]
+    print(f"[ANN] {len(X)} vectors x {X.shape[1]} dims, {len(Q)} queries, k={args.k}")
+
+    start = time.time()
+    exact = NearestNeighbors(algorithm='ball_tree').fit(X)
+    build = time.time() - start
+    exact_indices, qps = timed_queries(exact, Q, args.k)
+    print(f"{'backend':<28}{'build_s':>10}{'qps':>12}{'recall@k':>10}")
+    print(f"{'ball_tree':<28}{build:>10.2f}{qps:>12.0f}{1.0:>10.3f}")
+
+    index = None
+    for n_trees in [int(v) for v in args.trees.split(',')]:
+        for leaf_size in [int(v) for v in args.leaf_sizes.split(',')]:
+            start = time.time()
+            index = RPForestIndex(n_trees=n_trees, leaf_size=leaf_size).fit(X)
+            build = time.time() - start
+            # probes trades recall for speed without rebuilding
+            for probes in [int(v) for v in args.probes.split(',')]:
+                index.probes = probes
+                approx_indices, qps = timed_queries(index, Q, args.k)
+                label = f"rp_forest t={n_trees} l={leaf_size} p={probes}"
+                print(f"{label:<28}{build:>10.2f}{qps:>12.0f}{recall_at_k(exact_indices, approx_indices):>10.3f}")
+    if args.save and index is not None:
+        index.save(args.save)
+        print(f"[ANN] Saved index to {args.save}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import sys
+import os
+import time
+import random
+import argparse
+import datetime
+
+# Ensure backend directory is in sys.path for flat imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import SessionLocal
+from models import Player, PlayerRatings
+from bulk_upsert import upsert_rows
+from player_refresh import RATING_COLUMNS, HITTING_GRADE_FIELDS, PITCHING_GRADE_FIELDS
+
+
+def synthetic_rows(players, seed: int = 0):
+    """One RATING_COLUMNS tuple per player with random grades."""
+    rng = random.Random(seed)
+    now = datetime.datetime.utcnow()
+    rows = []
+    for pid, team, level in players:
+        grades = [rng.uniform(20, 80) for _ in HITTING_GRADE_FIELDS + PITCHING_GRADE_FIELDS]
+        history = [{"season": str(2020 + i), "overall": rng.uniform(20, 80)} for i in range(3)]
+        rows.append((pid, rng.uniform(20, 80), rng.uniform(20, 80), rng.uniform(50, 100), 'position_player', now, team, level, *grades, history))
+    return rows
+
+
+def orm_loop(db, rows):
+    """The per-player write the populate endpoint used to do: build, look up, copy attributes."""
+    for row in rows:
+        rating = PlayerRatings(**dict(zip(RATING_COLUMNS, row)))
+        existing = db.query(PlayerRatings).filter(PlayerRatings.player_id == rating.player_id).first()
+        if existing:
+            for attr, value in rating.__dict__.items():
+                if attr != '_sa_instance_state':
+                    setattr(existing, attr, value)
+        else:
+            db.add(rating)
+    db.flush()
+
+
+def bulk_upsert(db, rows, batch_size):
+    upsert_rows(db, PlayerRatings, RATING_COLUMNS, rows, batch_size=batch_size)
+    db.flush()
+
+
+def timed(label, fn, db, rows, *args):
+    start = time.time()
+    fn(db, rows, *args)
+    elapsed = max(time.time() - start, 1e-9)
+    print(f"{label:<28}{len(rows):>8}{elapsed:>10.2f}{len(rows) / elapsed:>14.0f}")
+    # Nothing is kept: every run starts from the same table state
+    db.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare rows/second of the ORM rating write loop and the batched ON CONFLICT upsert.")
+    parser.add_argument('--players', type=int, default=5000, help='Number of existing players to write ratings for')
+    parser.add_argument('--batch_sizes', default='500,1000,5000', help='Comma-separated upsert batch sizes')
+    parser.add_argument('--skip_orm', action='store_true', help='Only time the bulk upsert')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        players = db.query(Player.id, Player.team, Player.level).order_by(Player.id).limit(args.players).all()
+        if not players:
+            print("[PERF] No players in the database; ingest or seed some first.")
+            return
+        rows = synthetic_rows(players)
+        print(f"[PERF] Dialect: {db.get_bind().dialect.name}; changes are rolled back after each run")
+        print(f"{'writer':<28}{'rows':>8}{'seconds':>10}{'rows/sec':>14}")
+        if not args.skip_orm:
+            timed('orm loop', orm_loop, db, rows)
+        for batch_size in [int(v) for v in args.batch_sizes.split(',')]:
+            timed(f'upsert batch={batch_size}', bulk_upsert, db, rows, batch_size)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import sys
+import os
+import argparse
+
+# Ensure backend directory is in sys.path for flat imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import SessionLocal
+from ml_service import ml_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute top-k MLB comps for every player into player_comparisons.")
+    parser.add_argument('--k', type=int, default=10, help='Number of comps stored per player')
+    parser.add_argument('--refit', action='store_true', help='Refit and publish the comp models before computing')
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        if args.refit:
+            ml_service.fit_models(db)
+            ml_service.save_models(db)
+        elif not ml_service.load_models():
+            print("[ML] No model bundle found; run scripts/train_models.py or pass --refit.")
+            return
+        count = ml_service.compute_comparisons(db, k=args.k)
+        print(f"[ML] Stored comps for {count} players.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,7 @@ def debug_ml_service():
         # Force retrain the models
         print("🔄 Retraining models...")
         ml_service.fit_models(db)
+        snapshot = ml_service.snapshot
         
         print(f"📊 Model metrics after training:")
         print(f"  RMSE: {ml_service.metrics['rmse']}")
@@ -27,12 +28,12 @@ def debug_ml_service():
         # Check if models are properly fitted
         print(f"\n🔍 Model Status:")
         print(f"  is_fitted: {ml_service.is_fitted}")
-        print(f"  Has overall_rating_model: {hasattr(ml_service, 'overall_rating_model')}")
-        print(f"  Has scaler_hit: {hasattr(ml_service, 'scaler_hit')}")
-        print(f"  Has knn_model_hit: {hasattr(ml_service, 'knn_model_hit')}")
+        print(f"  Has overall_rating_model: {getattr(snapshot, 'overall_rating_model', None) is not None}")
+        print(f"  Has scaler_hit: {getattr(snapshot, 'scaler_hit', None) is not None}")
+        print(f"  Has knn_model_hit: {getattr(snapshot, 'knn_model_hit', None) is not None}")
         
-        if hasattr(ml_service, 'overall_rating_model'):
-            print(f"  Model has estimators_: {hasattr(ml_service.overall_rating_model, 'estimators_')}")
+        if getattr(snapshot, 'overall_rating_model', None) is not None:
+            print(f"  Model has estimators_: {hasattr(snapshot.overall_rating_model, 'estimators_')}")
         
         # Test prediction on a few players
         print(f"\n🧪 Testing Predictions:")
@@ -57,8 +58,8 @@ def debug_ml_service():
             
             # Test prediction
             try:
-                if hasattr(ml_service, 'overall_rating_model') and hasattr(ml_service.overall_rating_model, 'estimators_'):
-                    prediction = ml_service.overall_rating_model.predict([feats['normalized']])
+                if getattr(snapshot, 'overall_rating_model', None) is not None and hasattr(snapshot.overall_rating_model, 'estimators_'):
+                    prediction = snapshot.overall_rating_model.predict([feats['normalized']])
                     print(f"  Model prediction: {prediction[0]:.2f}")
                 else:
                     print("  ❌ Model not properly fitted")
@@ -78,18 +79,18 @@ def debug_ml_service():
         
         # Check the training data used
         print(f"\n📊 Training Data Analysis:")
-        if hasattr(ml_service, 'Xh_scaled') and hasattr(ml_service, 'hitter_ids'):
-            print(f"  Training data shape: {ml_service.Xh_scaled.shape}")
-            print(f"  Number of hitter IDs: {len(ml_service.hitter_ids)}")
+        if getattr(snapshot, 'Xh_scaled', None) is not None and getattr(snapshot, 'hitter_ids', None) is not None:
+            print(f"  Training data shape: {snapshot.Xh_scaled.shape}")
+            print(f"  Number of hitter IDs: {len(snapshot.hitter_ids)}")
             
             # Check if training data matches test data
             if len(players) > 0:
                 test_feats = ml_service.extract_player_features(db, int(players[0].id), mode='hitting')
                 if test_feats is not None:
                     print(f"  Test features shape: {test_feats['normalized'].shape}")
-                    print(f"  Training features shape: {ml_service.Xh_scaled.shape[1]}")
+                    print(f"  Training features shape: {snapshot.Xh_scaled.shape[1]}")
                     
-                    if test_feats['normalized'].shape[0] != ml_service.Xh_scaled.shape[1]:
+                    if test_feats['normalized'].shape[0] != snapshot.Xh_scaled.shape[1]:
                         print("  ⚠️  Feature dimension mismatch!")
                         print("  This could be causing the poor performance.")
         
@@ -97,7 +98,7 @@ def debug_ml_service():
         print(f"\n📈 Testing Metrics Endpoint:")
         try:
             # Simulate what the metrics endpoint does
-            if hasattr(ml_service, 'overall_rating_model') and hasattr(ml_service.overall_rating_model, 'estimators_'):
+            if getattr(snapshot, 'overall_rating_model', None) is not None and hasattr(snapshot.overall_rating_model, 'estimators_'):
                 print("  ✅ Model is properly fitted")
                 print(f"  Current metrics: {ml_service.metrics}")
             else:
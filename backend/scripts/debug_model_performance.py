@@ -27,16 +27,15 @@ def debug_model_performance():
         targets_list = []
         player_names = []
         
-        for player in players:
-            player_id = getattr(player, 'id', None)
-            if player_id is None:
-                continue
-                
-            feats = ml_service.extract_player_features(db, int(player_id), mode='hitting')
+        # One extraction pass for the whole population, split across worker processes
+        names = {int(p.id): p.full_name for p in players if getattr(p, 'id', None) is not None}
+        rows = ml_service.rows_by_player(ml_service.extract_features_parallel(db, player_ids=list(names), mode='hitting'))
+        for player_id, name in names.items():
+            feats = rows.get(player_id)
             if feats is not None and np.any(feats["raw"] != 0):
                 features_list.append(feats["normalized"])
                 targets_list.append(np.mean(feats["normalized"]))
-                player_names.append(player.full_name)
+                player_names.append(name)
         
         print(f"✅ Extracted features for {len(features_list)} players")
         
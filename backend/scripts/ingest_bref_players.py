@@ -9,8 +9,10 @@ import argparse
 from tqdm import tqdm
 # sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database import SessionLocal
-from models import Player, StandardBattingStat, ValueBattingStat, AdvancedBattingStat, StandardPitchingStat, ValuePitchingStat, AdvancedPitchingStat, StandardFieldingStat, PlayerFeatures
+from models import Player, StandardBattingStat, ValueBattingStat, AdvancedBattingStat, StandardPitchingStat, ValuePitchingStat, AdvancedPitchingStat, StandardFieldingStat
 from ml_service import ml_service
+from player_refresh import refresh_players, recompute_dirty_players, clear_dirty_players
+from stat_parsing import coerce_stat_row
 
 # Mapping from Baseball Reference headers to model fields
 BREF_TO_MODEL = {
@@ -294,27 +296,8 @@ def parse_and_insert_stat(session, player_obj, table_type, headers, rows, Model)
         raw_team = data.get('team') if 'team' in data else None
         if raw_team is not None and (re.match(r'^[0-9]+TMS?$', str(raw_team).strip().upper()) or str(raw_team).strip().upper() in ['TOT', 'TOTAL']):
             continue
-        # Only pass valid model fields
-        valid_fields = set(str(c.name) for c in Model.__table__.columns)
-        filtered_data = {str(k): (v if v != '' else None) for k, v in data.items() if str(k) in valid_fields}
-        # Cast values to correct type based on model definition
-        for col in Model.__table__.columns:
-            k = col.name
-            value = filtered_data.get(k, None)
-            if value is not None:
-                try:
-                    if isinstance(col.type.python_type, type):
-                        typ = col.type.python_type
-                    else:
-                        typ = type(col.type.python_type)
-                    if typ is int:
-                        filtered_data[k] = str(int(float(value)))
-                    elif typ is float:
-                        filtered_data[k] = str(float(value))
-                    elif typ is str:
-                        filtered_data[k] = str(value).strip()
-                except Exception:
-                    pass
+        # Only pass valid model fields, parsed once to their column types (IP as true thirds)
+        filtered_data = coerce_stat_row(Model, {str(k): v for k, v in data.items()})
         # Normalize unique key fields for duplicate checking
         filter_kwargs = {}
         for k in unique_keys:
@@ -513,25 +496,8 @@ def extract_and_insert_stat_tables(soup, player_obj, session):
                     continue
                 if 'team' in data and data['team']:
                     data['team'] = normalize_team(data['team'])
-                valid_fields = set(str(c.name) for c in Model.__table__.columns)
-                filtered_data = {str(k): (str(v) if v not in (None, '') else None) for k, v in data.items() if str(k) in valid_fields}
-                for col in Model.__table__.columns:
-                    k = col.name
-                    value = filtered_data.get(k, None)
-                    if value is not None:
-                        try:
-                            if isinstance(col.type.python_type, type):
-                                typ = col.type.python_type
-                            else:
-                                typ = type(col.type.python_type)
-                            if typ is int:
-                                filtered_data[k] = str(int(float(value)))
-                            elif typ is float:
-                                filtered_data[k] = str(float(value))
-                            elif typ is str:
-                                filtered_data[k] = str(value).strip()
-                        except Exception:
-                            pass
+                # Parsed once to the column types (IP as true thirds)
+                filtered_data = coerce_stat_row(Model, {str(k): v for k, v in data.items()})
                 # Set the level for each stat row
                 # For MLB stats (lg == 'AL' or 'NL'), set level='MLB'. For MiLB, use the value if present. Default to 'MLB'.
                 lg_val = str(data.get('lg')).upper() if data.get('lg') is not None else ''
@@ -688,9 +654,8 @@ def extract_minor_league_stats(soup, player_obj, session):
                     # Map fields using MAP
                     mapped = {MAP.get(k, k): v for k, v in data.items()}
                     
-                    # Only pass valid fields to the model
-                    valid_fields = set(str(c.name) for c in Model.__table__.columns)
-                    filtered = {str(k): (v if v != '' else None) for k, v in mapped.items() if str(k) in valid_fields}
+                    # Only pass valid fields to the model, parsed to their column types
+                    filtered = coerce_stat_row(Model, {str(k): v for k, v in mapped.items()})
                     
                     # Ensure player_id is set
                     filtered['player_id'] = player_obj.id
@@ -749,10 +714,13 @@ def main():
     parser.add_argument('--url_file', type=str, default='player_url_lists/mlb_40man_player_urls.txt', help='Path to player URLs file (MLB 40-man)')
     parser.add_argument('--level', type=str, default=None, help='Override level for all players (e.g., AAA)')
     parser.add_argument('--resume', action='store_true', help='Resume: skip players already in DB (by bref_id)')
+    parser.add_argument('--full_recompute', action='store_true', help='Recompute features/ratings for every player instead of only changed ones')
+    parser.add_argument('--workers', type=int, default=None, help='Feature extraction processes for the recompute (default ML_EXTRACT_WORKERS)')
     args = parser.parse_args()
     url_file = args.url_file
     override_level = args.level
     resume = args.resume
+    full_recompute = args.full_recompute
     session = SessionLocal()
     
     # Read URLs
@@ -862,30 +830,18 @@ def main():
     
     session.close()
 
-    # --- Compute and store features for all players ---
+    # --- Recompute features and ratings ---
     session = SessionLocal()
-    players = session.query(Player).all()
-    for player in players:
-        player_id = getattr(player, 'id', None)
-        if not isinstance(player_id, int):
-            print(f"[WARN] Skipping player with invalid id: {player_id} ({type(player_id)})")
-            continue
-        feats = ml_service.extract_player_features(session, player_id)
-        if feats is None:
-            continue
-        # Upsert PlayerFeatures
-        pf = session.query(PlayerFeatures).filter_by(player_id=player_id).first()
-        if pf:
-            pf.raw_features = feats['raw']
-            pf.normalized_features = feats['normalized']
-        else:
-            pf = PlayerFeatures(
-                player_id=player_id,
-                raw_features=feats['raw'],
-                normalized_features=feats['normalized']
-            )
-            session.add(pf)
-    session.commit()
+    # Ratings and comps are recomputed against the published model bundle, never a fresh fit
+    ml_service.load_models()
+    if full_recompute:
+        result = refresh_players(session, workers=args.workers)
+        clear_dirty_players(session)
+        session.commit()
+    else:
+        # Only players whose stat rows changed during this ingest
+        result = recompute_dirty_players(session)
+    print(f"[ML] Feature/rating recompute: {result}")
     # Refresh in-memory feature cache after updating DB
     ml_service.refresh_feature_cache(session)
 
@@ -8,14 +8,15 @@ import time
 import argparse
 import bs4
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import String, Integer, Float
 from database import SessionLocal
-from models import Player, StandardBattingStat, StandardPitchingStat, StandardFieldingStat, PlayerFeatures
+from models import Player, StandardBattingStat, StandardPitchingStat, StandardFieldingStat
 from tqdm import tqdm
 import json
 import re
 from urllib.parse import urlparse, parse_qs
 from ml_service import ml_service
+from player_refresh import recompute_dirty_players
+from stat_parsing import coerce_stat_row
 
 # Mapping from BRef register table headers to model fields
 # Updated for register page structure
@@ -296,9 +297,8 @@ def main():
                     # Map fields using MAP
                     mapped = {MAP.get(k, k): v for k, v in data.items()}
                     
-                    # Only pass valid fields to the model
-                    valid_fields = set(str(c.name) for c in Model.__table__.columns)
-                    filtered = {str(k): (v if v != '' else None) for k, v in mapped.items() if str(k) in valid_fields}
+                    # Only pass valid fields to the model, parsed once to their column types (IP as true thirds)
+                    filtered = coerce_stat_row(Model, {str(k): v for k, v in mapped.items()})
                     
                     # Ensure player_id is set
                     filtered['player_id'] = player_obj.id
@@ -315,23 +315,6 @@ def main():
                     else:
                         filtered['level'] = 'MLB'  # fallback
                     
-                    # Type conversion for numeric fields
-                    for col in Model.__table__.columns:
-                        k = col.name
-                        if k in filtered and filtered[k] is not None:
-                            try:
-                                # For String columns, just strip whitespace
-                                if isinstance(col.type, String):
-                                    filtered[k] = str(filtered[k]).strip()
-                                # For Integer columns, convert to int
-                                elif isinstance(col.type, Integer):
-                                    filtered[k] = str(int(float(filtered[k])))
-                                # For Float columns, convert to float
-                                elif isinstance(col.type, Float):
-                                    filtered[k] = str(float(filtered[k]))
-                            except (ValueError, TypeError):
-                                filtered[k] = None
-                    
                     # Check if stat already exists
                     if 'season' in filtered and 'team' in filtered:
                         existing = session.query(Model).filter_by(
@@ -379,28 +362,10 @@ def main():
 
 if __name__ == '__main__':
     main()
-    # --- Recompute and store features for all players ---
+    # --- Recompute features and ratings for players whose stats changed ---
     session = SessionLocal()
-    players = session.query(Player).all()
-    for player in players:
-        player_id = getattr(player, 'id', None)
-        if not isinstance(player_id, int):
-            continue
-        feats = ml_service.extract_player_features(session, player_id)
-        if feats is None:
-            continue
-        pf = session.query(PlayerFeatures).filter_by(player_id=player_id).first()
-        if pf:
-            pf.raw_features = feats['raw']
-            pf.normalized_features = feats['normalized']
-        else:
-            pf = PlayerFeatures(
-                player_id=player_id,
-                raw_features=feats['raw'],
-                normalized_features=feats['normalized']
-            )
-            session.add(pf)
-    session.commit()
+    ml_service.load_models()
+    recompute_dirty_players(session)
     ml_service.refresh_feature_cache(session)
     # --- Recompute and store ML level weights ---
     ml_service.compute_level_weights_from_data(session, force=True)
@@ -5,8 +5,10 @@ import re
 from sqlalchemy.exc import IntegrityError
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from backend.database import SessionLocal
-from backend.models import Player, PlayerBio, StatTable, StatRow, parse_positions, PlayerFeatures
+from backend.models import Player, PlayerBio, StatTable, StatRow, parse_positions
 from backend.ml_service import ml_service
+from backend.player_refresh import recompute_dirty_players
+from backend.ml.parallel_extract import EXTRACT_CHUNK_SIZE, EXTRACT_WORKERS
 
 def parse_bats_throws(bats_throws_str):
     # Example: 'Right \u2022Throws:Right' or 'Left \u2022Throws:Left'
@@ -199,30 +201,11 @@ def main():
             session.rollback()
     session.close()
 
-    # --- Compute and store features for all players ---
+    # --- Recompute features and ratings for players whose stats changed ---
     session = SessionLocal()
-    players = session.query(Player).all()
-    for player in players:
-        player_id = getattr(player, 'id', None)
-        if not isinstance(player_id, int):
-            print(f"[WARN] Skipping player with invalid id: {player_id} ({type(player_id)})")
-            continue
-        feats = ml_service.extract_player_features(session, player_id)
-        if feats is None:
-            continue
-        # Upsert PlayerFeatures
-        pf = session.query(PlayerFeatures).filter_by(player_id=player_id).first()
-        if pf:
-            pf.raw_features = feats['raw']
-            pf.normalized_features = feats['normalized']
-        else:
-            pf = PlayerFeatures(
-                player_id=player_id,
-                raw_features=feats['raw'],
-                normalized_features=feats['normalized']
-            )
-            session.add(pf)
-    session.commit()
+    ml_service.load_models()
+    # Chunks big enough for every extraction worker to get a full share
+    recompute_dirty_players(session, chunk_size=EXTRACT_CHUNK_SIZE * EXTRACT_WORKERS)
     # Refresh in-memory feature cache after updating DB
     ml_service.refresh_feature_cache(session)
 
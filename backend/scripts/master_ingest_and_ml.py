@@ -23,4 +23,6 @@ if __name__ == '__main__':
     db = SessionLocal()
     ml_service.compute_stat_normalization(db)
     db.close()
+    # 4. Fit and publish the model bundle the API loads at startup
+    run_script(os.path.join('backend', 'scripts', 'train_models.py'))
     print("[MASTER] All ingestion and ML steps complete.") 
\ No newline at end of file
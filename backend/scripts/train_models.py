@@ -0,0 +1,38 @@
+import argparse
+import sys
+import os
+
+# Ensure backend directory is in sys.path for flat imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import SessionLocal
+from ml_service import ml_service
+
+
+def main():
+    """Fit the comp/rating models offline and publish them as a new artifact bundle for the API to load."""
+    parser = argparse.ArgumentParser(description="Fit and publish the ML model bundle")
+    parser.add_argument('--incremental-normalization', action='store_true',
+                        help="Only add players the saved normalization sketches have not seen. Faster, but known players' "
+                             "changed or new seasons are not reflected (sketches are append-only); rebuild periodically")
+    # Rebuilding is the default now; the old flag is still accepted
+    parser.add_argument('--rebuild-normalization', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--workers', type=int, default=None, help='Feature extraction processes (default ML_EXTRACT_WORKERS)')
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        ml_service.load_level_weights(db)
+        ml_service.compute_stat_normalization(db, incremental=args.incremental_normalization and not args.rebuild_normalization, workers=args.workers)
+        ml_service.fit_models(db, workers=args.workers)
+        if not ml_service.is_fitted:
+            print("[ML] Model fit failed; no bundle written.")
+            sys.exit(1)
+        meta = ml_service.save_models(db)
+        print(f"[ML] Metrics: {ml_service.metrics}")
+        # Bumps the shared feature file's generation; running API workers then load the new bundle
+        ml_service.publish_shared_arrays()
+        print(f"[ML] Bundle {meta['model_version']} published; running API workers pick it up on their next request.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
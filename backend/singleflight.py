@@ -0,0 +1,69 @@
+"""
+Single-flight coalescing of concurrent identical computations within a process.
+
+SingleFlight.do(key, fn) runs fn once per key at a time. Callers arriving while that call is in
+flight wait for it and get its result, or its exception; nothing is kept once it returns.
+Values are shared between the callers, so they must be treated as read-only.
+
+- response_flight: ML-backed responses, keyed by their ETag (endpoint path and query, player,
+  data versions and model generation; see response_cache.cached_response). Twenty concurrent
+  /prediction requests for one prospect run predict_mlb_success once.
+- fit_flight: model fitting (BaseballMLService.build_snapshot). At most one fit runs per
+  process, and concurrent callers share its snapshot.
+"""
+import threading
+from typing import Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable):
+        """fn(), or the result of the call of fn already running under key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {'in_flight': len(self._calls), 'executions': self.executions, 'coalesced': self.coalesced}
+
+
+response_flight = SingleFlight('responses')
+fit_flight = SingleFlight('model_fit')
+
+
+def flight_stats() -> Dict:
+    return {flight.name: flight.to_dict() for flight in (response_flight, fit_flight)}
@@ -0,0 +1,59 @@
+"""
+Parse scraped stat cells into column values once, at ingest, so stat columns hold real numbers
+and can be aggregated in SQL. Baseball-Reference renders rates as ".312", percentages as
+"24.1%", large counts as "1,024" and innings as whole innings plus outs ("123.1" = 123 1/3).
+"""
+import re
+from typing import Dict, Optional
+from sqlalchemy import Float, Integer, String
+
+# Columns written in innings.outs notation
+INNINGS_COLUMNS = {'ip', 'inn'}
+_INNINGS_RE = re.compile(r'^(-?\d+)\.([012])$')
+
+
+def parse_float(value) -> Optional[float]:
+    """Float from a number or a scraped cell ("1,024", "24.1%", ".312"); None when blank or not numeric."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace(',', '').rstrip('%').strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_innings(value) -> Optional[float]:
+    """Innings pitched/played as true thirds: "123.1" -> 123.333..., "7.2" -> 7.666..."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    match = _INNINGS_RE.match(text)
+    if match:
+        whole, outs = int(match.group(1)), int(match.group(2))
+        return whole + (outs / 3.0 if whole >= 0 else -outs / 3.0)
+    return parse_float(text)
+
+
+def parse_stat_value(column, value):
+    """value converted for a Column by its type; None when it does not parse."""
+    if value is None or value == '':
+        return None
+    if isinstance(column.type, Integer):
+        number = parse_float(value)
+        return int(number) if number is not None else None
+    if isinstance(column.type, Float):
+        return parse_innings(value) if column.name in INNINGS_COLUMNS else parse_float(value)
+    if isinstance(column.type, String):
+        return str(value).strip()
+    return value
+
+
+def coerce_stat_row(Model, data: Dict) -> Dict:
+    """data restricted to Model's columns, every value parsed to its column type."""
+    columns = Model.__table__.columns
+    return {column.name: parse_stat_value(column, data[column.name]) for column in columns if column.name in data}
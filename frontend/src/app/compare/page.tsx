@@ -69,15 +69,12 @@ export default function ComparePage() {
   const fetchPlayerData = async (playerId: number, playerNum: 1 | 2) => {
     setLoading(true);
     try {
-      const [statsRes, ratingsRes, predictionRes] = await Promise.all([
-        fetch(`${API_BASE_URL}/player/${playerId}/standard_batting`),
-        fetch(`${API_BASE_URL}/player/${playerId}/ratings`),
-        fetch(`${API_BASE_URL}/player/${playerId}/prediction`)
-      ]);
+      const profileRes = await fetch(`${API_BASE_URL}/player/${playerId}/profile?fields=standard_batting,ratings,prediction`);
+      const profile = profileRes.ok ? await profileRes.json() : null;
 
-      const stats = statsRes.ok ? await statsRes.json() : null;
-      const ratings = ratingsRes.ok ? await ratingsRes.json() : null;
-      const prediction = predictionRes.ok ? await predictionRes.json() : null;
+      const stats = profile?.stats?.standard_batting ?? null;
+      const ratings = profile?.ratings ?? null;
+      const prediction = profile?.prediction ?? null;
 
       setComparison(prev => ({
         ...prev,
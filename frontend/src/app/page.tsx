@@ -143,6 +143,7 @@ export default function PlayersPage() {
   const [statsLoading, setStatsLoading] = useState(false);
   const [statsError, setStatsError] = useState<string | null>(null);
   const [statsLevelFilter, setStatsLevelFilter] = useState('all');
+  const [profilePlayerId, setProfilePlayerId] = useState<number | null>(null);
 
   const handlePlayerClick = async (player: Player) => {
     setLoadingDetail(true);
@@ -165,72 +166,54 @@ export default function PlayersPage() {
     return matchesSearch && matchesLevel;
   }) || [];
 
-  // Fetch MLB comps when Comparisons tab is active and a player is selected
+  // Fetch comps, prediction and stats in one /profile request the first time a Comparisons,
+  // Predictions or Stats tab is opened for the selected player
   useEffect(() => {
-    if (activeTab === 1 && selectedPlayer) {
+    if (activeTab >= 1 && activeTab <= 3 && selectedPlayer && selectedPlayer.id && profilePlayerId !== selectedPlayer.id) {
+      setProfilePlayerId(selectedPlayer.id);
       setMlbCompsLoading(true);
       setMlbCompsError(null);
       setMlbComps(null);
-      fetch(`${API_BASE_URL}/player/${selectedPlayer.id}/mlb_comps`)
-        .then(res => {
-          if (!res.ok) throw new Error('Failed to fetch MLB comps');
-          return res.json();
-        })
-        .then(data => {
-          setMlbComps(data.comparisons);
-          setMlbCompsLoading(false);
-        })
-        .catch(() => {
-          setMlbCompsError('Could not load MLB comparisons');
-          setMlbCompsLoading(false);
-        });
-    }
-  }, [activeTab, selectedPlayer]);
-
-  // Fetch prediction when Predictions tab is active and a player is selected
-  useEffect(() => {
-    if (activeTab === 2 && selectedPlayer) {
       setPredictionLoading(true);
       setPredictionError(null);
       setPrediction(null);
-      fetch(`${API_BASE_URL}/player/${selectedPlayer.id}/prediction`)
+      setStatsLoading(true);
+      setStatsError(null);
+      fetch(`${API_BASE_URL}/player/${selectedPlayer.id}/profile?fields=comps,prediction,standard_batting,standard_pitching,standard_fielding`)
         .then(res => {
-          if (!res.ok) throw new Error('Failed to fetch prediction');
+          if (!res.ok) throw new Error('Failed to fetch player profile');
           return res.json();
         })
         .then(data => {
-          setPrediction(data);
-          setPredictionLoading(false);
+          // A failed comp search or prediction comes back null (listed in data.unavailable)
+          // without failing the stats; an empty comps list is a valid result
+          if (Array.isArray(data.comps)) {
+            setMlbComps(data.comps);
+          } else {
+            setMlbCompsError('Could not load MLB comparisons');
+          }
+          if (data.prediction) {
+            setPrediction(data.prediction);
+          } else {
+            setPredictionError('Could not load MLB prediction');
+          }
+          const stats = data.stats || {};
+          setBattingStats(Array.isArray(stats.standard_batting) ? stats.standard_batting : []);
+          setPitchingStats(Array.isArray(stats.standard_pitching) ? stats.standard_pitching : []);
+          setFieldingStats(Array.isArray(stats.standard_fielding) ? stats.standard_fielding : []);
         })
         .catch(() => {
+          setMlbCompsError('Could not load MLB comparisons');
           setPredictionError('Could not load MLB prediction');
-          setPredictionLoading(false);
-        });
-    }
-  }, [activeTab, selectedPlayer]);
-
-  // Fetch stats when Stats tab is active and a player is selected
-  useEffect(() => {
-    if (activeTab === 3 && selectedPlayer && selectedPlayer.id) {
-      setStatsLoading(true);
-      setStatsError(null);
-      Promise.all([
-        fetch(`${API_BASE_URL}/player/${selectedPlayer.id}/standard_batting`).then(res => res.json()),
-        fetch(`${API_BASE_URL}/player/${selectedPlayer.id}/standard_pitching`).then(res => res.json()),
-        fetch(`${API_BASE_URL}/player/${selectedPlayer.id}/standard_fielding`).then(res => res.json()),
-      ])
-        .then(([batting, pitching, fielding]) => {
-          setBattingStats(Array.isArray(batting) ? batting : []);
-          setPitchingStats(Array.isArray(pitching) ? pitching : []);
-          setFieldingStats(Array.isArray(fielding) ? fielding : []);
-          setStatsLoading(false);
-        })
-        .catch(() => {
           setStatsError('Could not load stats');
+        })
+        .finally(() => {
+          setMlbCompsLoading(false);
+          setPredictionLoading(false);
           setStatsLoading(false);
         });
     }
-  }, [activeTab, selectedPlayer]);
+  }, [activeTab, selectedPlayer, profilePlayerId]);
 
   // Filter stats by level
   const filterStatsByLevel = (stats: any[], level: string) => {